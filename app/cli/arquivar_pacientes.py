@@ -0,0 +1,34 @@
+# Move para o arquivo os pacientes inativos há mais de ARQUIVO_INATIVO_DIAS
+#
+# A API já faz isso em segundo plano (ARQUIVO_ATIVO); este comando roda
+# uma vez, por exemplo no cron de instalações com ARQUIVO_ATIVO=false.
+#
+# Uso:
+#     python -m app.cli.arquivar_pacientes
+#     python -m app.cli.arquivar_pacientes --dias 90 --lote 1000
+
+import argparse
+import time
+
+from app.config import ARQUIVO_INATIVO_DIAS, ARQUIVO_LOTE
+from app.database import Base, engine, engines_pacientes, particionamento
+from app.utils.arquivo import arquivar_inativos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arquiva os pacientes inativos")
+    parser.add_argument("--dias", type=float, default=ARQUIVO_INATIVO_DIAS, help="Dias inativo e sem alterações")
+    parser.add_argument("--lote", type=int, default=ARQUIVO_LOTE, help="Pacientes por transação")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    if particionamento is not None:
+        particionamento.criar_tabelas()
+
+    inicio = time.perf_counter()
+    total = arquivar_inativos(engines_pacientes, args.dias, args.lote)
+    print(f"✅ {total} pacientes arquivados em {time.perf_counter() - inicio:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
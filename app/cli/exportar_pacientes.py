@@ -0,0 +1,66 @@
+# Exporta todos os pacientes (com informações privadas) para NDJSON ou CSV,
+# incluindo os arquivados (inativos); --sem-arquivados exporta só as tabelas quentes
+#
+# Uso:
+#     python -m app.cli.exportar_pacientes backup.ndjson
+#     python -m app.cli.exportar_pacientes backup.csv.gz --formato csv --gzip
+#     python -m app.cli.exportar_pacientes backup.ndjson --retomar   # continua do último ID no arquivo
+
+import argparse
+import os
+import time
+
+from app.database import engines_pacientes
+from app.utils.exportacao import FORMATOS, exportar_pacientes, ultimo_id_exportado
+
+
+def _descartar_registro_incompleto(caminho: str, tamanho_completo: int):
+    """
+    Remove do fim do arquivo um registro gravado pela metade (exportação
+    interrompida), para retomar a partir do último registro completo.
+    """
+    with open(caminho, "rb+") as arquivo:
+        arquivo.truncate(tamanho_completo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta pacientes em streaming")
+    parser.add_argument("arquivo", help="Arquivo de saída")
+    parser.add_argument("--formato", choices=FORMATOS, default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="Comprime a saída (gzip)")
+    parser.add_argument("--desde-id", type=int, default=0, help="Exporta apenas pacientes com ID maior")
+    parser.add_argument("--retomar", action="store_true", help="Continua um arquivo existente a partir do último ID")
+    parser.add_argument("--sem-arquivados", action="store_true", help="Não inclui os pacientes arquivados (inativos)")
+    args = parser.parse_args()
+
+    desde_id = args.desde_id
+    modo = "wb"
+    if args.retomar and os.path.exists(args.arquivo):
+        try:
+            desde_id, tamanho_completo = ultimo_id_exportado(args.arquivo, args.formato, args.gzip)
+        except EOFError:
+            raise SystemExit("❌ Arquivo gzip truncado: não é possível retomar, exporte novamente")
+
+        if tamanho_completo is not None:
+            if args.gzip:
+                raise SystemExit("❌ O arquivo gzip termina com um registro incompleto: não é possível retomar")
+            _descartar_registro_incompleto(args.arquivo, tamanho_completo)
+
+        # Em gzip, a retomada acrescenta um novo membro ao arquivo (gzip concatenado é válido)
+        if desde_id:
+            modo = "ab"
+            print(f"↪️  Retomando a partir do ID {desde_id}")
+
+    inicio = time.perf_counter()
+    total_bytes = 0
+    with open(args.arquivo, modo) as saida:
+        for bloco in exportar_pacientes(engines_pacientes, args.formato, args.gzip, desde_id, cabecalho=modo == "wb",
+                                        incluir_arquivados=not args.sem_arquivados):
+            saida.write(bloco)
+            total_bytes += len(bloco)
+
+    print(f"✅ {total_bytes} bytes exportados em {time.perf_counter() - inicio:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
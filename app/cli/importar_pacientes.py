@@ -0,0 +1,47 @@
+# Importa pacientes em massa a partir de um arquivo NDJSON
+# (uma linha JSON por paciente, no formato do POST /paciente)
+#
+# Uso:
+#     python -m app.cli.importar_pacientes pacientes.ndjson [--lote 2000]
+#     cat pacientes.ndjson | python -m app.cli.importar_pacientes -
+
+import argparse
+import json
+import sys
+import time
+
+from app.config import TAMANHO_LOTE_IMPORTACAO
+from app.database import Base, SessionLocal, engine, particionamento
+from app.utils.importacao import ImportadorPacientes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa pacientes de um arquivo NDJSON")
+    parser.add_argument("arquivo", help="Caminho do arquivo NDJSON ou '-' para ler da entrada padrão")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE_IMPORTACAO, help="Linhas por transação")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    if particionamento is not None:
+        particionamento.criar_tabelas()
+
+    entrada = sys.stdin.buffer if args.arquivo == "-" else open(args.arquivo, "rb")
+    db = SessionLocal()
+    inicio = time.perf_counter()
+    try:
+        importador = ImportadorPacientes(db, tamanho_lote=args.lote)
+        importador.processar_linhas(entrada)  # Lê o arquivo linha a linha
+        relatorio = importador.finalizar()
+    finally:
+        db.close()
+        entrada.close()
+
+    duracao = time.perf_counter() - inicio
+    relatorio["segundos"] = round(duracao, 3)
+    relatorio["linhas_por_segundo"] = round(relatorio["linhas"] / duracao) if duracao else None
+
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
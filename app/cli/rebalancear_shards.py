@@ -0,0 +1,52 @@
+# Rebalanceia os shards de pacientes (SHARDS) e migra instalações sem shards
+#
+# Uso:
+#     python -m app.cli.rebalancear_shards --status
+#     python -m app.cli.rebalancear_shards                      # divide os buckets igualmente (ex: após acrescentar um shard)
+#     python -m app.cli.rebalancear_shards --esvaziar shard-3   # tira todos os buckets do shard-3 (antes de removê-lo de SHARDS)
+#     python -m app.cli.rebalancear_shards --migrar-principal   # move para os shards os pacientes do banco principal
+#
+# As leituras da API continuam durante o rebalanceamento; as escritas
+# de pacientes devem estar paradas até o fim.
+
+import argparse
+import json
+import time
+
+from app.database import Base, engine, particionamento
+from app.utils.rebalanceamento import estado, migrar_principal, rebalancear
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebalanceia os shards de pacientes")
+    parser.add_argument("--status", action="store_true", help="Mostra buckets e pacientes de cada shard")
+    parser.add_argument("--esvaziar", action="append", default=[], metavar="SHARD", help="Move todos os buckets do shard para os demais")
+    parser.add_argument("--migrar-principal", action="store_true", help="Distribui entre os shards os pacientes do banco principal")
+    parser.add_argument("--sem-espera", action="store_true", help="Não espera os processos relerem o mapa (API parada)")
+    args = parser.parse_args()
+
+    if particionamento is None:
+        raise SystemExit("❌ Configure SHARDS com as URLs dos shards")
+
+    Base.metadata.create_all(bind=engine)
+    particionamento.criar_tabelas()
+
+    if args.status:
+        print(json.dumps(estado(particionamento), ensure_ascii=False, indent=2))
+        return
+
+    inicio = time.perf_counter()
+    if args.migrar_principal:
+        migrar_principal(particionamento)
+    else:
+        try:
+            rebalancear(particionamento, args.esvaziar, esperar=not args.sem_espera)
+        except ValueError as erro:
+            raise SystemExit(f"❌ {erro}")
+
+    print(f"✅ Concluído em {time.perf_counter() - inicio:.2f}s")
+    print(json.dumps(estado(particionamento), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# Reconstrói os índices de busca (nome e termos clínicos) de todos os pacientes
+#
+# Uso:
+#     python -m app.cli.reindexar_busca
+
+from app.database import Base, SessionLocal, engine, particionamento
+from app.utils.busca import reindexar_todos
+from app.utils.termos import reindexar_termos_todos
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+
+    # Com shards, cada shard reconstrói os índices dos próprios pacientes
+    fabricas = [SessionLocal]
+    if particionamento is not None:
+        particionamento.criar_tabelas()
+        fabricas = [shard.SessionLocal for shard in particionamento.shards]
+
+    total = 0
+    for fabrica in fabricas:
+        db = fabrica()
+        try:
+            total += reindexar_todos(db)
+            reindexar_termos_todos(db)
+        finally:
+            db.close()
+
+    print(f"✅ {total} pacientes indexados")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,4 +16,117 @@ MYSQL_HOST = os.getenv("MYSQL_HOST")
 MYSQL_USER = os.getenv("MYSQL_USER")
 MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
 MYSQL_DB = os.getenv("MYSQL_DB")
-MYSQL_PORT = os.getenv("MYSQL_PORT")
\ No newline at end of file
+MYSQL_PORT = os.getenv("MYSQL_PORT")
+
+# Paginação das listagens de pacientes
+LIMITE_PAGINA_PADRAO = int(os.getenv("LIMITE_PAGINA_PADRAO", "100"))
+LIMITE_PAGINA_MAXIMO = int(os.getenv("LIMITE_PAGINA_MAXIMO", "1000"))
+
+# Cache de autenticação (tokens decodificados e médicos)
+CACHE_AUTH_TTL = float(os.getenv("CACHE_AUTH_TTL", "30"))  # segundos (0 desativa)
+CACHE_AUTH_TAMANHO = int(os.getenv("CACHE_AUTH_TAMANHO", "10000"))
+# Confere versão e ativo do médico no banco a cada acerto (uma leitura pela chave primária). A
+# invalidação é por processo: sem a conferência, com vários workers, um médico desativado ou
+# excluído continua autenticando nos outros workers por até CACHE_AUTH_TTL segundos
+CACHE_AUTH_VALIDAR = os.getenv("CACHE_AUTH_VALIDAR", "true").lower() in ("1", "true", "sim")
+
+# Quantidade máxima de IDs por consulta em lote
+LIMITE_LOTE_IDS = int(os.getenv("LIMITE_LOTE_IDS", "200"))
+
+# URL explícita do banco (ex: sqlite:///./teste.db); tem prioridade sobre o MySQL
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Modo assíncrono (AsyncSession com aiosqlite/aiomysql) para as rotas de leitura
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "sim")
+
+# Pool de conexões do SQLAlchemy
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # segundos (-1 desativa)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # espera máxima por uma conexão livre
+# Estratégia de verificação das conexões:
+# - true  (pessimista): faz um ping a cada checkout do pool
+# - false (otimista): sem ping; conexões quebradas são descartadas no primeiro erro
+#   e renovadas periodicamente por DB_POOL_RECYCLE
+DB_PRE_PING = os.getenv("DB_PRE_PING", "true").lower() in ("1", "true", "sim")
+
+# Ajustes do SQLite (aplicados a cada nova conexão)
+SQLITE_WAL = os.getenv("SQLITE_WAL", "true").lower() in ("1", "true", "sim")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negativo = KiB (64 MiB)
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # milissegundos
+
+# Importação em massa de pacientes (NDJSON)
+TAMANHO_LOTE_IMPORTACAO = int(os.getenv("TAMANHO_LOTE_IMPORTACAO", "2000"))  # linhas por transação
+LIMITE_ERROS_IMPORTACAO = int(os.getenv("LIMITE_ERROS_IMPORTACAO", "1000"))  # erros detalhados no relatório
+
+# Busca por nome: as listas do índice dos trigramas com mais pacientes que isso não são percorridas;
+# esses trigramas são conferidos só nos candidatos dos trigramas mais raros, pela chave primária.
+# A contagem por trigrama é lida do índice e guardada por BUSCA_FREQUENCIA_TTL
+BUSCA_TRIGRAMA_FREQUENTE = int(os.getenv("BUSCA_TRIGRAMA_FREQUENTE", "20000"))  # 0 desativa
+BUSCA_FREQUENCIA_TTL = float(os.getenv("BUSCA_FREQUENCIA_TTL", "3600"))         # segundos
+
+# Cache das respostas públicas de paciente (JSON já serializado)
+CACHE_PACIENTE_TTL = float(os.getenv("CACHE_PACIENTE_TTL", "60"))  # segundos (0 desativa)
+CACHE_PACIENTE_TAMANHO = int(os.getenv("CACHE_PACIENTE_TAMANHO", "10000"))
+# Confere a versão no banco a cada acerto (uma leitura pela chave primária). O cache e a invalidação
+# são por processo: sem a conferência, com vários workers, um worker pode servir a versão antiga
+# (e responder 304 a ela) por até CACHE_PACIENTE_TTL segundos. Desative só com um único worker
+CACHE_PACIENTE_VALIDAR = os.getenv("CACHE_PACIENTE_VALIDAR", "true").lower() in ("1", "true", "sim")
+
+
+# Hash de senhas (scrypt); alterar os parâmetros faz os hashes antigos serem refeitos no login
+SENHA_SCRYPT_N = int(os.getenv("SENHA_SCRYPT_N", str(2 ** 14)))  # custo de CPU/memória (potência de 2)
+SENHA_SCRYPT_R = int(os.getenv("SENHA_SCRYPT_R", "8"))
+SENHA_SCRYPT_P = int(os.getenv("SENHA_SCRYPT_P", "1"))
+SENHA_PROCESSOS = int(os.getenv("SENHA_PROCESSOS", str(os.cpu_count() or 1)))  # 0 = calcula na thread da requisição
+
+# Limites de taxa e de concorrência (0 desativa o limite correspondente)
+LIMITES_ATIVOS = os.getenv("LIMITES_ATIVOS", "true").lower() in ("1", "true", "sim")
+LIMITE_LOGIN_POR_MINUTO = int(os.getenv("LIMITE_LOGIN_POR_MINUTO", "10"))        # por cliente (IP)
+LIMITE_ESCRITA_POR_MINUTO = int(os.getenv("LIMITE_ESCRITA_POR_MINUTO", "300"))   # por cliente (IP)
+LIMITE_LEITURA_POR_MINUTO = int(os.getenv("LIMITE_LEITURA_POR_MINUTO", "1200"))  # por cliente (IP)
+LIMITE_MEDICO_POR_MINUTO = int(os.getenv("LIMITE_MEDICO_POR_MINUTO", "2400"))    # por médico (sub do JWT)
+LIMITE_CONCORRENCIA = int(os.getenv("LIMITE_CONCORRENCIA", "100"))               # requisições simultâneas
+LIMITE_CONCORRENCIA_PESADA = int(os.getenv("LIMITE_CONCORRENCIA_PESADA", "4"))   # NDJSON de /pacientes sem limite, importação e exportação
+LIMITES_CHAVES_MAXIMO = int(os.getenv("LIMITES_CHAVES_MAXIMO", "100000"))        # clientes/médicos acompanhados em memória
+
+# Métricas por rota em GET /metrics (formato Prometheus)
+METRICAS_ATIVAS = os.getenv("METRICAS_ATIVAS", "true").lower() in ("1", "true", "sim")
+
+# Instrumentação das consultas SQL (cabeçalho Server-Timing, log de lentas e detecção de N+1)
+SQL_INSTRUMENTACAO = os.getenv("SQL_INSTRUMENTACAO", "true").lower() in ("1", "true", "sim")
+SQL_LENTA_MS = float(os.getenv("SQL_LENTA_MS", "200"))   # consultas acima disso vão para o log (0 desativa)
+SQL_DEBUG_N1 = os.getenv("SQL_DEBUG_N1", "false").lower() in ("1", "true", "sim")
+SQL_N1_LIMIAR = int(os.getenv("SQL_N1_LIMIAR", "3"))      # execuções do mesmo comando na requisição
+
+# Aquecimento na inicialização (conexões do pool, mappers, consultas frequentes e pool de senhas)
+AQUECIMENTO_ATIVO = os.getenv("AQUECIMENTO_ATIVO", "true").lower() in ("1", "true", "sim")
+AQUECIMENTO_CONEXOES = int(os.getenv("AQUECIMENTO_CONEXOES", str(DB_POOL_SIZE)))  # conexões abertas antes da primeira requisição
+
+# Feed de alterações de pacientes (GET /pacientes/eventos, Server-Sent Events)
+EVENTOS_INTERVALO = float(os.getenv("EVENTOS_INTERVALO", "1"))                  # segundos entre leituras do registro (escritas de outros processos)
+EVENTOS_HEARTBEAT = float(os.getenv("EVENTOS_HEARTBEAT", "15"))                 # segundos sem eventos até enviar um comentário de keep-alive
+EVENTOS_FILA = int(os.getenv("EVENTOS_FILA", "1000"))                           # eventos pendentes por assinante antes de desconectá-lo
+EVENTOS_LOTE = int(os.getenv("EVENTOS_LOTE", "500"))                            # eventos por leitura no banco
+EVENTOS_ESPERA_LACUNA = float(os.getenv("EVENTOS_ESPERA_LACUNA", "5"))         # segundos esperando um seq pulado (transação aberta) antes de considerá-lo descartado
+EVENTOS_ASSINANTES_MAXIMO = int(os.getenv("EVENTOS_ASSINANTES_MAXIMO", "1000"))  # conexões simultâneas no feed (0 = sem limite)
+
+# Réplicas de leitura: URLs separadas por vírgula (GET/HEAD vão para as réplicas, escritas para o principal)
+DATABASE_REPLICAS = [url.strip() for url in os.getenv("DATABASE_REPLICAS", "").split(",") if url.strip()]
+REPLICA_JANELA_ESCRITA = float(os.getenv("REPLICA_JANELA_ESCRITA", "5"))            # segundos lendo do principal após o cliente gravar
+REPLICA_VERIFICACAO_INTERVALO = float(os.getenv("REPLICA_VERIFICACAO_INTERVALO", "10"))  # segundos entre verificações de cada réplica
+REPLICA_CLIENTES_MAXIMO = int(os.getenv("REPLICA_CLIENTES_MAXIMO", "100000"))       # clientes com escrita recente acompanhados em memória
+
+# Sharding dos pacientes: URLs dos shards separadas por vírgula (vazio = pacientes no banco principal)
+SHARDS = [url.strip() for url in os.getenv("SHARDS", "").split(",") if url.strip()]
+SHARD_BUCKETS = int(os.getenv("SHARD_BUCKETS", "1024"))            # buckets do mapa (id % SHARD_BUCKETS); fixo depois de criado o mapa
+SHARD_BLOCO_IDS = int(os.getenv("SHARD_BLOCO_IDS", "100"))         # IDs reservados de uma vez na sequência global (por processo)
+SHARD_MAPA_RECARGA = float(os.getenv("SHARD_MAPA_RECARGA", "30"))  # segundos entre releituras do mapa de buckets (após rebalanceamento)
+
+# Arquivo de pacientes inativos (tabelas paciente_arquivo / informacoes_privadas_arquivo)
+ARQUIVO_ATIVO = os.getenv("ARQUIVO_ATIVO", "true").lower() in ("1", "true", "sim")  # tarefa em segundo plano que arquiva os inativos
+ARQUIVO_INATIVO_DIAS = float(os.getenv("ARQUIVO_INATIVO_DIAS", "30"))  # dias inativo e sem alterações até ir para o arquivo
+ARQUIVO_INTERVALO = float(os.getenv("ARQUIVO_INTERVALO", "3600"))      # segundos entre execuções da tarefa
+ARQUIVO_LOTE = int(os.getenv("ARQUIVO_LOTE", "500"))                   # pacientes arquivados/excluídos por comando
\ No newline at end of file
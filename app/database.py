@@ -1,6 +1,13 @@
-from sqlalchemy import create_engine
+import orjson
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
-from app.config import MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB, MYSQL_PORT
+from app.config import MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB, MYSQL_PORT, DB_ASYNC
+from app.config import DATABASE_URL as DATABASE_URL_CONFIG
+from app.config import DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT, DB_PRE_PING, DATABASE_REPLICAS, SHARDS
+from app.utils.pool import QueuePoolInstrumentado, AsyncQueuePoolInstrumentado, configurar_sqlite
+from app.utils.consultas import instrumentar_engine
+from app.utils.replicas import Replica, escolher_replica, escolher_replica_async
+from app.utils.shards import Shard, Particionamento
 
 # -------------------------------------------------
 # Base declarativa do SQLAlchemy
@@ -10,11 +17,14 @@ Base = declarative_base()
 
 # -------------------------------------------------
 # Definição da URL do banco de dados
-# Prioriza MySQL (produção) e cai para SQLite (dev)
+# Prioriza DATABASE_URL, depois MySQL (produção) e cai para SQLite (dev)
 # -------------------------------------------------
 
+if DATABASE_URL_CONFIG:
+    # URL informada diretamente no .env
+    DATABASE_URL = DATABASE_URL_CONFIG
 # Verifica se todas as variáveis de ambiente do MySQL existem
-if all([MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB, MYSQL_PORT]):
+elif all([MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB, MYSQL_PORT]):
     # Conexão com MySQL usando PyMySQL
     DATABASE_URL = (
         f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}"
@@ -29,15 +39,58 @@ else:
 # Configuração do engine do SQLAlchemy
 # -------------------------------------------------
 
-# SQLite exige esse parâmetro para permitir múltiplas threads
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+SQLITE = DATABASE_URL.startswith("sqlite")
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,           # Não exibe SQL no console (pode ativar em debug)
-    pool_pre_ping=True,   # Verifica se a conexão ainda está válida
-    connect_args=connect_args
-)
+def opcoes_pool(url: str, poolclass) -> dict:
+    """
+    Parâmetros do pool vindos do app/config.py.
+    SQLite em memória usa o pool padrão (uma única conexão compartilhada).
+    """
+    if ":memory:" in url or url.rstrip("/").endswith("sqlite:"):
+        return {}
+
+    return {
+        "poolclass": poolclass,             # Pool com estatísticas de checkout
+        "pool_size": DB_POOL_SIZE,          # Conexões mantidas abertas
+        "max_overflow": DB_MAX_OVERFLOW,    # Conexões extras em picos
+        "pool_recycle": DB_POOL_RECYCLE,    # Renova conexões antigas (evita timeout do MySQL)
+        "pool_timeout": DB_POOL_TIMEOUT,    # Espera máxima por uma conexão livre
+    }
+
+
+def serializar_json(valor) -> str:
+    """
+    Serializa as colunas JSON com orjson (o driver espera str).
+    """
+    return orjson.dumps(valor).decode()
+
+
+def criar_engine(url: str):
+    """
+    Cria o engine síncrono (banco principal, réplica ou shard) com o pool,
+    os PRAGMAs do SQLite e a instrumentação das consultas.
+    """
+    sqlite = url.startswith("sqlite")
+    novo_engine = create_engine(
+        url,
+        echo=False,                  # Não exibe SQL no console (pode ativar em debug)
+        pool_pre_ping=DB_PRE_PING,   # Verifica se a conexão ainda está válida (ver DB_PRE_PING)
+        connect_args={"check_same_thread": False} if sqlite else {},  # SQLite: permite usar a conexão em várias threads
+        json_serializer=serializar_json,      # orjson nas colunas JSON (bem mais rápido que o json padrão)
+        json_deserializer=orjson.loads,
+        **opcoes_pool(url, QueuePoolInstrumentado)
+    )
+
+    # PRAGMAs de desempenho do SQLite (WAL, cache, mmap, busy_timeout)
+    if sqlite:
+        event.listen(novo_engine, "connect", configurar_sqlite)
+
+    # Contagem/tempo das consultas por requisição e log de consultas lentas
+    instrumentar_engine(novo_engine)
+    return novo_engine
+
+
+engine = criar_engine(DATABASE_URL)
 
 # -------------------------------------------------
 # Fábrica de sessões do banco
@@ -56,9 +109,103 @@ def get_db():
     """
     Cria e fornece uma sessão do banco de dados.
     Garante que a sessão seja fechada ao final da requisição.
+    Em leituras, a sessão pode ser de uma réplica (ver app/utils/replicas.py).
+    Com shards, é uma ShardedSession que roteia pelo ID do paciente (ver app/utils/shards.py).
     """
-    db = SessionLocal()
+    replica = escolher_replica(replicas)
+    db = replica.SessionLocal() if replica is not None else SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# -------------------------------------------------
+# Modo assíncrono (opcional, DB_ASYNC=true)
+# -------------------------------------------------
+# Usa drivers assíncronos (aiosqlite / aiomysql) para que as rotas
+# de leitura não ocupem uma thread do threadpool enquanto esperam o banco.
+AsyncSessionLocal = None
+async_engine = None
+
+
+def url_assincrona(url: str) -> str:
+    """
+    Converte a URL síncrona para o driver assíncrono equivalente.
+    """
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("mysql+pymysql:"):
+        return url.replace("mysql+pymysql:", "mysql+aiomysql:", 1)
+    return url
+
+
+def criar_engine_async(url: str):
+    """
+    Equivalente assíncrono de criar_engine.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    novo_engine = create_async_engine(
+        url_assincrona(url),
+        echo=False,
+        pool_pre_ping=DB_PRE_PING,
+        json_serializer=serializar_json,
+        json_deserializer=orjson.loads,
+        **opcoes_pool(url, AsyncQueuePoolInstrumentado)
+    )
+
+    if url.startswith("sqlite"):
+        event.listen(novo_engine.sync_engine, "connect", configurar_sqlite)
+
+    instrumentar_engine(novo_engine.sync_engine)
+    return novo_engine
+
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = criar_engine_async(DATABASE_URL)
+
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+async def get_async_db():
+    """
+    Versão assíncrona de get_db: fornece uma AsyncSession
+    e garante que ela seja fechada ao final da requisição.
+    """
+    replica = await escolher_replica_async(replicas)
+    fabrica = replica.AsyncSessionLocal if replica is not None else AsyncSessionLocal
+    async with fabrica() as db:
+        yield db
+
+# -------------------------------------------------
+# Réplicas de leitura (opcional, DATABASE_REPLICAS)
+# -------------------------------------------------
+# Mesmas opções de pool do principal. Os nomes (replica-1, replica-2...)
+# aparecem no cabeçalho X-Banco e em /status/replicas, sem expor as URLs.
+replicas = [
+    Replica(f"replica-{i}", criar_engine(url), criar_engine_async(url) if DB_ASYNC else None)
+    for i, url in enumerate(DATABASE_REPLICAS, start=1)
+]
+
+# -------------------------------------------------
+# Sharding dos pacientes (opcional, SHARDS)
+# -------------------------------------------------
+# Os pacientes ficam divididos entre os shards (shard-1, shard-2...,
+# na ordem de SHARDS: novos shards entram sempre no fim da lista).
+# O principal guarda médicos, eventos, o mapa de buckets e a sequência de IDs.
+particionamento = None
+engines_pacientes = [engine]
+
+if SHARDS:
+    if replicas:
+        raise RuntimeError("DATABASE_REPLICAS e SHARDS não podem ser usados juntos")
+
+    particionamento = Particionamento(engine, [Shard(f"shard-{i}", criar_engine(url)) for i, url in enumerate(SHARDS, start=1)])
+    engines_pacientes = [shard.engine for shard in particionamento.shards]
+    SessionLocal = particionamento.SessionLocal
\ No newline at end of file
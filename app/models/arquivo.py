@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, TIMESTAMP, Table
+from datetime import datetime
+from app.database import Base
+from app.models.paciente import Paciente, InformacoesPrivadas
+
+
+def _colunas_copiadas(tabela: Table, excluir=()) -> list:
+    # Mesmos nomes e tipos da tabela quente, sem chaves estrangeiras,
+    # índices nem valores padrão (as linhas chegam prontas)
+    return [Column(coluna.name, coluna.type, nullable=coluna.nullable) for coluna in tabela.columns if coluna.name not in excluir]
+
+
+# ======================================================
+# Arquivo de pacientes inativos
+# ======================================================
+# Pacientes inativos há ARQUIVO_INATIVO_DIAS saem das tabelas quentes
+# (paciente, informacoes_privadas e índices de busca) e são movidos
+# para cá, no mesmo banco (ver app/utils/arquivo.py). Assim a tabela
+# paciente e seus índices só crescem com os pacientes em uso.
+# As colunas acompanham as do Paciente automaticamente.
+class PacienteArquivado(Base):
+    __table__ = Table(
+        "paciente_arquivo",
+        Base.metadata,
+        # Mesmo ID do paciente (volta com ele na restauração)
+        Column("id", Integer, primary_key=True, autoincrement=False),
+        *_colunas_copiadas(Paciente.__table__, excluir=("id",)),
+        # Data e hora em que o paciente foi arquivado
+        Column("arquivado_em", TIMESTAMP, nullable=False, default=datetime.utcnow),
+    )
+
+
+# ======================================================
+# Informações privadas dos pacientes arquivados
+# ======================================================
+# Uma linha por paciente arquivado (o ID local de informacoes_privadas
+# não é guardado: a restauração gera um novo)
+class InformacoesPrivadasArquivadas(Base):
+    __table__ = Table(
+        "informacoes_privadas_arquivo",
+        Base.metadata,
+        Column("paciente_id", Integer, primary_key=True, autoincrement=False),
+        *_colunas_copiadas(InformacoesPrivadas.__table__, excluir=("id", "paciente_id")),
+    )
@@ -0,0 +1,58 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from app.database import Base
+
+# ======================================================
+# Índice de busca por nome (trigramas)
+# ======================================================
+# Cada nome de paciente é normalizado (minúsculas, sem acentos)
+# e quebrado em trigramas. A busca por trecho do nome consulta
+# esta tabela pelo índice em vez de varrer a tabela paciente
+# com LIKE '%...%'.
+class PacienteTrigrama(Base):
+    __tablename__ = "paciente_trigrama"
+
+    # No SQLite a tabela fica organizada pela própria chave primária
+    # (como o InnoDB do MySQL), sem uma árvore extra de rowid
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    # Trigrama do nome normalizado (ex: "joa", " jo", "  j")
+    trigrama = Column(String(3), primary_key=True)
+
+    # Paciente dono do trigrama
+    paciente_id = Column(
+        Integer,
+        ForeignKey("paciente.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True
+    )
+
+    # Quantidade total de trigramas do nome (usado no ranking:
+    # nomes mais curtos que contêm a busca são mais parecidos)
+    total = Column(Integer, nullable=False)
+
+
+# ======================================================
+# Índice invertido das listas clínicas
+# ======================================================
+# Cada item de alergias, doencas_cronicas e medicamentos_continuos
+# vira uma linha (tipo, termo normalizado, paciente). Perguntas como
+# "quem tem alergia a dipirona" percorrem só a faixa do índice daquele
+# termo, sem carregar e interpretar o JSON de todos os pacientes.
+class PacienteTermo(Base):
+    __tablename__ = "paciente_termo"
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    # Lista de origem: "alergia", "doenca" ou "medicamento"
+    tipo = Column(String(20), primary_key=True)
+
+    # Item normalizado (minúsculas, sem acentos), ex: "dipirona"
+    termo = Column(String(100), primary_key=True)
+
+    # Paciente que possui o termo
+    paciente_id = Column(
+        Integer,
+        ForeignKey("paciente.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True
+    )
\ No newline at end of file
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, JSON, TIMESTAMP
+from datetime import datetime
+from app.database import Base
+
+# ======================================================
+# Registro de alterações de pacientes (somente inserção)
+# ======================================================
+# Cada criação, alteração ou exclusão de paciente grava uma linha na
+# mesma transação da escrita. O número de sequência (seq) é crescente
+# e serve de cursor para o feed GET /pacientes/eventos: quem se
+# reconecta informa o último seq recebido e continua dali.
+class PacienteEvento(Base):
+    __tablename__ = "paciente_evento"
+
+    # Número de sequência do evento (cursor do feed)
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+
+    # Paciente alterado. Sem chave estrangeira: o evento de exclusão
+    # continua existindo depois que o paciente é removido
+    paciente_id = Column(Integer, nullable=False)
+
+    # "criado", "atualizado" ou "excluido"
+    tipo = Column(String(20), nullable=False)
+
+    # Versão do paciente após a alteração (nula na exclusão)
+    versao = Column(Integer, nullable=True)
+
+    # Nomes dos campos alterados (só em "atualizado"; nunca os valores)
+    campos = Column(JSON, nullable=True)
+
+    # Momento da alteração
+    criado_em = Column(TIMESTAMP, default=datetime.utcnow, nullable=False)
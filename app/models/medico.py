@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -19,12 +19,15 @@ class Medico(Base):
     # CRM do médico (único por profissional)
     crm = Column(String(20), unique=True, nullable=False)
 
-    # Senha de autenticação (armazenada no banco)
-    # OBS: em produção, deve ser armazenada como hash
+    # Hash scrypt da senha (ver app/security/senhas.py)
+    # Valores antigos em texto puro são convertidos no próximo login
     senha = Column(String(100), nullable=False)
 
     # E-mail do médico (único)
     email = Column(String(255), unique=True, nullable=False)
 
     # Indica se o médico está ativo no sistema
-    ativo = Column(Boolean, nullable=False, default=True)
\ No newline at end of file
+    ativo = Column(Boolean, nullable=False, default=True)
+
+    # Versão do registro: incrementada a cada alteração (ETag / If-Match do PATCH /medico/me)
+    versao = Column(Integer, nullable=False, default=1, server_default=text("1"))
\ No newline at end of file
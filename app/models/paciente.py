@@ -1,7 +1,12 @@
-from sqlalchemy import Column, Integer, String, JSON, TIMESTAMP, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, JSON, TIMESTAMP, ForeignKey, Boolean, text
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from app.database import Base
+from app.models.tipos import JSONComprimido
+
+# Grupo das colunas de histórico médico (deferred): carregadas só com
+# undefer_group(GRUPO_HISTORICO) ou no primeiro acesso a uma delas
+GRUPO_HISTORICO = "historico"
 
 # ======================================================
 # Modelo principal do Paciente
@@ -9,6 +14,10 @@ from app.database import Base
 class Paciente(Base):
     __tablename__ = "paciente"  # Nome da tabela no banco de dados
 
+    # SQLite: IDs de pacientes arquivados (que saíram desta tabela) nunca são
+    # reaproveitados por pacientes novos, como no AUTO_INCREMENT do MySQL
+    __table_args__ = {"sqlite_autoincrement": True}
+
     # Identificador único do paciente
     id = Column(Integer, primary_key=True, index=True)
 
@@ -27,6 +36,12 @@ class Paciente(Base):
     # Indica se o paciente está ativo no sistema
     ativo = Column(Boolean, default=True, nullable=False)
 
+    # Versão do registro: incrementada a cada alteração (usada no ETag)
+    versao = Column(Integer, nullable=False, default=1, server_default=text("1"))
+
+    # Data e hora da última alteração (usada no Last-Modified)
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     # Relacionamento 1:1 com InformacoesPrivadas
     # - uselist=False → garante relação um-para-um
     # - cascade="all, delete" → ao excluir o paciente, exclui os dados privados
@@ -57,11 +72,13 @@ class InformacoesPrivadas(Base):
     # Tipo sanguíneo do paciente (ex: O+, A-, AB+)
     tipo_sanguineo = Column(String(5))
 
-    # Histórico médico armazenado em JSON
-    cirurgias = Column(JSON, default=list)
-    internacoes_passadas = Column(JSON, default=list)
-    alteracoes_exames = Column(JSON, default=list)
-    historico_exames = Column(JSON, default=list)
+    # Histórico médico: listas sem limite de tamanho, gravadas comprimidas
+    # e fora do carregamento padrão (quem só precisa do tipo sanguíneo
+    # não lê nem descomprime o histórico)
+    cirurgias = deferred(Column(JSONComprimido, default=list), group=GRUPO_HISTORICO)
+    internacoes_passadas = deferred(Column(JSONComprimido, default=list), group=GRUPO_HISTORICO)
+    alteracoes_exames = deferred(Column(JSONComprimido, default=list), group=GRUPO_HISTORICO)
+    historico_exames = deferred(Column(JSONComprimido, default=list), group=GRUPO_HISTORICO)
 
     # Relacionamento inverso com Paciente
     paciente = relationship(
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+# ======================================================
+# Mapa de buckets dos shards (somente no banco principal)
+# ======================================================
+# Cada paciente pertence ao bucket id % SHARD_BUCKETS e cada bucket
+# mora em um shard. Rebalancear é mover buckets de um shard para
+# outro (app/cli/rebalancear_shards.py) e atualizar esta tabela.
+class ShardBucket(Base):
+    __tablename__ = "shard_bucket"
+
+    # Número do bucket (0 a SHARD_BUCKETS - 1)
+    bucket = Column(Integer, primary_key=True, autoincrement=False)
+
+    # Nome do shard dono do bucket (shard-1, shard-2...)
+    shard = Column(String(50), nullable=False)
+
+
+# ======================================================
+# Sequência global de IDs (somente no banco principal)
+# ======================================================
+# Com os pacientes divididos em vários bancos, o autoincremento de
+# cada shard geraria IDs repetidos. Cada processo reserva um bloco de
+# IDs aqui (SHARD_BLOCO_IDS por vez) e o usa nas inserções.
+class SequenciaId(Base):
+    __tablename__ = "sequencia_id"
+
+    # Nome da sequência ("paciente")
+    nome = Column(String(50), primary_key=True)
+
+    # Próximo ID ainda não reservado
+    proximo = Column(Integer, nullable=False)
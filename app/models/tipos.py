@@ -0,0 +1,52 @@
+# Tipos de coluna próprios do VitalKey
+
+import zlib
+from typing import Any, Optional
+
+import orjson
+from sqlalchemy import LargeBinary
+from sqlalchemy.dialects import mysql
+from sqlalchemy.types import TypeDecorator
+
+# JSON menor que isso é gravado sem compressão (o zlib de "[]" ocupa 10 bytes)
+MINIMO_COMPRESSAO = 128
+
+# Primeiro byte de um bloco zlib (nível padrão ou máximo); nenhum JSON começa com ele
+_CABECALHO_ZLIB = 0x78
+
+
+class JSONComprimido(TypeDecorator):
+    """
+    Lista/objeto JSON gravado como binário: JSON compacto (orjson),
+    comprimido com zlib quando passa de MINIMO_COMPRESSAO bytes.
+
+    A leitura identifica o formato pelo primeiro byte, então valores
+    gravados antes (texto JSON da antiga coluna JSON) continuam legíveis.
+    None é gravado como NULL.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        # BLOB do MySQL tem limite de 64 KB; os históricos não têm limite de tamanho
+        if dialect.name == "mysql":
+            return dialect.type_descriptor(mysql.LONGBLOB())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        dados = orjson.dumps(value)
+        if len(dados) < MINIMO_COMPRESSAO:
+            return dados
+        return zlib.compress(dados, 6)
+
+    def process_result_value(self, value, dialect) -> Any:
+        if value is None:
+            return None
+        if isinstance(value, str):  # Texto JSON gravado antes da compressão
+            return orjson.loads(value)
+        if value[:1] == bytes((_CABECALHO_ZLIB,)):
+            value = zlib.decompress(value)
+        return orjson.loads(value)
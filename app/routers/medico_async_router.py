@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, Response
+
+from app.models.medico import Medico
+from app.schemas.medico_schemas import MedicoResponse
+from app.security.dependencies import autenticar_medico_async
+from app.utils.respostas import etag_medico
+
+# -------------------------------------------------
+# Rotas de leitura de médicos no modo assíncrono (DB_ASYNC=true)
+# -------------------------------------------------
+router = APIRouter()
+
+# GET - Retorna os dados do médico autenticado via token
+@router.get("/medico/me", response_model=MedicoResponse)
+async def get_me(response: Response, medico: Medico = Depends(autenticar_medico_async)):
+    response.headers["ETag"] = etag_medico(medico.id, medico.versao)
+    return medico
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from typing import List
@@ -7,42 +8,96 @@ from app.database import get_db
 from app.models.medico import Medico  
 from app.schemas.medico_schemas import MedicoCreate, MedicoResponse, MedicoUpdate, MedicoAtivoUpdate  
 from app.security.auth import criar_token
-from app.security.dependencies import autenticar_medico
+from app.security.dependencies import autenticar_medico, invalidar_cache_medico
+from app.security.senhas import gerar_hash_async, verificar_senha_async
+from app.utils.atualizacao import atualizar_versionado, versao_atual
+from app.utils.consultas_frequentes import MEDICO_POR_LOGIN
+from app.utils.respostas import etag_medico, versoes_if_match, precondicao_falhou
+from app.utils.shards import conexao_principal
+from app.utils.metricas import FALHAS_AUTENTICACAO
 
 router = APIRouter()
 
 # GET - Retorna os dados do médico autenticado via token
 @router.get("/medico/me", response_model=MedicoResponse)
-def get_me(medico: Medico=Depends(autenticar_medico)):
+def get_me(response: Response, medico: Medico=Depends(autenticar_medico)):
+    # ETag usado no If-Match do PATCH /medico/me
+    response.headers["ETag"] = etag_medico(medico.id, medico.versao)
     return medico
 
 # POST - Criar um novo medico no sistema
+# O hash da senha (scrypt) roda no pool de processos, como no login;
+# as consultas ao banco, no threadpool
 @router.post("/medico", response_model=MedicoResponse, status_code=201)
-def criar_medico(medico: MedicoCreate, db: Session = Depends(get_db)):
+async def criar_medico(medico: MedicoCreate, db: Session = Depends(get_db)):
     # Verifica se já existe médico com o mesmo CRM ou e-mail
-    existente = db.query(Medico).filter((Medico.crm == medico.crm) | (Medico.email == medico.email)).first()
+    existente = await run_in_threadpool(
+        lambda: db.query(Medico).filter((Medico.crm == medico.crm) | (Medico.email == medico.email)).first()
+    )
     if existente:
         if existente.crm == medico.crm:
             raise HTTPException(status_code=400, detail="CRM já cadastrado")
         if existente.email == medico.email:
             raise HTTPException(status_code=400, detail="E-mail já cadastrado")
 
-    novo_medico = Medico(**medico.model_dump())
+    dados = medico.model_dump()
+    dados["senha"] = await gerar_hash_async(dados["senha"])  # Nunca grava a senha em texto puro
+    novo_medico = Medico(**dados)
     db.add(novo_medico)
-    db.commit()
-    db.refresh(novo_medico)
+    await run_in_threadpool(_gravar_medico, db, novo_medico)
 
     return novo_medico
 
+
+def _gravar_medico(db: Session, medico: Medico):
+    db.commit()
+    db.refresh(medico)
+
 # PATCH - Atualiza parcialmente os dados do médico autenticado
+# Com If-Match (ETag de GET /medico/me), só grava se o cadastro ainda estiver
+# nessa versão; senão retorna 412 com o ETag atual
 @router.patch("/medico/me", response_model=MedicoResponse)
-def atualizar_me(medico_update: MedicoUpdate, medico: Medico = Depends(autenticar_medico), db: Session = Depends(get_db)):
-    # Atualiza apenas os campos enviados na requisição
-    for field, value in medico_update.model_dump(exclude_unset=True).items():
-        setattr(medico, field, value)
+async def atualizar_me(medico_update: MedicoUpdate, request: Request, response: Response, medico: Medico = Depends(autenticar_medico), db: Session = Depends(get_db)):
+    versoes = versoes_if_match(request, "m", medico.id)
 
+    # Atualiza apenas os campos enviados na requisição (um UPDATE com RETURNING)
+    dados = medico_update.model_dump(exclude_unset=True)
+    if dados.get("senha") is not None:
+        dados["senha"] = await gerar_hash_async(dados["senha"])
+    return await run_in_threadpool(_atualizar_me, db, medico, dados, versoes, response)
+
+
+def _atualizar_me(db: Session, medico: Medico, dados: dict, versoes, response: Response) -> MedicoResponse:
+    atualizado = atualizar_versionado(db, conexao_principal(db), Medico, medico.id, dados, versoes)
+    if atualizado is None:
+        versao = versao_atual(db, Medico, medico.id)
+        if versao is None:
+            raise HTTPException(status_code=404, detail="Médico não encontrado")
+        raise precondicao_falhou(etag_medico(medico.id, versao))
+
+    # Monta a resposta antes do commit (que expira o objeto): sem SELECT de volta
+    resposta = MedicoResponse.model_validate(atualizado)
+    response.headers["ETag"] = etag_medico(atualizado.id, atualizado.versao)
     db.commit()
+    invalidar_cache_medico(resposta.id)
+    return resposta
+
+# PATCH - Ativa ou desativa um médico pelo ID
+# Qualquer médico autenticado pode alterar outro (como no DELETE /medico/{id}):
+# a API não tem papéis de administrador, e um médico inativo não consegue se reativar
+@router.patch("/medico/{id}/ativo", response_model=MedicoResponse)
+def atualizar_ativo_medico(id: int, status: MedicoAtivoUpdate, db: Session = Depends(get_db), _=Depends(autenticar_medico)):
+    medico = db.query(Medico).filter(Medico.id == id).first()
+
+    if not medico:
+        raise HTTPException(status_code=404, detail="Médico não encontrado")
+
+    medico.ativo = status.ativo
+    medico.versao = Medico.versao + 1  # Muda o ETag de GET /medico/me
+    db.commit()
+    invalidar_cache_medico(medico.id)
     db.refresh(medico)
+
     return medico
 
 # DELETE - Remove permanentemente um médico pelo ID
@@ -55,18 +110,32 @@ def deletar_medico(id: int, db: Session = Depends(get_db)):
 
     db.delete(medico)
     db.commit()
+    invalidar_cache_medico(id)
 
     return
 
 # POST - Autentica médico por CRM ou e-mail e retorna token JWT
+# A verificação da senha (scrypt) roda no pool de processos, sem ocupar
+# o event loop nem as threads das demais rotas
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    medico = db.query(Medico).filter((Medico.crm == form_data.username) | (Medico.email == form_data.username)).first()
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    medico = await run_in_threadpool(
+        lambda: db.execute(MEDICO_POR_LOGIN, {"login": form_data.username}).scalars().first()
+    )
 
-    if not medico or medico.senha != form_data.password:
+    correta, refazer_hash = await verificar_senha_async(form_data.password, medico.senha if medico else None)
+    if not correta:
+        FALHAS_AUTENTICACAO.incrementar("login_credenciais")
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
     if not medico.ativo:
+        FALHAS_AUTENTICACAO.incrementar("login_inativo")
         raise HTTPException(status_code=403, detail="Médico inativo")
 
+    # Senha legada (texto puro) ou parâmetros antigos: grava o hash atual
+    if refazer_hash:
+        medico.senha = await gerar_hash_async(form_data.password)
+        await run_in_threadpool(db.commit)
+        invalidar_cache_medico(medico.id)
+
     token = criar_token(medico.id)
     return {"access_token": token, "token_type": "bearer"}
\ No newline at end of file
@@ -0,0 +1,199 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+
+from app.config import LIMITE_PAGINA_PADRAO, LIMITE_PAGINA_MAXIMO, CACHE_PACIENTE_VALIDAR
+from app.database import get_async_db, AsyncSessionLocal
+from app.models.paciente import Paciente, GRUPO_HISTORICO
+from app.schemas.paciente_schemas import PacienteBase, PacienteResponse
+from app.schemas.paciente_schemas import PacientesLoteResponse, PacientesPrivadosLoteResponse
+from app.security.dependencies import autenticar_medico_async
+from app.routers.paciente_router import TAMANHO_LOTE_STREAMING, DESCRICAO_FIELDS, _validar_ids_lote, _montar_lote, _pagina_pacientes, _criterios_termos
+from app.utils.busca import buscar_pacientes_por_nome_async
+from app.utils.campos import Projecao, projecao_paciente
+from app.utils.termos import select_pacientes_por_termos
+from app.utils.consultas_frequentes import PACIENTE_POR_ID, PACIENTE_PRIVADO_POR_ID, PACIENTES_ATIVOS_PAGINA, VERSAO_PACIENTE_POR_ID
+from app.utils.serializacao import paciente_publico, paciente_completo, para_json, resposta_json
+from app.utils.respostas import obter_resposta_publica, guardar_resposta_publica, conferir_resposta_publica, responder_condicional, etag_paciente
+
+# -------------------------------------------------
+# Rotas de leitura de pacientes no modo assíncrono (DB_ASYNC=true)
+# -------------------------------------------------
+# Mesmos caminhos e respostas do paciente_router, mas usando AsyncSession.
+# São registradas antes do router síncrono, que continua atendendo as escritas.
+router = APIRouter()
+
+# GET - Pesquisa pacientes ativos por ID e/ou nome (ou lista todos, paginado, se não houver filtros)
+@router.get("/pacientes", response_model=List[PacienteBase])
+async def pesquisar_pacientes(
+    id: Optional[int] = None,
+    nome: Optional[str] = None,
+    cursor: Optional[int] = Query(None, ge=0, description="Último ID recebido na página anterior"),
+    limite: Optional[int] = Query(None, ge=1, le=LIMITE_PAGINA_MAXIMO, description="Tamanho máximo da página"),
+    formato: str = Query("json", pattern="^(json|ndjson)$", description="json (página) ou ndjson (streaming)"),
+    fields: Optional[str] = Query(None, description=DESCRICAO_FIELDS),
+    db: AsyncSession = Depends(get_async_db)
+):
+    projecao = projecao_paciente(fields)
+
+    if formato == "ndjson":
+        return StreamingResponse(
+            _gerar_ndjson_pacientes(id, nome, cursor, limite, projecao),
+            media_type="application/x-ndjson"
+        )
+
+    limite = limite or LIMITE_PAGINA_PADRAO
+    serializar = projecao.serializar if projecao else paciente_publico
+
+    if nome:
+        opcoes = projecao.opcoes("nome") if projecao else ()
+        return resposta_json([serializar(p) for p in await buscar_pacientes_por_nome_async(db, nome, limite, id, opcoes)])
+
+    if id is None:
+        consulta = PACIENTES_ATIVOS_PAGINA.options(*projecao.opcoes()) if projecao else PACIENTES_ATIVOS_PAGINA
+        resultado = await db.execute(consulta, {"cursor": cursor or 0, "limite": limite + 1})
+    else:
+        resultado = await db.execute(_select_pacientes(id, cursor, projecao).limit(limite + 1))
+
+    return _pagina_pacientes(resultado.scalars().all(), limite, serializar)
+
+
+def _select_pacientes(id: Optional[int], cursor: Optional[int], projecao: Optional[Projecao] = None):
+    """
+    Equivalente a _consultar_pacientes do router síncrono, em estilo select().
+    """
+    stmt = select(Paciente).where(Paciente.ativo == True)
+
+    if projecao:
+        stmt = stmt.options(*projecao.opcoes())
+
+    if id is not None:
+        stmt = stmt.where(Paciente.id == id)
+    if cursor is not None:
+        stmt = stmt.where(Paciente.id > cursor)
+
+    return stmt.order_by(Paciente.id)
+
+
+async def _gerar_ndjson_pacientes(id: Optional[int], nome: Optional[str], cursor: Optional[int], limite: Optional[int], projecao: Optional[Projecao] = None):
+    """
+    Gera os pacientes em NDJSON lendo o banco em lotes com AsyncSession.stream.
+    """
+    serializar = projecao.serializar if projecao else paciente_publico
+    async with AsyncSessionLocal() as db:
+        if nome:
+            opcoes = projecao.opcoes("nome") if projecao else ()
+            for paciente in await buscar_pacientes_por_nome_async(db, nome, limite or LIMITE_PAGINA_MAXIMO, id, opcoes):
+                yield para_json(serializar(paciente)) + b"\n"
+            return
+
+        stmt = _select_pacientes(id, cursor, projecao)
+        if limite:
+            stmt = stmt.limit(limite)
+
+        resultado = await db.stream(stmt.execution_options(yield_per=TAMANHO_LOTE_STREAMING))
+        async for paciente in resultado.scalars():
+            yield para_json(serializar(paciente)) + b"\n"
+
+# GET - Pesquisa pacientes ativos por alergias, doenças crônicas e medicamentos (índice invertido)
+@router.get("/pacientes/termos", response_model=List[PacienteBase])
+async def pesquisar_por_termos(
+    alergia: List[str] = Query([], description="Alergia (repita o parâmetro para vários termos; 'termo*' busca por prefixo)"),
+    doenca: List[str] = Query([], description="Doença crônica"),
+    medicamento: List[str] = Query([], description="Medicamento contínuo"),
+    modo: str = Query("e", pattern="^(e|ou)$", description="e: todos os termos; ou: qualquer um dos termos"),
+    cursor: Optional[int] = Query(None, ge=0, description="Último ID recebido na página anterior"),
+    limite: Optional[int] = Query(None, ge=1, le=LIMITE_PAGINA_MAXIMO, description="Tamanho máximo da página"),
+    fields: Optional[str] = Query(None, description=DESCRICAO_FIELDS),
+    db: AsyncSession = Depends(get_async_db)
+):
+    criterios = _criterios_termos(alergia, doenca, medicamento)
+    limite = limite or LIMITE_PAGINA_PADRAO
+    projecao = projecao_paciente(fields)
+
+    consulta = select_pacientes_por_termos(criterios, modo == "e", cursor).limit(limite + 1)
+    if projecao:
+        consulta = consulta.options(*projecao.opcoes())
+    resultado = await db.execute(consulta)
+
+    return _pagina_pacientes(resultado.scalars().all(), limite, projecao.serializar if projecao else paciente_publico)
+
+# GET público em lote - Retorna informações básicas de vários pacientes em uma única consulta
+@router.get("/pacientes/lote", response_model=PacientesLoteResponse)
+async def get_pacientes_publico_lote(
+    ids: List[int] = Query(..., description="IDs dos pacientes (?ids=1&ids=2)"),
+    fields: Optional[str] = Query(None, description=DESCRICAO_FIELDS),
+    db: AsyncSession = Depends(get_async_db)
+):
+    ids = _validar_ids_lote(ids)
+    projecao = projecao_paciente(fields)
+    stmt = select(Paciente).where(Paciente.id.in_(ids))
+    if projecao:
+        stmt = stmt.options(*projecao.opcoes())
+    resultado = await db.execute(stmt)
+
+    return resposta_json(_montar_lote(ids, resultado.scalars().all(), projecao.serializar if projecao else paciente_publico))
+
+# GET privado em lote - Retorna informações completas de vários pacientes, precisa de token
+@router.get("/pacientes/lote/privado", response_model=PacientesPrivadosLoteResponse)
+async def get_pacientes_privado_lote(
+    ids: List[int] = Query(..., description="IDs dos pacientes (?ids=1&ids=2)"),
+    fields: Optional[str] = Query(None, description=DESCRICAO_FIELDS + "; informacoes_privadas.<campo> escolhe campos das informações privadas"),
+    db: AsyncSession = Depends(get_async_db),
+    medico=Depends(autenticar_medico_async)
+):
+    ids = _validar_ids_lote(ids)
+    projecao = projecao_paciente(fields, privado=True)
+    if projecao:
+        resultado = await db.execute(select(Paciente).options(*projecao.opcoes()).where(Paciente.id.in_(ids)))
+        return resposta_json(_montar_lote(ids, resultado.scalars().all(), projecao.serializar))
+
+    resultado = await db.execute(
+        select(Paciente)
+        .options(selectinload(Paciente.informacoes_privadas).undefer_group(GRUPO_HISTORICO))
+        .where(Paciente.id.in_(ids))
+    )
+
+    return resposta_json(_montar_lote(ids, resultado.scalars().all(), paciente_completo))
+
+# GET público - Retorna informações básicas de um paciente específico
+@router.get("/paciente/{paciente_id}", response_model=PacienteBase)
+async def get_paciente_publico(paciente_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    resposta = obter_resposta_publica(int(paciente_id))
+    if resposta is not None and CACHE_PACIENTE_VALIDAR:
+        # Outro worker pode ter alterado o paciente: confere só a versão
+        versao = (await db.execute(VERSAO_PACIENTE_POR_ID, {"id": int(paciente_id)})).scalar()
+        resposta = conferir_resposta_publica(int(paciente_id), resposta, versao)
+    if resposta is None:
+        resultado = await db.execute(PACIENTE_POR_ID, {"id": int(paciente_id)})
+        paciente = resultado.scalars().first()
+        if not paciente:
+            raise HTTPException(status_code=404, detail="Paciente não encontrado")
+        resposta = guardar_resposta_publica(paciente)
+
+    return responder_condicional(request, resposta)
+
+# GET privado - Retorna informações completas, precisa de token
+@router.get("/paciente/{paciente_id}/privado", response_model=PacienteResponse)
+async def get_paciente_privado(
+    paciente_id: str,
+    fields: Optional[str] = Query(None, description=DESCRICAO_FIELDS + "; informacoes_privadas.<campo> escolhe campos das informações privadas"),
+    db: AsyncSession = Depends(get_async_db),
+    medico=Depends(autenticar_medico_async)
+):
+    # No modo assíncrono não há lazy load: as informações privadas vêm junto (joinedload)
+    projecao = projecao_paciente(fields, privado=True)
+    if projecao:
+        # A versão é lida sempre: o ETag serve ao If-Match do PATCH
+        resultado = await db.execute(select(Paciente).options(*projecao.opcoes("versao")).where(Paciente.id == int(paciente_id)))
+    else:
+        resultado = await db.execute(PACIENTE_PRIVADO_POR_ID, {"id": int(paciente_id)})
+    paciente = resultado.scalars().first()
+    if not paciente:
+        raise HTTPException(status_code=404, detail="Paciente não encontrado")
+
+    serializar = projecao.serializar if projecao else paciente_completo
+    return resposta_json(serializar(paciente), headers={"ETag": etag_paciente(paciente.id, paciente.versao)})
@@ -1,51 +1,445 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from itertools import islice
+from operator import attrgetter
 from typing import List, Optional
-from sqlalchemy import text
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
 
-from app.database import get_db  # função que retorna a sessão do SQLAlchemy
-from app.models.paciente import Paciente, InformacoesPrivadas  # SQLAlchemy models
+from app.config import LIMITE_PAGINA_PADRAO, LIMITE_PAGINA_MAXIMO, LIMITE_LOTE_IDS, CACHE_PACIENTE_VALIDAR
+from app.database import get_db, SessionLocal, engines_pacientes, particionamento  # função que retorna a sessão do SQLAlchemy
+from app.models.paciente import Paciente, InformacoesPrivadas, GRUPO_HISTORICO  # SQLAlchemy models
 from app.schemas.paciente_schemas import PacienteBase, PacienteResponse, PacienteUpdate, PacienteAtivoUpdate, PacienteCreate
+from app.schemas.paciente_schemas import PacientesLoteResponse, PacientesPrivadosLoteResponse, PacientesExcluidosResponse
+from app.schemas.paciente_schemas import PacienteAtivoResponse, PacienteArquivadoResponse, CartaoEmergenciaEmitido, CartaoEmergenciaResponse
+from app.schemas.paciente_schemas import CampoHistorico
 from app.security.dependencies import autenticar_medico
+from app.security.cartao import CABECALHO_CARTAO, emitir_cartao, ler_cartao
+from app.utils.busca import buscar_pacientes_por_nome, indexar_nomes, normalizar_texto, chave_relevancia
+from app.utils.termos import TIPOS_TERMO, CURINGA, indexar_termos, listas_clinicas, select_pacientes_por_termos
+from app.utils.importacao import ImportadorPacientes
+from app.utils.exportacao import exportar_pacientes
+from app.utils.eventos import CRIADO, ATUALIZADO, EXCLUIDO, registrar_evento, registrar_eventos_excluidos, notificar_eventos, assinantes_disponiveis, gerar_sse
+from app.utils.arquivo import ler_arquivado, restaurar_paciente, purgar_pacientes
+from app.utils.consultas_frequentes import PACIENTE_POR_ID, PACIENTE_PRIVADO_POR_ID, PACIENTES_ATIVOS_PAGINA, VERSAO_PACIENTE_POR_ID
+from app.utils.serializacao import paciente_publico, paciente_completo, para_json, resposta_json
+from app.utils.respostas import obter_resposta_publica, guardar_resposta_publica, conferir_resposta_publica, invalidar_resposta_publica, responder_condicional
+from app.utils.respostas import etag_paciente, versoes_if_match, precondicao_falhou
+from app.utils.atualizacao import atualizar_versionado, atualizar_informacoes_privadas, informacoes_privadas_completas, versao_atual
+from app.utils.shards import conexao_do_paciente
+from app.utils.campos import Projecao, projecao_paciente
 
 router = APIRouter()
 
-# GET - Pesquisa pacientes ativos por ID e/ou nome (ou retorna todos se não houver filtros)
+# Quantidade de linhas lidas do banco por vez no modo streaming
+TAMANHO_LOTE_STREAMING = 500
+
+# Quantidade máxima de termos em GET /pacientes/termos
+MAXIMO_TERMOS = 20
+
+# Ordem das páginas por cursor (mescla dos resultados dos shards)
+_por_id = attrgetter("id")
+
+DESCRICAO_FIELDS = "Campos da resposta, separados por vírgula (ex: id,nome); só eles são lidos do banco"
+
+# GET - Pesquisa pacientes ativos por ID e/ou nome (ou lista todos, paginado, se não houver filtros)
 @router.get("/pacientes", response_model=List[PacienteBase])
-def pesquisar_pacientes(id: Optional[int] = None, nome: Optional[str] = None, db: Session = Depends(get_db)
+def pesquisar_pacientes(
+    id: Optional[int] = None,
+    nome: Optional[str] = None,
+    cursor: Optional[int] = Query(None, ge=0, description="Último ID recebido na página anterior"),
+    limite: Optional[int] = Query(None, ge=1, le=LIMITE_PAGINA_MAXIMO, description="Tamanho máximo da página"),
+    formato: str = Query("json", pattern="^(json|ndjson)$", description="json (página) ou ndjson (streaming)"),
+    fields: Optional[str] = Query(None, description=DESCRICAO_FIELDS),
+    db: Session = Depends(get_db)
 ):
     """
     Pesquisa pacientes ativos por ID e/ou nome.
-    Se nenhum parâmetro for informado, retorna todos os pacientes ativos.
+    Se nenhum parâmetro for informado, lista todos os pacientes ativos.
+
+    A busca por nome ignora acentos e maiúsculas/minúsculas
+    e retorna os pacientes ordenados por relevância.
+
+    A listagem é paginada por cursor (keyset em Paciente.id):
+    o cabeçalho X-Proximo-Cursor traz o valor a ser enviado
+    em `cursor` para obter a próxima página.
+
+    Com formato=ndjson o resultado é enviado em streaming,
+    um paciente por linha, sem montar a lista em memória.
+
+    Com shards, as buscas sem ID consultam todos os shards em
+    paralelo e mesclam os resultados na mesma ordem.
+
+    Com fields, só os campos pedidos são lidos e enviados.
+    """
+    projecao = projecao_paciente(fields)
+
+    if formato == "ndjson":
+        # O streaming usa uma sessão própria, que vive enquanto o corpo é enviado
+        return StreamingResponse(
+            _gerar_ndjson_pacientes(id, nome, cursor, limite, projecao),
+            media_type="application/x-ndjson"
+        )
+
+    limite = limite or LIMITE_PAGINA_PADRAO
+    serializar = projecao.serializar if projecao else paciente_publico
+
+    # Busca por nome usa o índice de trigramas e retorna por relevância (sem cursor)
+    if nome:
+        return resposta_json([serializar(p) for p in _buscar_por_nome(db, nome, limite, id, projecao)])
+
+    # Busca um registro a mais para saber se existe próxima página
+    if id is None:
+        # Listagem sem filtros (a mais frequente): consulta pré-montada
+        consulta = PACIENTES_ATIVOS_PAGINA.options(*projecao.opcoes()) if projecao else PACIENTES_ATIVOS_PAGINA
+        parametros = {"cursor": cursor or 0, "limite": limite + 1}
+        if particionamento is not None:
+            # A mesma página em cada shard; a mescla por ID mantém o cursor global
+            pacientes = particionamento.consultar(
+                lambda shard: shard.execute(consulta, parametros).scalars().all(), _por_id, limite + 1
+            )
+        else:
+            pacientes = db.execute(consulta, parametros).scalars().all()
+    else:
+        pacientes = _consultar_pacientes(db, id, cursor, projecao).limit(limite + 1).all()
+
+    return _pagina_pacientes(pacientes, limite, serializar)
+
+
+def _buscar_por_nome(db: Session, nome: str, limite: int, id: Optional[int], projecao: Optional[Projecao] = None) -> List[Paciente]:
+    """
+    Busca por nome. Com shards e sem ID, busca em todos os shards em
+    paralelo e mescla os resultados pela ordem de relevância.
+    """
+    # O nome é lido mesmo fora de fields: a ordem por relevância depende dele
+    opcoes = projecao.opcoes("nome") if projecao else ()
+    if particionamento is None or id is not None:
+        return buscar_pacientes_por_nome(db, nome, limite, id, opcoes)
+    return particionamento.consultar(lambda shard: buscar_pacientes_por_nome(shard, nome, limite, opcoes=opcoes), chave_relevancia(nome), limite)
+
+
+def _pagina_pacientes(pacientes: List[Paciente], limite: int, serializar=paciente_publico):
+    """
+    Recebe até limite + 1 pacientes e monta a página, com o
+    cabeçalho X-Proximo-Cursor se houver mais registros.
+    """
+    cabecalhos = {}
+    if len(pacientes) > limite:
+        pacientes = pacientes[:limite]
+        cabecalhos["X-Proximo-Cursor"] = str(pacientes[-1].id)
+
+    return resposta_json([serializar(p) for p in pacientes], headers=cabecalhos)
+
+
+def _consultar_pacientes(db: Session, id: Optional[int], cursor: Optional[int], projecao: Optional[Projecao] = None):
+    """
+    Monta a consulta de pacientes ativos com os filtros informados,
+    ordenada por ID para permitir paginação por cursor.
     """
-    
     query = db.query(Paciente).filter(Paciente.ativo == True) # Considera apenas pacientes ativos na pesquisa
 
+    if projecao:
+        query = query.options(*projecao.opcoes())
+
     if id is not None:
         query = query.filter(Paciente.id == id)
-    if nome:
-        query = query.filter(Paciente.nome.ilike(f"%{nome}%"))
+    if cursor is not None:
+        query = query.filter(Paciente.id > cursor)
+
+    return query.order_by(Paciente.id)
+
+
+def _gerar_ndjson_pacientes(id: Optional[int], nome: Optional[str], cursor: Optional[int], limite: Optional[int], projecao: Optional[Projecao] = None):
+    """
+    Gera os pacientes em NDJSON, lendo o banco em lotes (yield_per)
+    e serializando um registro por vez, com uso de memória constante.
+    """
+    db = SessionLocal()
+    try:
+        if nome:
+            # Resultado ranqueado da busca por nome (já limitado)
+            pacientes = _buscar_por_nome(db, nome, limite or LIMITE_PAGINA_MAXIMO, id, projecao)
+        elif particionamento is not None and id is None:
+            # Um cursor por shard, mesclados por ID à medida que o corpo é enviado
+            def consultar_shard(shard: Session):
+                query = _consultar_pacientes(shard, None, cursor, projecao)
+                return (query.limit(limite) if limite else query).yield_per(TAMANHO_LOTE_STREAMING)
+
+            pacientes = islice(particionamento.iterar(consultar_shard, _por_id), limite)
+        else:
+            query = _consultar_pacientes(db, id, cursor, projecao)
+            if limite:
+                query = query.limit(limite)
+            pacientes = query.yield_per(TAMANHO_LOTE_STREAMING)
+
+        serializar = projecao.serializar if projecao else paciente_publico
+        for paciente in pacientes:
+            yield para_json(serializar(paciente)) + b"\n"
+    finally:
+        db.close()
+
+# GET - Pesquisa pacientes ativos por alergias, doenças crônicas e medicamentos (índice invertido)
+@router.get("/pacientes/termos", response_model=List[PacienteBase])
+def pesquisar_por_termos(
+    alergia: List[str] = Query([], description="Alergia (repita o parâmetro para vários termos; 'termo*' busca por prefixo)"),
+    doenca: List[str] = Query([], description="Doença crônica"),
+    medicamento: List[str] = Query([], description="Medicamento contínuo"),
+    modo: str = Query("e", pattern="^(e|ou)$", description="e: todos os termos; ou: qualquer um dos termos"),
+    cursor: Optional[int] = Query(None, ge=0, description="Último ID recebido na página anterior"),
+    limite: Optional[int] = Query(None, ge=1, le=LIMITE_PAGINA_MAXIMO, description="Tamanho máximo da página"),
+    fields: Optional[str] = Query(None, description=DESCRICAO_FIELDS),
+    db: Session = Depends(get_db)
+):
+    """
+    Pesquisa pacientes ativos pelos itens das listas clínicas,
+    ignorando acentos e maiúsculas/minúsculas.
+
+    Ex: /pacientes/termos?alergia=dipirona&medicamento=varfarina&modo=ou
+
+    Cada termo é uma faixa do índice paciente_termo; os termos são
+    combinados com INTERSECT (modo=e) ou UNION (modo=ou) no banco.
+    Paginado por cursor, como GET /pacientes.
+    """
+    criterios = _criterios_termos(alergia, doenca, medicamento)
+    limite = limite or LIMITE_PAGINA_PADRAO
+    projecao = projecao_paciente(fields)
+
+    consulta = select_pacientes_por_termos(criterios, modo == "e", cursor).limit(limite + 1)
+    if projecao:
+        consulta = consulta.options(*projecao.opcoes())
+    if particionamento is not None:
+        pacientes = particionamento.consultar(lambda shard: shard.execute(consulta).scalars().all(), _por_id, limite + 1)
+    else:
+        pacientes = db.execute(consulta).scalars().all()
+
+    return _pagina_pacientes(pacientes, limite, projecao.serializar if projecao else paciente_publico)
+
+
+def _criterios_termos(alergia: List[str], doenca: List[str], medicamento: List[str]) -> List[tuple]:
+    """
+    Junta os termos em pares (tipo, termo) e valida a quantidade.
+    """
+    criterios = [
+        (tipo, termo)
+        for tipo, termos in (("alergia", alergia), ("doenca", doenca), ("medicamento", medicamento))
+        for termo in termos
+        if normalizar_texto(termo.rstrip(CURINGA))
+    ]
+    if not criterios:
+        raise HTTPException(status_code=400, detail="Informe ao menos um termo (alergia, doenca ou medicamento)")
+    if len(criterios) > MAXIMO_TERMOS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MAXIMO_TERMOS} termos por consulta")
+    return criterios
+
+# GET - Exporta todos os pacientes com informações privadas (backup / migração), precisa de token
+@router.get("/pacientes/exportar")
+def exportar(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(False, description="Comprime a resposta em gzip"),
+    desde_id: int = Query(0, ge=0, description="Retoma a exportação após este ID"),
+    arquivados: bool = Query(True, description="Inclui os pacientes arquivados (inativos)"),
+    medico=Depends(autenticar_medico)
+):
+    """
+    Exporta pacientes (ativos, inativos e arquivados) junto com as informações
+    privadas, em streaming e com memória constante. Para retomar uma exportação
+    interrompida, envie em desde_id o último ID recebido.
+    """
+    nome_arquivo = f"pacientes.{formato}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        exportar_pacientes(engines_pacientes, formato, gzip, desde_id, incluir_arquivados=arquivados),
+        media_type="application/gzip" if gzip else ("text/csv" if formato == "csv" else "application/x-ndjson"),
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}"'}
+    )
+
+# GET - Feed de alterações de pacientes (Server-Sent Events), precisa de token
+@router.get("/pacientes/eventos")
+async def eventos_pacientes(
+    request: Request,
+    desde: Optional[int] = Query(None, ge=0, description="Último seq recebido (o cabeçalho Last-Event-ID tem prioridade)"),
+    db: Session = Depends(get_db),
+    medico=Depends(autenticar_medico)
+):
+    """
+    Envia em text/event-stream cada criação, alteração e exclusão de
+    paciente (id = seq do evento, sem dados clínicos). Com desde ou
+    Last-Event-ID, reenvia antes os eventos perdidos desde aquele seq.
+    Substitui a consulta periódica de GET /pacientes pelas telas abertas.
+    """
+    ultimo_id = request.headers.get("last-event-id")
+    if ultimo_id:
+        if not ultimo_id.isdigit():
+            raise HTTPException(status_code=400, detail="Last-Event-ID inválido")
+        desde = int(ultimo_id)
+
+    if not assinantes_disponiveis():
+        raise HTTPException(status_code=503, detail="Limite de conexões no feed de eventos atingido", headers={"Retry-After": "5"})
+
+    # Devolve ao pool a conexão usada na autenticação: o stream pode ficar aberto por horas
+    await run_in_threadpool(db.close)
+
+    return StreamingResponse(
+        gerar_sse(desde),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # sem buffer em proxies (nginx)
+    )
 
-    return query.all()
+# GET público em lote - Retorna informações básicas de vários pacientes em uma única consulta
+@router.get("/pacientes/lote", response_model=PacientesLoteResponse)
+def get_pacientes_publico_lote(
+    ids: List[int] = Query(..., description="IDs dos pacientes (?ids=1&ids=2)"),
+    fields: Optional[str] = Query(None, description=DESCRICAO_FIELDS),
+    db: Session = Depends(get_db)
+):
+    ids = _validar_ids_lote(ids)
+    projecao = projecao_paciente(fields)
+    query = db.query(Paciente).filter(Paciente.id.in_(ids))
+    if projecao:
+        query = query.options(*projecao.opcoes())
+
+    return resposta_json(_montar_lote(ids, query.all(), projecao.serializar if projecao else paciente_publico))
+
+# GET privado em lote - Retorna informações completas de vários pacientes, precisa de token
+@router.get("/pacientes/lote/privado", response_model=PacientesPrivadosLoteResponse)
+def get_pacientes_privado_lote(
+    ids: List[int] = Query(..., description="IDs dos pacientes (?ids=1&ids=2)"),
+    fields: Optional[str] = Query(None, description=DESCRICAO_FIELDS + "; informacoes_privadas.<campo> escolhe campos das informações privadas"),
+    db: Session = Depends(get_db),
+    medico=Depends(autenticar_medico)
+):
+    ids = _validar_ids_lote(ids)
+    projecao = projecao_paciente(fields, privado=True)
+    if projecao:
+        pacientes = db.query(Paciente).options(*projecao.opcoes()).filter(Paciente.id.in_(ids)).all()
+        return resposta_json(_montar_lote(ids, pacientes, projecao.serializar))
+
+    # selectinload carrega todas as informações privadas (com o histórico, que é
+    # deferred) em uma segunda consulta (IN), evitando uma consulta por paciente
+    # durante a serialização
+    pacientes = (
+        db.query(Paciente)
+        .options(selectinload(Paciente.informacoes_privadas).undefer_group(GRUPO_HISTORICO))
+        .filter(Paciente.id.in_(ids))
+        .all()
+    )
+
+    return resposta_json(_montar_lote(ids, pacientes, paciente_completo))
+
+
+def _validar_ids_lote(ids: List[int]) -> List[int]:
+    """
+    Remove IDs repetidos (mantendo a ordem) e aplica o limite do lote.
+    """
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > LIMITE_LOTE_IDS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {LIMITE_LOTE_IDS} IDs por consulta")
+    return ids
+
+
+def _montar_lote(ids: List[int], pacientes: List[Paciente], serializar) -> dict:
+    """
+    Ordena os pacientes na ordem pedida e lista os IDs não encontrados.
+    """
+    por_id = {paciente.id: paciente for paciente in pacientes}
+    return {
+        "pacientes": [serializar(por_id[id]) for id in ids if id in por_id],
+        "nao_encontrados": [id for id in ids if id not in por_id],
+    }
 
 # GET público - Retorna informações básicas de um paciente específico
 @router.get("/paciente/{paciente_id}", response_model=PacienteBase)
-def get_paciente_publico(paciente_id: str, db: Session = Depends(get_db)):
-    paciente = db.query(Paciente).filter(Paciente.id == int(paciente_id)).first()
-    if not paciente:
-        raise HTTPException(status_code=404, detail="Paciente não encontrado")
+def get_paciente_publico(paciente_id: str, request: Request, db: Session = Depends(get_db)):
+    """
+    Rota mais acessada (leitura de cartões em emergências).
+    O JSON fica em cache já serializado e a resposta traz ETag/Last-Modified:
+    com If-None-Match igual à versão atual, retorna 304 sem corpo.
+    """
+    resposta = obter_resposta_publica(int(paciente_id))
+    if resposta is not None and CACHE_PACIENTE_VALIDAR:
+        # Outro worker pode ter alterado o paciente: confere só a versão
+        versao = db.execute(VERSAO_PACIENTE_POR_ID, {"id": int(paciente_id)}).scalar()
+        resposta = conferir_resposta_publica(int(paciente_id), resposta, versao)
+    if resposta is None:
+        paciente = db.execute(PACIENTE_POR_ID, {"id": int(paciente_id)}).scalars().first()
+        if not paciente:
+            raise HTTPException(status_code=404, detail="Paciente não encontrado")
+        resposta = guardar_resposta_publica(paciente)
 
-    return paciente
+    return responder_condicional(request, resposta)
 
 # GET privado - Retorna informações completas, precisa de token
 @router.get("/paciente/{paciente_id}/privado", response_model=PacienteResponse)
-def get_paciente_privado(paciente_id: str, db: Session = Depends(get_db), medico=Depends(autenticar_medico)):
-    paciente = db.query(Paciente).filter(Paciente.id == int(paciente_id)).first()
+def get_paciente_privado(
+    paciente_id: str,
+    fields: Optional[str] = Query(None, description=DESCRICAO_FIELDS + "; informacoes_privadas.<campo> escolhe campos das informações privadas"),
+    db: Session = Depends(get_db),
+    medico=Depends(autenticar_medico)
+):
+    # Paciente e informações privadas em uma única consulta (joinedload, sem lazy load)
+    projecao = projecao_paciente(fields, privado=True)
+    if projecao:
+        # A versão é lida sempre: o ETag serve ao If-Match do PATCH
+        consulta = select(Paciente).options(*projecao.opcoes("versao")).where(Paciente.id == int(paciente_id))
+        paciente = db.execute(consulta).scalars().first()
+    else:
+        paciente = db.execute(PACIENTE_PRIVADO_POR_ID, {"id": int(paciente_id)}).scalars().first()
+    if not paciente:
+        raise HTTPException(status_code=404, detail="Paciente não encontrado")
+
+    serializar = projecao.serializar if projecao else paciente_completo
+    return resposta_json(serializar(paciente), headers={"ETag": etag_paciente(paciente.id, paciente.versao)})
+
+# GET privado - Uma página de uma lista do histórico médico (ex: exames), precisa de token
+@router.get("/paciente/{paciente_id}/historico/{campo}", response_model=List[str])
+def get_historico_paciente(
+    paciente_id: int,
+    campo: CampoHistorico,
+    cursor: int = Query(0, ge=0, description="Posição do primeiro item (X-Proximo-Cursor da página anterior)"),
+    limite: int = Query(LIMITE_PAGINA_PADRAO, ge=1, le=LIMITE_PAGINA_MAXIMO, description="Tamanho máximo da página"),
+    db: Session = Depends(get_db),
+    medico=Depends(autenticar_medico)
+):
+    """
+    Lê (e descomprime) só a coluna pedida, sem o resto do histórico, e
+    envia apenas a página: itens [cursor, cursor + limite) na ordem gravada.
+    O cabeçalho X-Total-Itens traz o tamanho da lista e X-Proximo-Cursor,
+    se houver mais itens, o cursor da próxima página.
+    """
+    coluna = getattr(InformacoesPrivadas, campo)
+    linha = db.execute(select(coluna).where(InformacoesPrivadas.paciente_id == paciente_id)).first()
+    if linha is None and versao_atual(db, Paciente, paciente_id) is None:
+        raise HTTPException(status_code=404, detail="Paciente não encontrado")
+
+    itens = (linha[0] if linha else None) or []
+    cabecalhos = {"X-Total-Itens": str(len(itens))}
+    if cursor + limite < len(itens):
+        cabecalhos["X-Proximo-Cursor"] = str(cursor + limite)
+
+    return resposta_json(itens[cursor:cursor + limite], headers=cabecalhos)
+
+# GET público - Cartão de emergência assinado com os dados públicos do paciente
+@router.get("/paciente/{paciente_id}/cartao", response_model=CartaoEmergenciaEmitido)
+def get_cartao_emergencia(paciente_id: int, db: Session = Depends(get_db)):
+    """
+    O mesmo cartão enquanto o paciente não mudar de versão (as rotas de
+    escrita devolvem o novo no cabeçalho X-Cartao-Emergencia).
+    """
+    paciente = db.execute(PACIENTE_POR_ID, {"id": paciente_id}).scalars().first()
     if not paciente:
         raise HTTPException(status_code=404, detail="Paciente não encontrado")
 
-    return paciente
+    resposta = {"id": paciente.id, "versao": paciente.versao, "cartao": emitir_cartao(paciente)}
+    return resposta_json(resposta, headers={"ETag": etag_paciente(paciente.id, paciente.versao)})
+
+# GET público - Confere o cartão de emergência e devolve os dados, sem acessar o banco
+# (async e sem sessão: não ocupa o threadpool nem uma conexão do pool)
+@router.get("/cartao/{cartao}", response_model=CartaoEmergenciaResponse)
+async def verificar_cartao_emergencia(cartao: str):
+    return resposta_json(ler_cartao(cartao))
 
 # POST - Cria um novo paciente e, opcionalmente, suas informações privadas
 @router.post("/paciente", response_model=PacienteResponse)
@@ -75,53 +469,179 @@ def criar_paciente(paciente: PacienteCreate, db: Session = Depends(get_db)):
         # Faz a ligação automática pelo relationship
         novo_paciente.informacoes_privadas = info_privada
 
+    # Com shards, o ID vem da sequência global e define o shard do paciente
+    if particionamento is not None:
+        novo_paciente.id = particionamento.novos_ids(1)[0]
+
     # Adiciona e comita no banco
     db.add(novo_paciente)
+    db.flush()  # Gera o ID para indexar o nome na mesma transação
+    indexar_nomes(db, [(novo_paciente.id, novo_paciente.nome)], novos=True)
+    indexar_termos(db, [(novo_paciente.id, listas_clinicas(novo_paciente))], novos=True)
+    registrar_evento(db, novo_paciente.id, CRIADO, novo_paciente.versao)
+    paciente_id = novo_paciente.id
     db.commit()
-    db.refresh(novo_paciente)  # Atualiza o objeto com o ID gerado pelo banco
+    notificar_eventos()
+
+    # Relê como o banco gravou, com as informações privadas e o histórico em uma consulta
+    novo_paciente = db.execute(PACIENTE_PRIVADO_POR_ID, {"id": paciente_id}).scalars().first()
+
+    return resposta_json(paciente_completo(novo_paciente), headers={CABECALHO_CARTAO: emitir_cartao(novo_paciente)})
+
+# POST - Importa pacientes em massa (NDJSON: um PacienteCreate por linha)
+@router.post("/pacientes/importar")
+async def importar_pacientes(request: Request, db: Session = Depends(get_db), medico=Depends(autenticar_medico)):
+    """
+    Importa pacientes enviados no corpo como NDJSON.
+
+    O corpo é lido em streaming e as linhas são gravadas em lotes
+    (executemany + commit por lote). Retorna quantos pacientes foram
+    inseridos e os erros encontrados, por número de linha.
+    """
+    importador = ImportadorPacientes(db)
 
-    return novo_paciente
+    resto = b""
+    async for bloco in request.stream():
+        linhas = (resto + bloco).split(b"\n")
+        resto = linhas.pop()  # Última linha pode estar incompleta
+        if linhas:
+            # Validação e gravação rodam fora do event loop
+            await run_in_threadpool(importador.processar_linhas, linhas)
+
+    if resto:
+        await run_in_threadpool(importador.processar_linhas, [resto])
+
+    return await run_in_threadpool(importador.finalizar)
 
 # PATCH - Atualiza parcialmente um paciente e suas informações privadas
 @router.patch("/paciente/{id}", response_model=PacienteResponse)
-def atualizar_paciente(id: int, paciente_update: PacienteUpdate, db: Session = Depends(get_db)):
+def atualizar_paciente(id: int, paciente_update: PacienteUpdate, request: Request, db: Session = Depends(get_db)):
     """
     Atualiza parcialmente um paciente e suas informações privadas.
     Campos não enviados permanecem inalterados.
+
+    Com If-Match (ETag de GET /paciente/{id}), só grava se o paciente ainda
+    estiver nessa versão; senão retorna 412 com o ETag atual.
+    Sem If-Match, grava sobre a versão atual.
     """
-    paciente = db.query(Paciente).filter(Paciente.id == id).first()
-    if not paciente:
-        raise HTTPException(status_code=404, detail="Paciente não encontrado")
+    versoes = versoes_if_match(request, "p", id)
+    dados = paciente_update.model_dump(exclude_unset=True)
+    dados_privados = dados.pop("informacoes_privadas", None)
 
-    # Atualiza campos básicos enviados
-    for field, value in paciente_update.model_dump(exclude_unset=True).items():
-        if field != "informacoes_privadas":
-            setattr(paciente, field, value)
+    # UPDATE ... WHERE id = ? AND versao IN (...) RETURNING: nova versão (muda o
+    # ETag); updated_at é atualizado pelo onupdate
+    conexao = conexao_do_paciente(db, id)
+    paciente = atualizar_versionado(db, conexao, Paciente, id, dados, versoes)
+    if paciente is None:
+        raise _falha_atualizacao(db, id)
 
-    # Atualiza informações privadas se fornecidas
-    if paciente_update.informacoes_privadas:
-        if paciente.informacoes_privadas:
-            info = paciente.informacoes_privadas
-        else:
-            info = InformacoesPrivadas()
-            paciente.informacoes_privadas = info
+    # Informações privadas: UPDATE direto se fornecidas, senão lidas para a resposta
+    if dados_privados is not None:
+        info = atualizar_informacoes_privadas(db, conexao, id, dados_privados)
+    else:
+        info = db.execute(informacoes_privadas_completas(id)).scalars().first()
+    set_committed_value(paciente, "informacoes_privadas", info)
+
+    # Mantém o índice de busca em dia quando o nome muda
+    if paciente_update.nome is not None:
+        indexar_nomes(db, [(paciente.id, paciente.nome)])
+
+    # E o índice de termos quando alguma lista clínica muda
+    if paciente_update.model_fields_set & set(TIPOS_TERMO.values()):
+        indexar_termos(db, [(paciente.id, listas_clinicas(paciente))])
 
-        for field, value in paciente_update.informacoes_privadas.model_dump(exclude_unset=True).items():
-            setattr(info, field, value)
+    registrar_evento(db, paciente.id, ATUALIZADO, paciente.versao, paciente_update.model_fields_set)
 
+    # Serializa antes do commit (que expira o objeto): sem SELECT de volta
+    resposta = paciente_completo(paciente)
+    cabecalhos = {"ETag": etag_paciente(id, paciente.versao), CABECALHO_CARTAO: emitir_cartao(paciente)}
     db.commit()
-    db.refresh(paciente)
-    return paciente
+    invalidar_resposta_publica(id)
+    notificar_eventos()
+    return resposta_json(resposta, headers=cabecalhos)
 
-# DELETE - Remove permanentemente um paciente pelo ID
+def _falha_atualizacao(db: Session, id: int) -> HTTPException:
+    # O UPDATE não alterou nada: paciente inexistente (404) ou If-Match desatualizado (412)
+    versao = versao_atual(db, Paciente, id)
+    if versao is None:
+        return HTTPException(status_code=404, detail="Paciente não encontrado")
+    return precondicao_falhou(etag_paciente(id, versao))
+
+# PATCH - Ativa ou desativa um paciente (soft delete)
+# Inativos sem alterações há ARQUIVO_INATIVO_DIAS vão para o arquivo
+@router.patch("/paciente/{id}/ativo", response_model=PacienteAtivoResponse)
+def atualizar_ativo_paciente(id: int, status: PacienteAtivoUpdate, request: Request, db: Session = Depends(get_db), _=Depends(autenticar_medico)):
+    versoes = versoes_if_match(request, "p", id)
+    paciente = atualizar_versionado(db, conexao_do_paciente(db, id), Paciente, id, {"ativo": status.ativo}, versoes)
+    if paciente is None:
+        raise _falha_atualizacao(db, id)
+
+    registrar_evento(db, id, ATUALIZADO, paciente.versao, ["ativo"])
+    resposta = {"id": id, "ativo": paciente.ativo}
+    cabecalhos = {"ETag": etag_paciente(id, paciente.versao), CABECALHO_CARTAO: emitir_cartao(paciente)}
+    db.commit()
+    invalidar_resposta_publica(id)
+    notificar_eventos()
+    return resposta_json(resposta, headers=cabecalhos)
+
+# GET privado - Paciente arquivado (saiu das tabelas quentes por estar inativo)
+@router.get("/pacientes/arquivo/{paciente_id}", response_model=PacienteArquivadoResponse)
+def get_paciente_arquivado(paciente_id: int, db: Session = Depends(get_db), medico=Depends(autenticar_medico)):
+    paciente = ler_arquivado(db, paciente_id)
+    if paciente is None:
+        raise HTTPException(status_code=404, detail="Paciente não encontrado no arquivo")
+
+    return resposta_json(paciente)
+
+# POST - Restaura um paciente arquivado: volta ativo às tabelas quentes e às buscas
+@router.post("/pacientes/arquivo/{paciente_id}/restaurar", response_model=PacienteResponse)
+def restaurar_paciente_arquivado(paciente_id: int, db: Session = Depends(get_db), medico=Depends(autenticar_medico)):
+    try:
+        paciente = restaurar_paciente(db, paciente_id)
+    except IntegrityError:
+        # Banco antigo (SQLite sem AUTOINCREMENT) que reaproveitou o ID para outro paciente
+        db.rollback()
+        raise HTTPException(status_code=409, detail="O ID do paciente arquivado já está em uso por outro paciente")
+    if paciente is None:
+        raise HTTPException(status_code=404, detail="Paciente não encontrado no arquivo")
+
+    registrar_evento(db, paciente_id, ATUALIZADO, paciente.versao, ["ativo"])
+    resposta = paciente_completo(paciente)
+    cabecalhos = {"ETag": etag_paciente(paciente_id, paciente.versao), CABECALHO_CARTAO: emitir_cartao(paciente)}
+    db.commit()
+    invalidar_resposta_publica(paciente_id)
+    notificar_eventos()
+    return resposta_json(resposta, headers=cabecalhos)
+
+# DELETE - Exclui permanentemente vários pacientes (ativos ou arquivados) em lote
+@router.delete("/pacientes/lote", response_model=PacientesExcluidosResponse)
+def deletar_pacientes_lote(ids: List[int] = Query(..., description="IDs dos pacientes (?ids=1&ids=2)"), db: Session = Depends(get_db), medico=Depends(autenticar_medico)):
+    """
+    Um DELETE por tabela para todos os IDs (índices de busca, informações
+    privadas, paciente e arquivo), em vez de uma exclusão ORM por paciente.
+    """
+    ids = _validar_ids_lote(ids)
+    excluidos = set(purgar_pacientes(db, ids))
+    registrar_eventos_excluidos(db, [id for id in ids if id in excluidos])
+    db.commit()
+    for id in excluidos:
+        invalidar_resposta_publica(id)
+    notificar_eventos()
+
+    return resposta_json({
+        "excluidos": [id for id in ids if id in excluidos],
+        "nao_encontrados": [id for id in ids if id not in excluidos],
+    })
+
+# DELETE - Remove permanentemente um paciente pelo ID (ativo ou arquivado)
 @router.delete("/paciente/{id}", status_code=204)
 def deletar_paciente(id: int, db: Session = Depends(get_db)):
-    paciente = db.query(Paciente).filter(Paciente.id == id).first()
-
-    if not paciente:
+    if not purgar_pacientes(db, [id]):
         raise HTTPException(status_code=404, detail="Paciente não encontrado")
 
-    db.delete(paciente)
+    registrar_evento(db, id, EXCLUIDO)
     db.commit()
+    invalidar_resposta_publica(id)
+    notificar_eventos()
 
     return
\ No newline at end of file
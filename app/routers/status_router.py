@@ -0,0 +1,129 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.database import engine, async_engine, replicas, particionamento
+from app.security.dependencies import estatisticas_cache_autenticacao
+from app.security.limites import estatisticas_limites
+from app.utils.aquecimento import resultado_aquecimento
+from app.utils.arquivo import arquivador
+from app.utils.eventos import difusor
+from app.utils.metricas import exportar_metricas, registrar_coletor
+from app.utils.pool import estatisticas_pool
+from app.utils.respostas import estatisticas_cache_pacientes
+
+router = APIRouter()
+
+# GET - Contadores de acerto/falha dos caches internos
+@router.get("/status/cache")
+def status_cache():
+    return {
+        "autenticacao": estatisticas_cache_autenticacao(),
+        "pacientes_publico": estatisticas_cache_pacientes(),
+    }
+
+# GET - Estado do pool de conexões (em uso, overflow, esperas e timeouts)
+@router.get("/status/pool")
+def status_pool():
+    dados = {"sincrono": estatisticas_pool(engine)}
+    if async_engine is not None:
+        dados["assincrono"] = estatisticas_pool(async_engine.sync_engine)
+    for replica in replicas:
+        dados[replica.nome] = estatisticas_pool(replica.engine)
+        if replica.async_engine is not None:
+            dados[f"{replica.nome}-assincrono"] = estatisticas_pool(replica.async_engine.sync_engine)
+    for shard in particionamento.shards if particionamento is not None else ():
+        dados[shard.nome] = estatisticas_pool(shard.engine)
+    return dados
+
+# GET - Saúde das réplicas de leitura (DATABASE_REPLICAS)
+@router.get("/status/replicas")
+def status_replicas():
+    return [replica.estado() for replica in replicas]
+
+# GET - Shards de pacientes (SHARDS) e buckets de cada um
+@router.get("/status/shards")
+def status_shards():
+    if particionamento is None:
+        return {"ativo": False}
+    return {"ativo": True, **particionamento.estado()}
+
+# GET - Última execução da tarefa que arquiva os pacientes inativos (neste processo)
+@router.get("/status/arquivo")
+def status_arquivo():
+    return arquivador.estado()
+
+
+# GET - Requisições em andamento e rejeitadas pelos limites de taxa/concorrência
+@router.get("/status/limites")
+def status_limites():
+    return estatisticas_limites()
+
+# GET - Tempo de cada etapa do aquecimento feito na inicialização
+@router.get("/status/aquecimento")
+def status_aquecimento():
+    return resultado_aquecimento()
+
+# GET - Métricas no formato de texto do Prometheus
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metricas():
+    return PlainTextResponse(exportar_metricas(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# -------------------------------------------------
+# Métricas lidas no momento da coleta
+# -------------------------------------------------
+def _pools() -> list:
+    return list(status_pool().items())
+
+
+def _valores_pool(chave: str):
+    return lambda: [((nome,), dados[chave]) for nome, dados in _pools() if chave in dados]
+
+
+def _caches() -> list:
+    autenticacao = estatisticas_cache_autenticacao()
+    return [
+        ("tokens", autenticacao["tokens"]),
+        ("medicos", autenticacao["medicos"]),
+        ("pacientes_publico", estatisticas_cache_pacientes()),
+    ]
+
+
+def _valores_cache(chave: str):
+    return lambda: [((nome,), dados[chave]) for nome, dados in _caches()]
+
+
+for _chave, _nome, _tipo, _ajuda in (
+    ("tamanho", "vitalkey_db_pool_tamanho", "gauge", "Tamanho configurado do pool de conexões"),
+    ("em_uso", "vitalkey_db_pool_em_uso", "gauge", "Conexões emprestadas (checkout) no momento"),
+    ("livres", "vitalkey_db_pool_livres", "gauge", "Conexões livres no pool"),
+    ("overflow", "vitalkey_db_pool_overflow", "gauge", "Conexões abertas além do tamanho do pool"),
+    ("checkouts", "vitalkey_db_pool_checkouts_total", "counter", "Checkouts de conexão"),
+    ("checkouts_com_espera", "vitalkey_db_pool_checkouts_com_espera_total", "counter", "Checkouts que esperaram por conexão livre"),
+    ("timeouts", "vitalkey_db_pool_timeouts_total", "counter", "Checkouts que estouraram o pool_timeout"),
+):
+    registrar_coletor(_nome, _ajuda, _tipo, ("engine",), _valores_pool(_chave))
+
+for _chave, _nome, _tipo, _ajuda in (
+    ("itens", "vitalkey_cache_itens", "gauge", "Itens guardados no cache"),
+    ("acertos", "vitalkey_cache_acertos_total", "counter", "Leituras encontradas no cache"),
+    ("falhas", "vitalkey_cache_falhas_total", "counter", "Leituras não encontradas no cache"),
+):
+    registrar_coletor(_nome, _ajuda, _tipo, ("cache",), _valores_cache(_chave))
+
+registrar_coletor(
+    "vitalkey_limites_rejeitadas_total", "Requisições rejeitadas pelo limitador", "counter", ("motivo",),
+    lambda: [
+        (("taxa",), estatisticas_limites()["rejeitadas_taxa"]),
+        (("concorrencia",), estatisticas_limites()["rejeitadas_concorrencia"]),
+    ],
+)
+registrar_coletor(
+    "vitalkey_eventos_assinantes", "Conexões abertas no feed de eventos de pacientes", "gauge", (),
+    lambda: [((), difusor.assinantes)],
+)
+
+registrar_coletor(
+    "vitalkey_replica_saudavel", "Réplica de leitura disponível (1) ou fora do rodízio (0)", "gauge", ("replica",),
+    lambda: [((replica.nome,), int(replica.saudavel)) for replica in replicas],
+)
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -67,6 +67,14 @@ class PacienteBase(BaseModel):
         from_attributes = True
 
 
+# ----------------------------
+# Listas do histórico médico
+# ----------------------------
+# Colunas de InformacoesPrivadas lidas em páginas por
+# GET /paciente/{id}/historico/{campo}
+CampoHistorico = Literal["cirurgias", "internacoes_passadas", "alteracoes_exames", "historico_exames"]
+
+
 # =========================================================
 # 2. CREATE
 # Usado no POST /paciente
@@ -145,4 +153,67 @@ class PacienteAtivoUpdate(BaseModel):
 
 class PacienteResponse(PacienteBase):
     # Inclui as informações privadas no retorno
-    informacoes_privadas: Optional[InformacoesPrivadasBase] = None
\ No newline at end of file
+    informacoes_privadas: Optional[InformacoesPrivadasBase] = None
+
+# =========================================================
+# 5. LOTE
+# Respostas das consultas de vários pacientes de uma vez
+# =========================================================
+
+class PacientesLoteResponse(BaseModel):
+    # Pacientes encontrados, na ordem dos IDs pedidos
+    pacientes: List[PacienteBase]
+
+    # IDs pedidos que não existem no banco
+    nao_encontrados: List[int]
+
+
+class PacientesPrivadosLoteResponse(BaseModel):
+    pacientes: List[PacienteResponse]
+    nao_encontrados: List[int]
+
+
+class PacientesExcluidosResponse(BaseModel):
+    # IDs excluídos (ativos ou arquivados), na ordem pedida
+    excluidos: List[int]
+
+    # IDs pedidos que não existem no banco nem no arquivo
+    nao_encontrados: List[int]
+
+# =========================================================
+# 6. ARQUIVO E STATUS
+# Pacientes inativos movidos para o arquivo
+# =========================================================
+
+class PacienteAtivoResponse(PacienteAtivoUpdate):
+    id: int
+
+
+class PacienteArquivadoResponse(PacienteResponse):
+    # Data e hora em que o paciente foi para o arquivo
+    arquivado_em: datetime
+
+# =========================================================
+# 7. CARTÃO DE EMERGÊNCIA
+# Dados públicos assinados, conferidos sem acessar o banco
+# =========================================================
+
+class CartaoEmergenciaEmitido(BaseModel):
+    id: int
+    versao: int
+
+    # Token assinado (cabe em um QR code)
+    cartao: str
+
+
+class CartaoEmergenciaResponse(BaseModel):
+    id: int
+    nome: str
+    alergias: List[str]
+    doencas_cronicas: List[str]
+    medicamentos_continuos: List[str]
+    contatos_emergencia: List[ContatoEmergencia]
+
+    # Versão do paciente quando o cartão foi emitido
+    versao: int
+    atualizado_em: datetime
@@ -0,0 +1,93 @@
+# app/security/cartao.py
+#
+# Cartão de emergência assinado
+#
+# Os dados públicos do paciente (PacienteBase) em um token compacto,
+# assinado com a mesma chave e algoritmo dos tokens de login. O cartão
+# (ou um QR code com ele) é conferido por GET /cartao/{cartao} sem acessar
+# o banco: a leitura em emergências funciona mesmo com o banco fora do ar.
+#
+# Formato: JWS "cabeçalho.dados.assinatura" (base64url). Os dados são o
+# JSON com chaves de uma letra comprimido com deflate, para caber com
+# folga em um QR code (algumas centenas de caracteres). O cabeçalho
+# typ "cartao" impede que um token de login seja aceito como cartão e
+# vice-versa (o token de login não é um JSON comprimido).
+#
+# O cartão é determinístico: mesma versão do paciente, mesmo cartão.
+# Cada alteração incrementa a versão e gera um cartão novo, devolvido
+# no cabeçalho X-Cartao-Emergencia das rotas de escrita.
+
+import zlib
+from datetime import datetime, timezone
+
+import orjson
+from fastapi import HTTPException
+from jose import jws, JWSError
+
+from app.config import SECRET_KEY, ALGORITHM
+from app.models.paciente import Paciente
+
+TIPO_CARTAO = "cartao"
+
+# Cabeçalho das rotas de escrita com o cartão da nova versão
+CABECALHO_CARTAO = "X-Cartao-Emergencia"
+
+# deflate "cru" (sem cabeçalho zlib): 6 bytes a menos
+_JANELA_DEFLATE = -15
+
+
+# -------------------------------------------------
+# Emissão
+# -------------------------------------------------
+def emitir_cartao(paciente: Paciente) -> str:
+    """
+    Cartão com os dados públicos do paciente, a versão e a data da versão:
+    - i: id, v: versão, t: atualização (timestamp)
+    - n: nome, a/d/m: alergias, doenças crônicas e medicamentos contínuos
+    - c: contatos de emergência como [nome, telefone]
+    """
+    modificado_em = paciente.updated_at or paciente.created_at
+    dados = {
+        "i": paciente.id,
+        "v": paciente.versao,
+        "t": int(modificado_em.replace(tzinfo=timezone.utc).timestamp()),
+        "n": paciente.nome,
+        "a": paciente.alergias or [],
+        "d": paciente.doencas_cronicas or [],
+        "m": paciente.medicamentos_continuos or [],
+        "c": [[contato.get("nome"), contato.get("telefone")] for contato in paciente.contatos_emergencia or []],
+    }
+    compressor = zlib.compressobj(9, zlib.DEFLATED, _JANELA_DEFLATE)
+    comprimido = compressor.compress(orjson.dumps(dados)) + compressor.flush()
+    return jws.sign(comprimido, SECRET_KEY, headers={"typ": TIPO_CARTAO}, algorithm=ALGORITHM)
+
+
+# -------------------------------------------------
+# Verificação (sem banco de dados)
+# -------------------------------------------------
+def ler_cartao(cartao: str) -> dict:
+    """
+    Confere a assinatura e devolve os dados do cartão no formato do
+    CartaoEmergenciaResponse. Cartão adulterado, de outro tipo ou
+    ilegível: 400.
+    """
+    try:
+        if jws.get_unverified_header(cartao).get("typ") != TIPO_CARTAO:
+            raise _cartao_invalido()
+        dados = orjson.loads(zlib.decompress(jws.verify(cartao, SECRET_KEY, algorithms=[ALGORITHM]), _JANELA_DEFLATE))
+        return {
+            "id": dados["i"],
+            "nome": dados["n"],
+            "alergias": dados["a"],
+            "doencas_cronicas": dados["d"],
+            "medicamentos_continuos": dados["m"],
+            "contatos_emergencia": [{"nome": nome, "telefone": telefone} for nome, telefone in dados["c"]],
+            "versao": dados["v"],
+            "atualizado_em": datetime.fromtimestamp(dados["t"], timezone.utc),
+        }
+    except (JWSError, zlib.error, orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+        raise _cartao_invalido()
+
+
+def _cartao_invalido() -> HTTPException:
+    return HTTPException(status_code=400, detail="Cartão de emergência inválido")
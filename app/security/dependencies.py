@@ -1,10 +1,81 @@
+import hashlib
+import time
+
 from fastapi import Depends, HTTPException
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
-from app.config import SECRET_KEY, ALGORITHM
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.config import SECRET_KEY, ALGORITHM, CACHE_AUTH_TTL, CACHE_AUTH_TAMANHO, CACHE_AUTH_VALIDAR
 from app.security.auth import verificar_token, oauth2_scheme
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models.medico import Medico
+from app.utils.cache import CacheTTL
+from app.utils.consultas_frequentes import MEDICO_POR_ID, ESTADO_MEDICO_POR_ID
+from app.utils.metricas import FALHAS_AUTENTICACAO
+from app.utils.shards import PRINCIPAL, particionamento_da_sessao
+
+# -------------------------------------------------
+# Cache de autenticação
+# -------------------------------------------------
+# Evita decodificar o mesmo JWT e consultar o médico no banco
+# a cada requisição protegida.
+# - tokens: hash do token → (id do médico, expiração do token)
+# - médicos: id do médico → colunas da linha (snapshot)
+#
+# A invalidação (invalidar_cache_medico) só vale no processo que fez a
+# alteração. Com vários workers, cada acerto no cache de médicos confere
+# versão e ativo no banco (_snapshot_atual) e descarta o snapshot antigo.
+_cache_tokens = CacheTTL(CACHE_AUTH_TAMANHO, CACHE_AUTH_TTL)
+_cache_medicos = CacheTTL(CACHE_AUTH_TAMANHO, CACHE_AUTH_TTL)
+
+
+def invalidar_cache_medico(medico_id: int):
+    """
+    Remove o médico do cache de autenticação.
+    Deve ser chamada sempre que a linha do médico for alterada ou excluída.
+    """
+    _cache_medicos.invalidar(int(medico_id))
+
+
+def estatisticas_cache_autenticacao() -> dict:
+    """
+    Retorna os contadores de acertos/falhas dos caches de autenticação.
+    """
+    return {
+        "tokens": _cache_tokens.estatisticas(),
+        "medicos": _cache_medicos.estatisticas(),
+    }
+
+
+def _snapshot_atual(medico_id: int, snapshot: dict, estado) -> dict:
+    """
+    O snapshot do cache, se versão e ativo ainda são os do banco (estado é
+    a linha de ESTADO_MEDICO_POR_ID; None se o médico foi excluído).
+    Senão, descarta o snapshot e retorna None.
+    """
+    if estado is not None and (estado.versao, estado.ativo) == (snapshot["versao"], snapshot["ativo"]):
+        return snapshot
+    _cache_medicos.invalidar(medico_id)
+    return None
+
+
+def _snapshot_medico(medico: Medico) -> dict:
+    # Copia apenas as colunas (sem estado de sessão) para guardar no cache
+    return {coluna.key: getattr(medico, coluna.key) for coluna in inspect(Medico).column_attrs}
+
+
+def _medico_do_snapshot(db: Session, snapshot: dict) -> Medico:
+    """
+    Reconstrói o médico a partir do cache e o anexa à sessão sem SELECT,
+    assim as rotas podem alterá-lo e fazer commit normalmente.
+    """
+    medico = Medico(**snapshot)
+    if particionamento_da_sessao(db) is not None:
+        # ShardedSession: a chave de identidade leva o banco (médicos ficam no principal)
+        inspect(medico).identity_token = PRINCIPAL
+    make_transient_to_detached(medico)
+    return db.merge(medico, load=False)
 
 def autenticar_medico(
     token: str = Depends(oauth2_scheme),
@@ -14,45 +85,115 @@ def autenticar_medico(
     Dependency responsável por:
     - Validar o token JWT
     - Extrair o ID do médico (sub)
-    - Buscar o médico no banco
+    - Buscar o médico no banco (ou no cache de autenticação)
     - Verificar se a conta está ativa
 
     Retorna o objeto Medico autenticado.
     """
 
+    medico_id = _id_medico_do_token(token)
+
+    # -----------------------------
+    # Validação do médico no banco
+    # -----------------------------
+    snapshot = _cache_medicos.obter(medico_id)
+    if snapshot is not None and CACHE_AUTH_VALIDAR:
+        # Outro worker pode ter desativado ou excluído o médico
+        estado = db.execute(ESTADO_MEDICO_POR_ID, {"id": medico_id}).first()
+        snapshot = _snapshot_atual(medico_id, snapshot, estado)
+    if snapshot is not None:
+        medico = _medico_do_snapshot(db, snapshot)
+    else:
+        medico = db.execute(MEDICO_POR_ID, {"id": medico_id}).scalars().first()
+        if medico:
+            _cache_medicos.guardar(medico_id, _snapshot_medico(medico))
+
+    return _validar_medico(medico)
+
+
+async def autenticar_medico_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Versão assíncrona de autenticar_medico (modo DB_ASYNC).
+
+    Em caso de acerto no cache, retorna um Medico desanexado
+    montado a partir do snapshot, sem carregar a linha inteira.
+    """
+    medico_id = _id_medico_do_token(token)
+
+    snapshot = _cache_medicos.obter(medico_id)
+    if snapshot is not None and CACHE_AUTH_VALIDAR:
+        estado = (await db.execute(ESTADO_MEDICO_POR_ID, {"id": medico_id})).first()
+        snapshot = _snapshot_atual(medico_id, snapshot, estado)
+    if snapshot is not None:
+        medico = Medico(**snapshot)
+    else:
+        resultado = await db.execute(MEDICO_POR_ID, {"id": medico_id})
+        medico = resultado.scalars().first()
+        if medico:
+            _cache_medicos.guardar(medico_id, _snapshot_medico(medico))
+
+    return _validar_medico(medico)
+
+
+def _id_medico_do_token(token: str, registrar_falha: bool = True) -> int:
+    """
+    Valida o JWT (ou o encontra no cache) e retorna o ID do médico.
+    Com registrar_falha=False, tokens inválidos não entram nas métricas
+    (usado pelo limitador, que só quer identificar o médico).
+    """
     # -----------------------------
     # Decodificação e validação do JWT
     # -----------------------------
-    try:
-        # Decodifica o token usando a chave secreta e algoritmo definidos
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    chave_token = hashlib.sha256(token.encode()).hexdigest()
+    token_cache = _cache_tokens.obter(chave_token)
 
-        # Recupera o ID do médico armazenado no campo 'sub'
-        medico_id = payload.get("sub")
+    if token_cache and token_cache[1] > time.time():
+        # Token já validado antes e ainda dentro da expiração
+        medico_id = token_cache[0]
+    else:
+        try:
+            # Decodifica o token usando a chave secreta e algoritmo definidos
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
-        # Se não houver 'sub', o token é inválido
-        if medico_id is None:
+            # Recupera o ID do médico armazenado no campo 'sub'
+            medico_id = payload.get("sub")
+
+            # Se não houver 'sub', o token é inválido
+            if medico_id is None:
+                if registrar_falha:
+                    FALHAS_AUTENTICACAO.incrementar("token_invalido")
+                raise HTTPException(
+                    status_code=401,
+                    detail="Token inválido ou expirado"
+                )
+
+        # Erro caso o token esteja expirado, adulterado ou inválido
+        except JWTError:
+            if registrar_falha:
+                FALHAS_AUTENTICACAO.incrementar("token_invalido")
             raise HTTPException(
                 status_code=401,
                 detail="Token inválido ou expirado"
             )
 
-    # Erro caso o token esteja expirado, adulterado ou inválido
-    except JWTError:
-        raise HTTPException(
-            status_code=401,
-            detail="Token inválido ou expirado"
-        )
-
-    # -----------------------------
-    # Validação do médico no banco
-    # -----------------------------
+        # Guarda o token no cache, sem ultrapassar a expiração do próprio JWT
+        expiracao = payload.get("exp", time.time() + CACHE_AUTH_TTL)
+        _cache_tokens.guardar(chave_token, (medico_id, expiracao), ttl=expiracao - time.time())
 
     # Converte o ID para inteiro (DB usa int)
-    medico = db.query(Medico).filter(Medico.id == int(medico_id)).first()
+    return int(medico_id)
 
+
+def _validar_medico(medico: Medico) -> Medico:
+    """
+    Garante que o médico existe e está ativo.
+    """
     # Se o médico não existir no banco
     if not medico:
+        FALHAS_AUTENTICACAO.incrementar("medico_nao_encontrado")
         raise HTTPException(
             status_code=401,
             detail="Usuário não encontrado"
@@ -60,6 +201,7 @@ def autenticar_medico(
 
     # Se o médico existir, mas estiver inativo
     if not medico.ativo:
+        FALHAS_AUTENTICACAO.incrementar("medico_inativo")
         raise HTTPException(
             status_code=403,
             detail="Conta inativa"
@@ -0,0 +1,180 @@
+# app/security/limites.py
+
+import math
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import parse_qsl
+
+import orjson
+from fastapi import HTTPException
+
+from app.config import (
+    LIMITE_LOGIN_POR_MINUTO, LIMITE_ESCRITA_POR_MINUTO, LIMITE_LEITURA_POR_MINUTO, LIMITE_MEDICO_POR_MINUTO,
+    LIMITE_CONCORRENCIA, LIMITE_CONCORRENCIA_PESADA, LIMITES_CHAVES_MAXIMO,
+)
+from app.security.dependencies import _id_medico_do_token
+
+
+# -------------------------------------------------
+# Token bucket
+# -------------------------------------------------
+class BaldeTokens:
+    """
+    Um balde por chave (cliente, médico...), com capacidade igual ao limite
+    por minuto e recarga contínua. Chaves inativas são descartadas pela
+    ordem de uso quando passam de tamanho_maximo.
+
+    Roda apenas no event loop (middleware), por isso não usa trava.
+    """
+
+    def __init__(self, por_minuto: int, tamanho_maximo: int = LIMITES_CHAVES_MAXIMO):
+        self.capacidade = float(por_minuto)
+        self.recarga = por_minuto / 60.0  # tokens por segundo
+        self.tamanho_maximo = tamanho_maximo
+        self._baldes: "OrderedDict[object, list]" = OrderedDict()
+
+    def consumir(self, chave, agora: float) -> float:
+        """
+        Consome um token. Retorna 0 se permitido ou os segundos até haver token.
+        """
+        balde = self._baldes.get(chave)
+        if balde is None:
+            balde = self._baldes[chave] = [self.capacidade, agora]
+            if len(self._baldes) > self.tamanho_maximo:
+                self._baldes.popitem(last=False)
+        else:
+            self._baldes.move_to_end(chave)
+            balde[0] = min(self.capacidade, balde[0] + (agora - balde[1]) * self.recarga)
+            balde[1] = agora
+
+        if balde[0] >= 1.0:
+            balde[0] -= 1.0
+            return 0.0
+        return (1.0 - balde[0]) / self.recarga
+
+
+def _balde(por_minuto: int) -> Optional[BaldeTokens]:
+    return BaldeTokens(por_minuto) if por_minuto > 0 else None
+
+
+# -------------------------------------------------
+# Middleware
+# -------------------------------------------------
+# Requisições em andamento e rejeições (expostos em /status/limites)
+_contadores = {"em_andamento": 0, "pesadas_em_andamento": 0, "rejeitadas_taxa": 0, "rejeitadas_concorrencia": 0}
+
+
+class LimitadorRequisicoes:
+    """
+    Middleware ASGI que rejeita rápido em vez de enfileirar:
+    - 429 quando o cliente (IP) ou o médico (sub do JWT) passa do limite por minuto
+      (login, escrita e leitura têm limites separados por cliente)
+    - 503 quando há requisições simultâneas demais, no total ou nas rotas pesadas
+      (listagem de pacientes sem filtro, importação e exportação)
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.login = _balde(LIMITE_LOGIN_POR_MINUTO)
+        self.escrita = _balde(LIMITE_ESCRITA_POR_MINUTO)
+        self.leitura = _balde(LIMITE_LEITURA_POR_MINUTO)
+        self.medico = _balde(LIMITE_MEDICO_POR_MINUTO)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        caminho = scope["path"]
+        agora = time.monotonic()
+        cliente = scope["client"][0] if scope.get("client") else "-"
+
+        # -----------------------------
+        # Limites de taxa
+        # -----------------------------
+        if metodo == "POST" and caminho == "/login":
+            balde = self.login
+        elif metodo in ("GET", "HEAD"):
+            balde = self.leitura
+        else:
+            balde = self.escrita
+
+        espera = balde.consumir(cliente, agora) if balde else 0.0
+        if not espera and self.medico:
+            medico_id = _medico_da_requisicao(scope)
+            if medico_id is not None:
+                espera = self.medico.consumir(medico_id, agora)
+
+        if espera:
+            _contadores["rejeitadas_taxa"] += 1
+            await _responder(send, 429, "Muitas requisições, tente novamente mais tarde", math.ceil(espera))
+            return
+
+        # -----------------------------
+        # Limites de concorrência
+        # -----------------------------
+        # O feed de eventos fica conectado indefinidamente: não ocupa vaga
+        # de concorrência (o número de assinantes tem limite próprio)
+        if caminho == "/pacientes/eventos":
+            await self.app(scope, receive, send)
+            return
+
+        pesada = _rota_pesada(metodo, caminho, scope)
+        if (LIMITE_CONCORRENCIA and _contadores["em_andamento"] >= LIMITE_CONCORRENCIA) or (
+            pesada and LIMITE_CONCORRENCIA_PESADA and _contadores["pesadas_em_andamento"] >= LIMITE_CONCORRENCIA_PESADA
+        ):
+            _contadores["rejeitadas_concorrencia"] += 1
+            await _responder(send, 503, "Servidor sobrecarregado, tente novamente em instantes", 1)
+            return
+
+        _contadores["em_andamento"] += 1
+        _contadores["pesadas_em_andamento"] += pesada
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _contadores["em_andamento"] -= 1
+            _contadores["pesadas_em_andamento"] -= pesada
+
+
+def estatisticas_limites() -> dict:
+    return dict(_contadores)
+
+
+def _medico_da_requisicao(scope) -> Optional[int]:
+    # Reaproveita o cache de tokens da autenticação; token inválido não identifica médico
+    for nome, valor in scope["headers"]:
+        if nome == b"authorization":
+            if valor[:7].lower() != b"bearer ":
+                return None
+            try:
+                return _id_medico_do_token(valor[7:].decode("latin-1"), registrar_falha=False)
+            except HTTPException:
+                return None
+    return None
+
+
+def _rota_pesada(metodo: str, caminho: str, scope) -> bool:
+    if caminho == "/pacientes/exportar" or (metodo == "POST" and caminho == "/pacientes/importar"):
+        return True
+    if caminho == "/pacientes" and metodo == "GET":
+        # A página JSON é uma leitura por faixa do índice (limitada a LIMITE_PAGINA_MAXIMO);
+        # só o NDJSON sem limite e sem id/nome percorre a tabela inteira
+        parametros = dict(parse_qsl(scope["query_string"].decode("latin-1")))
+        return parametros.get("formato") == "ndjson" and not parametros.keys() & {"limite", "id", "nome"}
+    return False
+
+
+async def _responder(send, status: int, detalhe: str, retry_after: int):
+    corpo = orjson.dumps({"detail": detalhe})
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(corpo)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": corpo})
\ No newline at end of file
@@ -0,0 +1,147 @@
+# app/security/senhas.py
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from app.config import SENHA_SCRYPT_N, SENHA_SCRYPT_R, SENHA_SCRYPT_P, SENHA_PROCESSOS
+
+# -------------------------------------------------
+# Formato armazenado
+# -------------------------------------------------
+# scrypt$<n>$<r>$<p>$<salt>$<hash>   (salt e hash em base64 sem "=")
+#
+# Os parâmetros ficam junto do hash: ao aumentar o custo na configuração,
+# os hashes antigos continuam válidos e são refeitos no próximo login.
+# Valores sem o prefixo são senhas legadas em texto puro.
+PREFIXO = "scrypt"
+TAMANHO_SALT = 16
+TAMANHO_HASH = 32
+
+
+def _b64(dados: bytes) -> str:
+    return base64.b64encode(dados).decode().rstrip("=")
+
+
+def _de_b64(texto: str) -> bytes:
+    return base64.b64decode(texto + "=" * (-len(texto) % 4))
+
+
+def _scrypt(senha: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # maxmem com folga: o OpenSSL recusa por padrão acima de 32 MiB
+    return hashlib.scrypt(senha.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024, dklen=TAMANHO_HASH)
+
+
+def _parametros_atuais() -> Tuple[int, int, int]:
+    return SENHA_SCRYPT_N, SENHA_SCRYPT_R, SENHA_SCRYPT_P
+
+
+# -------------------------------------------------
+# Funções síncronas (executadas nos processos do pool)
+# -------------------------------------------------
+def gerar_hash(senha: str) -> str:
+    """
+    Gera o hash da senha com os parâmetros atuais.
+    """
+    n, r, p = _parametros_atuais()
+    salt = os.urandom(TAMANHO_SALT)
+    return f"{PREFIXO}${n}${r}${p}${_b64(salt)}${_b64(_scrypt(senha, salt, n, r, p))}"
+
+
+def verificar_senha(senha: str, armazenado: str) -> Tuple[bool, bool]:
+    """
+    Compara a senha com o valor armazenado.
+
+    Retorna (senha correta, precisa refazer o hash).
+    """
+    partes = armazenado.split("$")
+    if len(partes) != 6 or partes[0] != PREFIXO:
+        # Senha legada em texto puro: sempre migra para hash
+        correta = hmac.compare_digest(senha.encode(), armazenado.encode())
+        return correta, correta
+
+    try:
+        n, r, p = int(partes[1]), int(partes[2]), int(partes[3])
+        salt, esperado = _de_b64(partes[4]), _de_b64(partes[5])
+    except ValueError:
+        return False, False
+
+    correta = hmac.compare_digest(_scrypt(senha, salt, n, r, p), esperado)
+    return correta, correta and (n, r, p) != _parametros_atuais()
+
+
+# Hash usado quando o login não existe, para a resposta levar o mesmo tempo
+_hash_ficticio: Optional[str] = None
+
+
+# -------------------------------------------------
+# Pool de processos
+# -------------------------------------------------
+# O scrypt é intencionalmente caro em CPU e memória. Rodando nos processos
+# do pool ele não disputa o GIL com o event loop nem ocupa as threads
+# usadas pelas rotas síncronas; no máximo SENHA_PROCESSOS hashes são
+# calculados ao mesmo tempo e o restante aguarda na fila do pool.
+_pool: Optional[ProcessPoolExecutor] = None
+_trava_pool = threading.Lock()
+
+
+def _obter_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if SENHA_PROCESSOS <= 0:
+        return None
+    if _pool is None:
+        with _trava_pool:
+            if _pool is None:
+                # spawn: os processos não herdam conexões nem threads do servidor
+                _pool = ProcessPoolExecutor(max_workers=SENHA_PROCESSOS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def encerrar_pool():
+    global _pool
+    with _trava_pool:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def _executar(funcao, *args):
+    pool = _obter_pool()
+    if pool is None:
+        return await asyncio.to_thread(funcao, *args)
+    return await asyncio.get_running_loop().run_in_executor(pool, funcao, *args)
+
+
+async def gerar_hash_async(senha: str) -> str:
+    return await _executar(gerar_hash, senha)
+
+
+async def aquecer_pool_senhas():
+    """
+    Cria os processos do pool (e o hash fictício) antes do primeiro login.
+    Um hash por processo, em paralelo, para que todos sejam iniciados.
+    """
+    global _hash_ficticio
+    hashes = await asyncio.gather(*(_executar(gerar_hash, "senha-inexistente") for _ in range(max(SENHA_PROCESSOS, 1))))
+    if _hash_ficticio is None:
+        _hash_ficticio = hashes[0]
+
+
+async def verificar_senha_async(senha: str, armazenado: Optional[str]) -> Tuple[bool, bool]:
+    """
+    Versão assíncrona de verificar_senha.
+    Se o médico não existir (armazenado=None), gasta o mesmo tempo e retorna falso.
+    """
+    global _hash_ficticio
+    if armazenado is None:
+        if _hash_ficticio is None:
+            _hash_ficticio = await _executar(gerar_hash, "senha-inexistente")
+        await _executar(verificar_senha, senha, _hash_ficticio)
+        return False, False
+    return await _executar(verificar_senha, senha, armazenado)
\ No newline at end of file
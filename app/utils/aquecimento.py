@@ -0,0 +1,129 @@
+# Aquecimento na inicialização (lifespan do FastAPI)
+#
+# Sem aquecimento, a primeira requisição paga: montagem das rotas e da pilha
+# de middlewares do FastAPI, configuração dos mappers do ORM, abertura das
+# conexões (com os PRAGMAs do SQLite), compilação das consultas, criação das
+# threads do threadpool e, no login, dos processos do pool de senhas.
+# Aqui tudo isso acontece antes de o servidor aceitar requisições.
+
+import logging
+import time
+from typing import Optional, Sequence
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, configure_mappers
+
+from app.config import AQUECIMENTO_CONEXOES
+from app.security.senhas import aquecer_pool_senhas
+from app.utils.consultas_frequentes import CONSULTAS_AQUECIMENTO, CONSULTAS_AQUECIMENTO_PACIENTES
+
+logger = logging.getLogger("vitalkey.aquecimento")
+
+# Tempo de cada etapa do último aquecimento (GET /status/aquecimento)
+_resultado: dict = {"executado": False}
+
+
+async def _preparar_rotas(app):
+    # O FastAPI monta o estado de cada rota (dependências, modelos de resposta)
+    # na primeira vez que ela é comparada com uma requisição. Uma requisição
+    # interna para um caminho inexistente, direto no roteador, percorre todas
+    # as rotas sem passar pelos middlewares (não entra nas métricas nem nos limites).
+    if app.middleware_stack is None:
+        app.middleware_stack = app.build_middleware_stack()
+
+    escopo = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/_aquecimento", "raw_path": b"/_aquecimento", "root_path": "",
+        "query_string": b"", "headers": [], "client": None, "server": None,
+    }
+
+    async def receber():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def enviar(mensagem):
+        pass
+
+    await app.router(escopo, receber, enviar)
+
+
+def _abrir_conexoes(engine, quantidade: int):
+    # Checkout simultâneo: obriga o pool a criar todas as conexões
+    conexoes = [engine.connect() for _ in range(quantidade)]
+    for conexao in conexoes:
+        conexao.close()
+
+
+def _compilar_consultas(engine, consultas=CONSULTAS_AQUECIMENTO):
+    # Uma execução de cada consulta deixa a compilação no cache do engine
+    with Session(engine) as db:
+        for consulta, parametros in consultas:
+            db.execute(consulta, parametros).scalars().all()
+
+
+async def _abrir_conexoes_async(async_engine, quantidade: int):
+    conexoes = [await async_engine.connect() for _ in range(quantidade)]
+    for conexao in conexoes:
+        await conexao.close()
+
+
+async def _compilar_consultas_async(async_engine):
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    async with AsyncSession(async_engine) as db:
+        for consulta, parametros in CONSULTAS_AQUECIMENTO:
+            (await db.execute(consulta, parametros)).scalars().all()
+
+
+def _etapas_banco(prefixo: str, engine, async_engine) -> list:
+    etapas = [
+        (f"{prefixo}conexoes", lambda: run_in_threadpool(_abrir_conexoes, engine, AQUECIMENTO_CONEXOES)),
+        (f"{prefixo}consultas", lambda: run_in_threadpool(_compilar_consultas, engine)),
+    ]
+    if async_engine is not None:
+        etapas += [
+            (f"{prefixo}conexoes_async", lambda: _abrir_conexoes_async(async_engine, AQUECIMENTO_CONEXOES)),
+            (f"{prefixo}consultas_async", lambda: _compilar_consultas_async(async_engine)),
+        ]
+    return etapas
+
+
+async def aquecer(app, engine, async_engine: Optional[object] = None, replicas: Sequence = (), particionamento=None) -> dict:
+    """
+    Executa as etapas do aquecimento e retorna o tempo de cada uma (ms).
+    As etapas síncronas rodam no threadpool, o mesmo das rotas síncronas.
+    Falhas são registradas no log e não impedem a inicialização.
+    """
+    etapas = [
+        ("rotas", lambda: _preparar_rotas(app)),
+        ("mappers", lambda: run_in_threadpool(configure_mappers)),
+    ]
+    etapas += _etapas_banco("", engine, async_engine)
+    for replica in replicas:
+        etapas += _etapas_banco(f"{replica.nome}_", replica.engine, replica.async_engine)
+    if particionamento is not None:
+        # Shards só têm as tabelas de pacientes; o mapa de buckets é lido antes da primeira requisição
+        etapas.append(("mapa_shards", lambda: run_in_threadpool(particionamento.mapa.atual)))
+        for shard in particionamento.shards:
+            etapas += [
+                (f"{shard.nome}_conexoes", lambda shard=shard: run_in_threadpool(_abrir_conexoes, shard.engine, AQUECIMENTO_CONEXOES)),
+                (f"{shard.nome}_consultas", lambda shard=shard: run_in_threadpool(_compilar_consultas, shard.engine, CONSULTAS_AQUECIMENTO_PACIENTES)),
+            ]
+    etapas.append(("pool_senhas", aquecer_pool_senhas))
+
+    tempos = {}
+    inicio_total = time.perf_counter()
+    for nome, etapa in etapas:
+        inicio = time.perf_counter()
+        try:
+            await etapa()
+        except Exception:
+            logger.exception("Falha no aquecimento (etapa %s)", nome)
+        tempos[nome] = round((time.perf_counter() - inicio) * 1000, 1)
+
+    _resultado.update(executado=True, total_ms=round((time.perf_counter() - inicio_total) * 1000, 1), etapas_ms=tempos)
+    logger.info("Aquecimento concluído em %.1f ms: %s", _resultado["total_ms"], tempos)
+    return dict(_resultado)
+
+
+def resultado_aquecimento() -> dict:
+    return dict(_resultado)
@@ -0,0 +1,254 @@
+# Arquivo de pacientes inativos
+#
+# As listagens filtram Paciente.ativo, mas os inativos ficavam na tabela
+# quente para sempre, aumentando índices e varreduras. O Arquivador move,
+# em lotes, os pacientes inativos e sem alterações há ARQUIVO_INATIVO_DIAS
+# para paciente_arquivo / informacoes_privadas_arquivo, no mesmo banco
+# (com shards, no shard do paciente), e apaga as linhas dos índices de
+# busca. Cada lote é uma transação com INSERT ... SELECT e DELETE pelo
+# conjunto de IDs, sem carregar objetos ORM.
+#
+# Os arquivados são lidos e restaurados por rotas próprias
+# (/pacientes/arquivo/{id}). purgar_pacientes faz a exclusão permanente
+# em lote (tabelas quentes e arquivo), com um DELETE por tabela em vez
+# das cascatas do ORM linha a linha.
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, insert, literal, select, true, union_all
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.config import ARQUIVO_INATIVO_DIAS, ARQUIVO_INTERVALO, ARQUIVO_LOTE
+from app.database import engines_pacientes
+from app.models.arquivo import PacienteArquivado, InformacoesPrivadasArquivadas
+from app.models.paciente import Paciente, InformacoesPrivadas
+from app.utils.busca import indexar_nomes
+from app.utils.consultas_frequentes import PACIENTE_PRIVADO_POR_ID
+from app.utils.respostas import invalidar_resposta_publica
+from app.utils.serializacao import paciente_publico, informacoes_privadas
+from app.utils.shards import COLUNA_PACIENTE, TABELAS_PACIENTE, conexao_do_paciente, particionamento_da_sessao
+from app.utils.termos import indexar_termos, listas_clinicas
+
+logger = logging.getLogger("vitalkey.arquivo")
+
+# Tabelas de onde o paciente sai ao ser arquivado (filhos antes do paciente)
+TABELAS_QUENTES = ("paciente_termo", "paciente_trigrama", "informacoes_privadas", "paciente")
+
+
+# -------------------------------------------------
+# Movimentação entre as tabelas
+# -------------------------------------------------
+def _copiar(conexao: Connection, origem, destino, ids: Sequence[int], valores: Optional[dict] = None):
+    """
+    INSERT INTO destino SELECT ... FROM origem WHERE <paciente> IN (ids).
+    Copia as colunas em comum; valores substitui/completa colunas do destino.
+    """
+    valores = valores or {}
+    colunas = [coluna.name for coluna in destino.columns if coluna.name in valores or coluna.name in origem.c]
+    selecionadas = [valores[nome] if nome in valores else origem.c[nome] for nome in colunas]
+    filtro = origem.c[COLUNA_PACIENTE[origem.name]].in_(ids)
+    conexao.execute(insert(destino).from_select(colunas, select(*selecionadas).where(filtro)))
+
+
+def _apagar(conexao: Connection, tabelas: Iterable[str], ids: Sequence[int]):
+    for nome in tabelas:
+        tabela = _tabela(nome)
+        conexao.execute(delete(tabela).where(tabela.c[COLUNA_PACIENTE[nome]].in_(ids)))
+
+
+def _tabela(nome: str):
+    return Paciente.metadata.tables[nome]
+
+
+def arquivar_lote(conexao: Connection, corte: datetime, limite: int = ARQUIVO_LOTE) -> List[int]:
+    """
+    Move para o arquivo até limite pacientes inativos sem alterações desde
+    corte. Retorna os IDs arquivados (em ordem).
+    """
+    # FOR UPDATE: dois processos arquivando ao mesmo tempo não copiam o
+    # mesmo paciente, e ninguém o reativa entre a cópia e o DELETE
+    ids = conexao.execute(
+        select(Paciente.id)
+        .where(Paciente.ativo == False, func.coalesce(Paciente.updated_at, Paciente.created_at) < corte)
+        .order_by(Paciente.id)
+        .limit(limite)
+        .with_for_update()
+    ).scalars().all()
+    if not ids:
+        return []
+
+    arquivado_em = literal(datetime.utcnow(), PacienteArquivado.__table__.c.arquivado_em.type)
+    _copiar(conexao, Paciente.__table__, PacienteArquivado.__table__, ids, {"arquivado_em": arquivado_em})
+    _copiar(conexao, InformacoesPrivadas.__table__, InformacoesPrivadasArquivadas.__table__, ids)
+    _apagar(conexao, TABELAS_QUENTES, ids)
+    return ids
+
+
+def arquivar_inativos(engines: Sequence[Engine], dias: float = ARQUIVO_INATIVO_DIAS, limite: int = ARQUIVO_LOTE) -> int:
+    """
+    Arquiva todos os pacientes inativos há mais de dias, lote a lote
+    (uma transação por lote), em cada banco de pacientes.
+    Retorna a quantidade de pacientes arquivados.
+    """
+    corte = datetime.utcnow() - timedelta(days=dias)
+    total = 0
+    for engine in engines:
+        while True:
+            with engine.begin() as conexao:
+                ids = arquivar_lote(conexao, corte, limite)
+            for paciente_id in ids:
+                invalidar_resposta_publica(paciente_id)
+            total += len(ids)
+            if len(ids) < limite:
+                break
+    return total
+
+
+# -------------------------------------------------
+# Leitura e restauração (rotas)
+# -------------------------------------------------
+def ler_arquivado(db: Session, paciente_id: int) -> Optional[dict]:
+    """
+    Paciente arquivado no formato do PacienteResponse, mais arquivado_em.
+    """
+    arquivo, privadas = PacienteArquivado.__table__, InformacoesPrivadasArquivadas.__table__
+    linha = conexao_do_paciente(db, paciente_id).execute(
+        select(arquivo, *[coluna for coluna in privadas.c if coluna.name != "paciente_id"], privadas.c.paciente_id.label("privadas_de"))
+        .select_from(arquivo.outerjoin(privadas, privadas.c.paciente_id == arquivo.c.id))
+        .where(arquivo.c.id == paciente_id)
+    ).first()
+    if linha is None:
+        return None
+
+    dados = paciente_publico(linha)
+    dados["informacoes_privadas"] = informacoes_privadas(linha if linha.privadas_de is not None else None)
+    dados["arquivado_em"] = linha.arquivado_em
+    return dados
+
+
+def restaurar_paciente(db: Session, paciente_id: int) -> Optional[Paciente]:
+    """
+    Devolve o paciente arquivado às tabelas quentes, ativo e com uma nova
+    versão, e reconstrói os índices de busca dele na mesma transação
+    (o commit fica com a rota). Retorna None se não está no arquivo.
+    """
+    conexao = conexao_do_paciente(db, paciente_id)
+    arquivo = PacienteArquivado.__table__
+    existe = conexao.execute(select(arquivo.c.id).where(arquivo.c.id == paciente_id).with_for_update()).first()
+    if existe is None:
+        return None
+
+    agora = literal(datetime.utcnow(), Paciente.__table__.c.updated_at.type)
+    _copiar(conexao, arquivo, Paciente.__table__, [paciente_id], {"ativo": true(), "versao": arquivo.c.versao + 1, "updated_at": agora})
+    _copiar(conexao, InformacoesPrivadasArquivadas.__table__, InformacoesPrivadas.__table__, [paciente_id])
+    _apagar(conexao, ("informacoes_privadas_arquivo", "paciente_arquivo"), [paciente_id])
+
+    paciente = db.execute(PACIENTE_PRIVADO_POR_ID, {"id": paciente_id}).scalars().first()
+    indexar_nomes(db, [(paciente.id, paciente.nome)], novos=True)
+    indexar_termos(db, [(paciente.id, listas_clinicas(paciente))], novos=True)
+    return paciente
+
+
+# -------------------------------------------------
+# Exclusão em lote
+# -------------------------------------------------
+def _ids_por_banco(db: Session, paciente_ids: Iterable[int]) -> List[List[int]]:
+    particionamento = particionamento_da_sessao(db)
+    if particionamento is None:
+        return [list(paciente_ids)]
+
+    grupos: Dict[str, List[int]] = defaultdict(list)
+    for paciente_id in paciente_ids:
+        grupos[particionamento.shard_do_paciente(paciente_id)].append(paciente_id)
+    return list(grupos.values())
+
+
+def purgar_pacientes(db: Session, paciente_ids: Sequence[int], tamanho_lote: int = ARQUIVO_LOTE) -> List[int]:
+    """
+    Exclui permanentemente os pacientes (ativos ou arquivados) e todas as
+    linhas ligadas a eles: um DELETE por tabela para cada lote de IDs, no
+    banco de cada paciente, na transação da sessão.
+    Retorna os IDs que existiam.
+    """
+    excluidos = []
+    for ids in _ids_por_banco(db, dict.fromkeys(paciente_ids)):
+        conexao = conexao_do_paciente(db, ids[0])
+        for inicio in range(0, len(ids), tamanho_lote):
+            lote = ids[inicio:inicio + tamanho_lote]
+            existentes = conexao.execute(union_all(
+                select(Paciente.id).where(Paciente.id.in_(lote)),
+                select(PacienteArquivado.id).where(PacienteArquivado.id.in_(lote)),
+            )).scalars().all()
+            if existentes:
+                _apagar(conexao, reversed(TABELAS_PACIENTE), existentes)
+                excluidos.extend(existentes)
+    return excluidos
+
+
+# -------------------------------------------------
+# Tarefa em segundo plano
+# -------------------------------------------------
+class Arquivador:
+    """
+    Arquiva os pacientes inativos a cada ARQUIVO_INTERVALO segundos,
+    no threadpool (os lotes são transações curtas, não travam o event loop).
+    """
+
+    def __init__(self, engines: Sequence[Engine]):
+        self.engines = engines
+        self._tarefa: Optional[asyncio.Task] = None
+        self.executado_em: Optional[float] = None
+        self.duracao_ms: Optional[float] = None
+        self.arquivados_ultima = 0
+        self.arquivados_total = 0
+        self.ultimo_erro: Optional[str] = None
+
+    def iniciar(self):
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def encerrar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    async def _executar(self):
+        while True:
+            inicio = time.perf_counter()
+            try:
+                self.arquivados_ultima = await run_in_threadpool(arquivar_inativos, self.engines)
+                self.arquivados_total += self.arquivados_ultima
+                self.ultimo_erro = None
+                if self.arquivados_ultima:
+                    logger.info("%d pacientes inativos arquivados", self.arquivados_ultima)
+            except Exception as erro:
+                # Tenta de novo na próxima execução (lotes já gravados ficam arquivados)
+                logger.exception("Falha ao arquivar pacientes inativos")
+                self.ultimo_erro = str(erro)
+            self.executado_em = time.monotonic()
+            self.duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
+            await asyncio.sleep(ARQUIVO_INTERVALO)
+
+    def estado(self) -> dict:
+        return {
+            "ativo": self._tarefa is not None and not self._tarefa.done(),
+            "executado_ha_segundos": None if self.executado_em is None else round(time.monotonic() - self.executado_em, 1),
+            "duracao_ms": self.duracao_ms,
+            "arquivados_ultima_execucao": self.arquivados_ultima,
+            "arquivados_total": self.arquivados_total,
+            "ultimo_erro": self.ultimo_erro,
+        }
+
+
+arquivador = Arquivador(engines_pacientes)
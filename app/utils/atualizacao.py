@@ -0,0 +1,88 @@
+# Atualização em uma ida ao banco, com controle de concorrência otimista
+#
+# Em vez de ler o registro, alterar os atributos em Python, gravar e ler
+# de novo depois do commit, o PATCH emite um único
+# UPDATE ... SET ..., versao = versao + 1 WHERE id = ? [AND versao IN (...)].
+# Com RETURNING (SQLite 3.35+, PostgreSQL) a linha nova volta no próprio
+# UPDATE; sem suporte (MySQL), ela é lida logo em seguida pela chave.
+#
+# Nenhuma linha alterada: o registro não existe (404) ou não está mais na
+# versão do If-Match (412). Duas edições simultâneas com o mesmo ETag:
+# a primeira grava, a segunda recebe 412 em vez de sobrescrever.
+
+from typing import List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, undefer_group
+
+from app.models.paciente import InformacoesPrivadas, GRUPO_HISTORICO
+
+# Os objetos retornados vêm do RETURNING / da leitura pela chave e
+# substituem os valores dos que já estejam na sessão (ex: médico autenticado)
+_OPCOES_UPDATE = {"synchronize_session": False, "populate_existing": True}
+
+# Informações privadas completas (o histórico é deferred): a resposta do PATCH inclui tudo
+_COM_HISTORICO = undefer_group(GRUPO_HISTORICO)
+
+
+def atualizar_versionado(db: Session, conexao: Connection, modelo, registro_id: int, valores: dict, versoes: Optional[List[int]] = None):
+    """
+    Aplica valores ao registro e incrementa a versão, somente se a versão
+    atual estiver em versoes (None: qualquer versão).
+    A conexão indica o banco do registro (RETURNING depende do dialeto).
+    Retorna o objeto atualizado, ou None se nenhuma linha foi alterada.
+    """
+    comando = update(modelo).where(modelo.id == registro_id).values(**valores, versao=modelo.versao + 1)
+    if versoes is not None:
+        comando = comando.where(modelo.versao.in_(versoes))
+
+    if conexao.dialect.update_returning:
+        return db.execute(comando.returning(modelo), execution_options=_OPCOES_UPDATE).scalars().first()
+
+    if db.execute(comando, execution_options=_OPCOES_UPDATE).rowcount == 0:
+        return None
+    return db.get(modelo, registro_id, populate_existing=True)
+
+
+def versao_atual(db: Session, modelo, registro_id: int) -> Optional[int]:
+    """
+    Versão atual do registro (None se não existe). Só usada quando o
+    UPDATE não alterou nada, para diferenciar 404 de 412.
+    """
+    return db.execute(select(modelo.versao).where(modelo.id == registro_id)).scalar()
+
+
+def atualizar_informacoes_privadas(db: Session, conexao: Connection, paciente_id: int, valores: dict) -> InformacoesPrivadas:
+    """
+    Aplica valores às informações privadas do paciente com um UPDATE
+    direto (criando o registro se o paciente ainda não tiver um).
+    Deve rodar depois do UPDATE versionado do paciente, que trava a linha
+    do paciente até o commit.
+    """
+    if not valores:
+        info = db.execute(informacoes_privadas_completas(paciente_id)).scalars().first()
+    else:
+        comando = update(InformacoesPrivadas).where(InformacoesPrivadas.paciente_id == paciente_id).values(**valores)
+        if conexao.dialect.update_returning:
+            info = db.execute(comando.returning(InformacoesPrivadas).options(_COM_HISTORICO), execution_options=_OPCOES_UPDATE).scalars().first()
+        elif db.execute(comando, execution_options=_OPCOES_UPDATE).rowcount:
+            info = db.execute(
+                informacoes_privadas_completas(paciente_id),
+                execution_options={"populate_existing": True},
+            ).scalars().first()
+        else:
+            info = None
+
+    if info is None:
+        info = InformacoesPrivadas(paciente_id=paciente_id, **valores)
+        db.add(info)
+        db.flush()
+    return info
+
+
+def informacoes_privadas_completas(paciente_id: int):
+    """
+    SELECT das informações privadas do paciente com o histórico.
+    """
+    return select(InformacoesPrivadas).options(_COM_HISTORICO).where(InformacoesPrivadas.paciente_id == paciente_id)
@@ -0,0 +1,333 @@
+# Busca de pacientes por nome usando o índice de trigramas
+#
+# A ordem por relevância é aproximada: o índice entrega os candidatos dos
+# nomes mais curtos para os mais longos, em páginas de limite * FOLGA_CANDIDATOS,
+# e a preferência por nomes que começam com a busca só vale entre os candidatos
+# lidos. Um nome longo que começa com a busca fica de fora quando há mais de
+# limite nomes mais curtos que a contêm no meio. A quantidade não é aproximada:
+# se os falsos positivos descartados deixam menos que limite, a próxima página
+# é lida.
+
+import re
+from functools import lru_cache
+from itertools import repeat
+import unicodedata
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, delete, exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from app.config import BUSCA_TRIGRAMA_FREQUENTE, BUSCA_FREQUENCIA_TTL
+from app.models.busca import PacienteTrigrama
+from app.models.paciente import Paciente
+from app.utils.cache import CacheTTL
+from app.utils.lotes import inserir_em_lote
+from app.utils.shards import conexao_do_paciente
+
+# Quantos candidatos extras buscar além do limite, para compensar
+# falsos positivos (trigramas presentes mas fora de ordem no nome)
+FOLGA_CANDIDATOS = 2
+
+# Sequências de caracteres que não são letras/números (viram um espaço)
+_NAO_ALFANUMERICO = re.compile(r"[\W_]+")
+
+# Quantos pacientes têm cada trigrama (só há ~50 mil trigramas possíveis).
+# Com shards fica a contagem do shard que leu primeiro: ela só escolhe o
+# caminho da consulta, não muda o resultado
+_frequencias = CacheTTL(65536, BUSCA_FREQUENCIA_TTL)
+
+
+# -------------------------------------------------
+# Normalização e geração de trigramas
+# -------------------------------------------------
+def normalizar_texto(texto: str) -> str:
+    """
+    Normaliza um texto para busca:
+    - remove acentos ("João" → "joao")
+    - converte para minúsculas
+    - troca pontuação por espaço e junta espaços repetidos
+    """
+    if not texto.isascii():
+        decomposto = unicodedata.normalize("NFKD", texto)
+        texto = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return _NAO_ALFANUMERICO.sub(" ", texto.casefold()).strip()
+
+
+def gerar_trigramas(texto: str) -> set:
+    """
+    Gera os trigramas de um nome, palavra por palavra.
+    Cada palavra recebe dois espaços à esquerda e um à direita,
+    assim o início e o fim das palavras também viram trigramas.
+    """
+    trigramas = set()
+    for palavra in normalizar_texto(texto).split():
+        trigramas.update(_trigramas_palavra(palavra))
+    return trigramas
+
+
+@lru_cache(maxsize=16384)
+def _trigramas_palavra(palavra: str) -> tuple:
+    # Nomes e sobrenomes se repetem muito: na importação em massa quase
+    # todas as palavras já estão no cache
+    completa = f"  {palavra} "
+    return tuple(completa[i:i + 3] for i in range(len(completa) - 2))
+
+
+def _trigramas_consulta(consulta: str) -> set:
+    """
+    Gera os trigramas que um nome precisa conter para casar com a consulta.
+
+    Só as fronteiras de palavra que aparecem na própria consulta
+    viram trigramas com espaço, assim "oao" casa com "João" no meio.
+    Consultas de uma palavra com menos de 3 letras casam pelo início
+    das palavras do nome ("jo" → " jo").
+    """
+    palavras = consulta.split()
+    if len(palavras) == 1 and len(palavras[0]) < 3:
+        return {f"  {palavras[0]}"[-3:], f"  {palavras[0]}"[:3]}
+
+    trigramas = set()
+    for posicao, palavra in enumerate(palavras):
+        esquerda = "  " if posicao > 0 else ""
+        direita = " " if posicao < len(palavras) - 1 else ""
+        trecho = f"{esquerda}{palavra}{direita}"
+        trigramas.update(trecho[i:i + 3] for i in range(len(trecho) - 2))
+    return trigramas
+
+
+def _casa_com_consulta(nome: str, consulta: str) -> bool:
+    """
+    Confirma o casamento no nome normalizado
+    (o índice só garante que os trigramas existem).
+    """
+    nome_normalizado = normalizar_texto(nome)
+    if " " not in consulta and len(consulta) < 3:
+        return any(palavra.startswith(consulta) for palavra in nome_normalizado.split())
+    return consulta in nome_normalizado
+
+
+# -------------------------------------------------
+# Manutenção do índice
+# -------------------------------------------------
+def indexar_nomes(db: Session, pacientes: Iterable[Tuple[int, str]], novos: bool = False):
+    """
+    (Re)indexa os nomes informados como pares (paciente_id, nome).
+    Use novos=True para pacientes recém-inseridos (pula a remoção do índice antigo).
+    Não faz commit: o índice é gravado na mesma transação do paciente.
+    Com shards, todos os pacientes informados devem estar no mesmo shard.
+    """
+    pacientes = list(pacientes)
+    if not pacientes:
+        return
+
+    if not novos:
+        remover_indice_nomes(db, [paciente_id for paciente_id, _ in pacientes])
+
+    linhas = []
+    for paciente_id, nome in pacientes:
+        trigramas = gerar_trigramas(nome)
+        linhas.extend(zip(trigramas, repeat(paciente_id), repeat(len(trigramas))))
+
+    # Inserir na ordem da chave primária deixa as páginas do índice mais próximas
+    linhas.sort()
+
+    inserir_em_lote(conexao_do_paciente(db, pacientes[0][0]), PacienteTrigrama.__table__, ("trigrama", "paciente_id", "total"), linhas)
+
+
+def remover_indice_nomes(db: Session, paciente_ids: List[int]):
+    """
+    Remove os trigramas dos pacientes informados.
+    """
+    db.execute(delete(PacienteTrigrama).where(PacienteTrigrama.paciente_id.in_(paciente_ids)))
+
+
+# -------------------------------------------------
+# Consulta
+# -------------------------------------------------
+def buscar_pacientes_por_nome(db: Session, nome: str, limite: int, id: Optional[int] = None, opcoes: Sequence = ()) -> List[Paciente]:
+    """
+    Busca pacientes ativos cujo nome contém o texto informado,
+    ignorando acentos e maiúsculas/minúsculas.
+
+    Os resultados vêm ordenados por relevância: nomes que começam
+    com o texto buscado primeiro e, depois, nomes mais curtos.
+    opcoes são aplicadas à leitura dos pacientes (ex: load_only do ?fields=).
+    """
+    consulta = normalizar_texto(nome)
+    if not consulta:
+        return []
+
+    trigramas = _trigramas_consulta(consulta)
+    faltando = _frequencias_faltando(trigramas, id)
+    if faltando:
+        _guardar_frequencias(faltando, db.execute(_select_frequencias(faltando)).all())
+    guia, conferir = _separar_trigramas(trigramas, id)
+
+    ids, pacientes = [], []
+    while True:
+        pagina = db.execute(_select_candidatos(guia, conferir, limite, id, len(ids))).scalars().all()
+        if pagina:
+            encontrados = db.execute(select(Paciente).options(*opcoes).where(Paciente.id.in_(pagina))).scalars().all()
+            pacientes.extend(_confirmar(encontrados, consulta))
+            ids.extend(pagina)
+        if len(pagina) < limite * FOLGA_CANDIDATOS or len(pacientes) >= limite:
+            return _ranquear(pacientes, ids, consulta, limite)
+
+
+async def buscar_pacientes_por_nome_async(db: AsyncSession, nome: str, limite: int, id: Optional[int] = None, opcoes: Sequence = ()) -> List[Paciente]:
+    """
+    Versão assíncrona de buscar_pacientes_por_nome.
+    """
+    consulta = normalizar_texto(nome)
+    if not consulta:
+        return []
+
+    trigramas = _trigramas_consulta(consulta)
+    faltando = _frequencias_faltando(trigramas, id)
+    if faltando:
+        _guardar_frequencias(faltando, (await db.execute(_select_frequencias(faltando))).all())
+    guia, conferir = _separar_trigramas(trigramas, id)
+
+    ids, pacientes = [], []
+    while True:
+        pagina = (await db.execute(_select_candidatos(guia, conferir, limite, id, len(ids)))).scalars().all()
+        if pagina:
+            encontrados = (await db.execute(select(Paciente).options(*opcoes).where(Paciente.id.in_(pagina)))).scalars().all()
+            pacientes.extend(_confirmar(encontrados, consulta))
+            ids.extend(pagina)
+        if len(pagina) < limite * FOLGA_CANDIDATOS or len(pacientes) >= limite:
+            return _ranquear(pacientes, ids, consulta, limite)
+
+
+# -------------------------------------------------
+# Trigramas frequentes
+# -------------------------------------------------
+def _frequencias_faltando(trigramas: set, id: Optional[int]) -> List[str]:
+    """
+    Trigramas da busca cuja contagem ainda não está no cache
+    (nenhum quando o corte está desligado ou não faz diferença).
+    """
+    if id is not None or not BUSCA_TRIGRAMA_FREQUENTE or len(trigramas) < 2:
+        return []
+    return [trigrama for trigrama in trigramas if _frequencias.obter(trigrama) is None]
+
+
+def _select_frequencias(trigramas: List[str]):
+    """
+    Quantos pacientes têm cada trigrama (lê só o índice, sem a tabela paciente).
+    """
+    return (
+        select(PacienteTrigrama.trigrama, func.count())
+        .where(PacienteTrigrama.trigrama.in_(trigramas))
+        .group_by(PacienteTrigrama.trigrama)
+    )
+
+
+def _guardar_frequencias(trigramas: List[str], linhas):
+    contagens = dict.fromkeys(trigramas, 0)
+    for trigrama, quantidade in linhas:
+        contagens[trigrama] += quantidade
+    for trigrama, quantidade in contagens.items():
+        _frequencias.guardar(trigrama, quantidade)
+
+
+def _separar_trigramas(trigramas: set, id: Optional[int]) -> Tuple[set, set]:
+    """
+    Separa os trigramas da busca em (guia, conferir):
+    - guia: trigramas raros, cujas listas no índice são percorridas
+    - conferir: trigramas frequentes (ex: "  m", "ria"), conferidos só para
+      os candidatos da guia, um por um pela chave primária do índice
+    Se todos são frequentes, o mais raro vira a guia.
+    """
+    if id is not None or not BUSCA_TRIGRAMA_FREQUENTE or len(trigramas) < 2:
+        return trigramas, set()
+
+    contagens = {trigrama: _frequencias.obter(trigrama) or 0 for trigrama in trigramas}
+    guia = {trigrama for trigrama, quantidade in contagens.items() if quantidade <= BUSCA_TRIGRAMA_FREQUENTE}
+    if not guia:
+        guia = {min(contagens, key=contagens.get)}
+    return guia, trigramas - guia
+
+
+# -------------------------------------------------
+# Candidatos e ranking
+# -------------------------------------------------
+def _select_candidatos(guia: set, conferir: set, limite: int, id: Optional[int], deslocamento: int = 0):
+    """
+    Monta a consulta ao índice: IDs de pacientes ativos que possuem
+    todos os trigramas da busca, dos nomes mais curtos para os mais longos.
+    deslocamento pula as páginas de candidatos já lidas.
+    """
+    outro = aliased(PacienteTrigrama)
+    frequentes = [
+        exists().where(outro.trigrama == trigrama, outro.paciente_id == PacienteTrigrama.paciente_id)
+        for trigrama in sorted(conferir)
+    ]
+
+    candidatos = (
+        select(PacienteTrigrama.paciente_id)
+        .join(Paciente, Paciente.id == PacienteTrigrama.paciente_id)
+        .where(PacienteTrigrama.trigrama.in_(guia), Paciente.ativo == True)
+        .group_by(PacienteTrigrama.paciente_id)
+        .having(and_(func.count() == len(guia), *frequentes))
+        .order_by(func.min(PacienteTrigrama.total), PacienteTrigrama.paciente_id)
+        .limit(limite * FOLGA_CANDIDATOS)
+        .offset(deslocamento)
+    )
+    if id is not None:
+        candidatos = candidatos.where(PacienteTrigrama.paciente_id == id)
+
+    return candidatos
+
+
+def _confirmar(pacientes: List[Paciente], consulta: str) -> List[Paciente]:
+    """
+    Descarta falsos positivos (trigramas presentes mas fora de ordem no nome).
+    """
+    return [paciente for paciente in pacientes if _casa_com_consulta(paciente.nome, consulta)]
+
+
+def _ranquear(pacientes: List[Paciente], ids: List[int], consulta: str, limite: int) -> List[Paciente]:
+    """
+    Ordena os pacientes confirmados: nomes que começam com a busca primeiro,
+    depois a ordem vinda do índice.
+    """
+    posicao = {paciente_id: i for i, paciente_id in enumerate(ids)}
+    pacientes.sort(key=lambda p: (not normalizar_texto(p.nome).startswith(consulta), posicao[p.id]))
+
+    return pacientes[:limite]
+
+
+def chave_relevancia(nome: str):
+    """
+    Chave de ordenação equivalente à ordem de buscar_pacientes_por_nome,
+    para mesclar os resultados de vários shards.
+    """
+    consulta = normalizar_texto(nome)
+    return lambda p: (not normalizar_texto(p.nome).startswith(consulta), len(gerar_trigramas(p.nome)), p.id)
+
+
+def reindexar_todos(db: Session, tamanho_lote: int = 1000) -> int:
+    """
+    Reconstrói o índice de nomes de todos os pacientes,
+    em lotes e com commit a cada lote. Retorna o total indexado.
+    """
+    total = 0
+    ultimo_id = 0
+    while True:
+        lote = (
+            db.query(Paciente.id, Paciente.nome)
+            .filter(Paciente.id > ultimo_id)
+            .order_by(Paciente.id)
+            .limit(tamanho_lote)
+            .all()
+        )
+        if not lote:
+            return total
+
+        indexar_nomes(db, [(linha.id, linha.nome) for linha in lote])
+        db.commit()
+
+        total += len(lote)
+        ultimo_id = lote[-1].id
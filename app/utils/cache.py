@@ -0,0 +1,79 @@
+# Cache em memória com limite de tamanho (LRU) e tempo de vida (TTL)
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class CacheTTL:
+    """
+    Cache LRU com expiração por tempo, seguro para uso entre threads.
+
+    - Ao atingir o tamanho máximo, descarta o item usado há mais tempo
+    - Itens expirados são descartados na leitura
+    - Conta acertos (hits) e falhas (misses) para monitoramento
+    """
+
+    def __init__(self, tamanho_maximo: int, ttl: float):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self.acertos = 0
+        self.falhas = 0
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave: Hashable) -> Optional[Any]:
+        """
+        Retorna o valor guardado ou None se não existir / estiver expirado.
+        """
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                self.falhas += 1
+                return None
+
+            valor, expira_em = item
+            if expira_em <= time.monotonic():
+                del self._dados[chave]
+                self.falhas += 1
+                return None
+
+            self._dados.move_to_end(chave)
+            self.acertos += 1
+            return valor
+
+    def guardar(self, chave: Hashable, valor: Any, ttl: Optional[float] = None):
+        """
+        Guarda um valor. O ttl informado só pode encurtar o ttl padrão.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.tamanho_maximo <= 0:
+            return
+
+        with self._lock:
+            self._dados[chave] = (valor, time.monotonic() + ttl)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.tamanho_maximo:
+                self._dados.popitem(last=False)
+
+    def invalidar(self, chave: Hashable):
+        """
+        Remove um item do cache (se existir).
+        """
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "itens": len(self._dados),
+                "tamanho_maximo": self.tamanho_maximo,
+                "ttl_segundos": self.ttl,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+            }
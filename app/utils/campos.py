@@ -0,0 +1,101 @@
+# Campos esparsos (?fields=) nas rotas de leitura de pacientes
+#
+# Com ?fields=id,nome a rota lê do banco só essas colunas (load_only) e
+# serializa só esses campos: listas JSON, contatos e informações privadas
+# não pedidos não são lidos, decodificados nem enviados. O id é sempre
+# lido (identidade do objeto, cursor e mescla dos shards), mas só aparece
+# na resposta se for pedido.
+#
+# Os campos são validados contra o schema da rota (PacienteBase ou
+# PacienteResponse). Nas rotas privadas, informacoes_privadas.<campo>
+# escolhe campos das informações privadas (ex: só o tipo sanguíneo, sem
+# ler o histórico).
+#
+# As rotas devolvem o JSON pronto (app/utils/serializacao.py), sem o
+# response_model; a Projecao faz o papel de um schema montado a partir
+# dos campos pedidos, com as mesmas chaves e a mesma ordem do schema.
+
+from functools import lru_cache
+from operator import attrgetter
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import joinedload, load_only
+
+from app.models.paciente import Paciente, InformacoesPrivadas
+from app.schemas.paciente_schemas import PacienteBase, PacienteResponse, InformacoesPrivadasBase
+from app.utils.serializacao import _contatos
+
+PREFIXO_PRIVADAS = "informacoes_privadas."
+
+# Valor de cada campo do PacienteBase (mesmas conversões de paciente_publico)
+_VALORES = {campo: attrgetter(campo) for campo in PacienteBase.model_fields}
+_VALORES["contatos_emergencia"] = lambda paciente: _contatos(paciente.contatos_emergencia)
+
+
+class Projecao:
+    """
+    Campos pedidos, na ordem do schema, e o que decorre deles: as opções
+    de carregamento da consulta e a serialização só desses campos.
+    """
+
+    def __init__(self, campos: Tuple[str, ...], privados: Optional[Tuple[str, ...]]):
+        self.campos = campos        # Campos do PacienteBase
+        self.privados = privados    # Campos das informações privadas (None: não pedidas)
+
+    def opcoes(self, *necessarios: str) -> list:
+        """
+        Opções da consulta de Paciente: só as colunas pedidas, mais o id e
+        as de necessarios (usadas pela rota, ex: nome na busca por relevância).
+        """
+        colunas = dict.fromkeys(("id", *necessarios, *self.campos))
+        opcoes = [load_only(*[getattr(Paciente, coluna) for coluna in colunas], raiseload=True)]
+        if self.privados is not None:
+            opcoes.append(
+                joinedload(Paciente.informacoes_privadas)
+                .load_only(*[getattr(InformacoesPrivadas, campo) for campo in self.privados], raiseload=True)
+            )
+        return opcoes
+
+    def serializar(self, paciente: Paciente) -> dict:
+        dados = {campo: _VALORES[campo](paciente) for campo in self.campos}
+        if self.privados is not None:
+            info = paciente.informacoes_privadas
+            dados["informacoes_privadas"] = None if info is None else {campo: getattr(info, campo) for campo in self.privados}
+        return dados
+
+
+def projecao_paciente(fields: Optional[str], privado: bool = False) -> Optional[Projecao]:
+    """
+    Projecao do ?fields= (None se não informado). Campos fora do schema
+    da rota: 400.
+    """
+    if fields is None:
+        return None
+    return _montar_projecao(fields, privado)
+
+
+@lru_cache(maxsize=256)
+def _montar_projecao(fields: str, privado: bool) -> Projecao:
+    pedidos = {campo.strip() for campo in fields.split(",") if campo.strip()}
+    schema = PacienteResponse if privado else PacienteBase
+
+    privados = None
+    if privado and "informacoes_privadas" in pedidos:
+        privados = tuple(InformacoesPrivadasBase.model_fields)
+    elif privado:
+        escolhidos = {campo.removeprefix(PREFIXO_PRIVADAS) for campo in pedidos if campo.startswith(PREFIXO_PRIVADAS)}
+        if escolhidos:
+            privados = tuple(campo for campo in InformacoesPrivadasBase.model_fields if campo in escolhidos)
+
+    validos = set(schema.model_fields)
+    if privado:
+        validos |= {PREFIXO_PRIVADAS + campo for campo in InformacoesPrivadasBase.model_fields}
+    invalidos = sorted(pedidos - validos)
+    if invalidos or not pedidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos inválidos em fields: {', '.join(invalidos) or '(nenhum)'}. Disponíveis: {', '.join(sorted(validos))}",
+        )
+
+    return Projecao(tuple(campo for campo in PacienteBase.model_fields if campo in pedidos), privados)
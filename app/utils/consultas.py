@@ -0,0 +1,125 @@
+# Instrumentação das consultas SQL por requisição (Server-Timing, log de lentas e N+1)
+
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.config import SQL_LENTA_MS, SQL_DEBUG_N1, SQL_N1_LIMIAR
+
+logger = logging.getLogger("vitalkey.sql")
+
+
+class EstatisticasConsultas:
+    """
+    Consultas executadas durante uma requisição.
+    """
+
+    __slots__ = ("consultas", "tempo_ms", "repeticoes")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_ms = 0.0
+        # SQL → quantidade de execuções (só no modo SQL_DEBUG_N1)
+        self.repeticoes = Counter() if SQL_DEBUG_N1 else None
+
+    def repetidas(self) -> dict:
+        """
+        Comandos idênticos executados SQL_N1_LIMIAR vezes ou mais (possível N+1).
+        """
+        if not self.repeticoes:
+            return {}
+        return {sql: total for sql, total in self.repeticoes.items() if total >= SQL_N1_LIMIAR}
+
+
+# Estatísticas da requisição atual. O contexto é copiado para as threads
+# das rotas síncronas, então elas atualizam o mesmo objeto.
+_estatisticas: ContextVar[Optional[EstatisticasConsultas]] = ContextVar("estatisticas_consultas", default=None)
+
+
+# -------------------------------------------------
+# Eventos do engine
+# -------------------------------------------------
+def _antes_de_executar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_consulta", []).append(time.perf_counter())
+
+
+def _depois_de_executar(conn, cursor, statement, parameters, context, executemany):
+    duracao_ms = (time.perf_counter() - conn.info["inicio_consulta"].pop()) * 1000
+
+    estatisticas = _estatisticas.get()
+    if estatisticas is not None:
+        estatisticas.consultas += 1
+        estatisticas.tempo_ms += duracao_ms
+        if estatisticas.repeticoes is not None:
+            estatisticas.repeticoes[statement] += 1
+
+    if SQL_LENTA_MS and duracao_ms >= SQL_LENTA_MS:
+        logger.warning("Consulta lenta (%.1f ms): %s | parâmetros: %s", duracao_ms, " ".join(statement.split()), _redigir(parameters, executemany))
+
+
+def _redigir(parameters, executemany: bool) -> str:
+    """
+    Descreve os parâmetros sem os valores (dados de pacientes não vão para o log).
+    """
+    if executemany:
+        return f"executemany com {len(parameters)} linhas"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{chave}: <{type(valor).__name__}>" for chave, valor in parameters.items()) + "}"
+    return "(" + ", ".join(f"<{type(valor).__name__}>" for valor in parameters or ()) + ")"
+
+
+def instrumentar_engine(engine):
+    """
+    Registra os eventos de medição no engine (síncrono ou o sync_engine do assíncrono).
+    """
+    event.listen(engine, "before_cursor_execute", _antes_de_executar)
+    event.listen(engine, "after_cursor_execute", _depois_de_executar)
+
+
+# -------------------------------------------------
+# Middleware
+# -------------------------------------------------
+class ConsultasMiddleware:
+    """
+    Middleware ASGI que abre as estatísticas de cada requisição e envia
+    o cabeçalho Server-Timing (db = tempo no banco, total = até o início
+    da resposta). Em respostas em streaming, as consultas feitas depois
+    do envio dos cabeçalhos não entram no Server-Timing.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estatisticas = EstatisticasConsultas()
+        token = _estatisticas.set(estatisticas)
+        inicio = time.perf_counter()
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - inicio) * 1000
+                timing = (
+                    f'db;dur={estatisticas.tempo_ms:.1f};desc="{estatisticas.consultas} consultas", '
+                    f"total;dur={total_ms:.1f}"
+                )
+                repetidas = estatisticas.repetidas()
+                if repetidas:
+                    timing += f', n1;desc="{len(repetidas)} consultas repetidas"'
+                mensagem["headers"] = list(mensagem.get("headers", [])) + [(b"server-timing", timing.encode())]
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _estatisticas.reset(token)
+
+        for sql, total in estatisticas.repetidas().items():
+            logger.warning("Possível N+1 em %s %s: comando executado %d vezes: %s", scope["method"], scope["path"], total, " ".join(sql.split()))
@@ -0,0 +1,56 @@
+# Consultas mais executadas pelas rotas, montadas uma única vez
+#
+# Os valores entram por bindparam, então o mesmo objeto é reutilizado em
+# todas as requisições: a rota não remonta o select a cada chamada e a
+# chave de cache da consulta é sempre a mesma, o que garante acerto no
+# cache de compilação do engine (aquecido na inicialização, ver aquecimento.py).
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import joinedload
+
+from app.models.medico import Medico
+from app.models.paciente import Paciente, GRUPO_HISTORICO
+
+# Rota pública GET /paciente/{id} (falta no cache de respostas)
+PACIENTE_POR_ID = select(Paciente).where(Paciente.id == bindparam("id"))
+
+# Conferência do cache de respostas públicas (só a versão, pela chave primária)
+VERSAO_PACIENTE_POR_ID = select(Paciente.versao).where(Paciente.id == bindparam("id"))
+
+# Rota privada: paciente e informações privadas (com o histórico) em uma única consulta
+PACIENTE_PRIVADO_POR_ID = (
+    select(Paciente)
+    .options(joinedload(Paciente.informacoes_privadas).undefer_group(GRUPO_HISTORICO))
+    .where(Paciente.id == bindparam("id"))
+)
+
+# Listagem paginada sem filtros (GET /pacientes); cursor 0 = primeira página
+PACIENTES_ATIVOS_PAGINA = (
+    select(Paciente)
+    .where(Paciente.ativo == True, Paciente.id > bindparam("cursor"))
+    .order_by(Paciente.id)
+    .limit(bindparam("limite"))
+)
+
+# autenticar_medico (falta no cache de autenticação)
+MEDICO_POR_ID = select(Medico).where(Medico.id == bindparam("id"))
+
+# Conferência do cache de autenticação (só versão e ativo, pela chave primária)
+ESTADO_MEDICO_POR_ID = select(Medico.versao, Medico.ativo).where(Medico.id == bindparam("id"))
+
+# Login por CRM ou e-mail
+MEDICO_POR_LOGIN = select(Medico).where((Medico.crm == bindparam("login")) | (Medico.email == bindparam("login")))
+
+# Consultas executadas no aquecimento, com parâmetros que não retornam linhas
+# (nos shards, só as de pacientes)
+CONSULTAS_AQUECIMENTO_PACIENTES = (
+    (PACIENTE_POR_ID, {"id": 0}),
+    (VERSAO_PACIENTE_POR_ID, {"id": 0}),
+    (PACIENTE_PRIVADO_POR_ID, {"id": 0}),
+    (PACIENTES_ATIVOS_PAGINA, {"cursor": 0, "limite": 0}),
+)
+CONSULTAS_AQUECIMENTO = CONSULTAS_AQUECIMENTO_PACIENTES + (
+    (MEDICO_POR_ID, {"id": 0}),
+    (ESTADO_MEDICO_POR_ID, {"id": 0}),
+    (MEDICO_POR_LOGIN, {"login": ""}),
+)
@@ -0,0 +1,314 @@
+# Feed de alterações de pacientes (GET /pacientes/eventos, Server-Sent Events)
+#
+# As rotas de escrita gravam um PacienteEvento na mesma transação da
+# alteração. Uma única tarefa (DifusorEventos) lê os eventos novos do
+# banco e os entrega a todos os assinantes conectados: uma leitura no
+# banco atende qualquer número de telas abertas, em vez de cada uma
+# repetir GET /pacientes periodicamente.
+#
+# Ordem e lacunas: o seq é reservado no INSERT, mas fica visível só no
+# commit. Com escritas concorrentes (MySQL/InnoDB), o seq N+1 pode ficar
+# visível antes do N; avançar o cursor para N+1 perderia o N para sempre.
+# Por isso a leitura entrega só o trecho sem lacunas: parada em um seq
+# faltando, ela espera até EVENTOS_ESPERA_LACUNA segundos (contados do
+# criado_em do evento seguinte) e só então considera o seq descartado
+# (transação desfeita, que consome o seq sem gravar). Garantia: cada
+# assinante recebe os eventos em ordem crescente de seq, sem repetição, e
+# nenhum evento é pulado, exceto o de uma transação que fique aberta mais
+# de EVENTOS_ESPERA_LACUNA segundos depois de gravá-lo (as rotas fazem o
+# commit logo após a escrita). O custo é o atraso: depois de uma transação
+# desfeita, os eventos seguintes chegam em até EVENTOS_ESPERA_LACUNA segundos.
+#
+# Um erro ao ler o registro (ex: "database is locked", reconexão do MySQL)
+# não encerra a tarefa: ela registra o erro no log e tenta de novo a partir
+# do mesmo seq, esperando cada vez mais entre as tentativas.
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Set
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import EVENTOS_INTERVALO, EVENTOS_HEARTBEAT, EVENTOS_FILA, EVENTOS_LOTE, EVENTOS_ESPERA_LACUNA, EVENTOS_ASSINANTES_MAXIMO
+from app.database import SessionLocal
+from app.models.evento import PacienteEvento
+from app.utils.lotes import inserir_em_lote
+from app.utils.shards import conexao_principal
+
+logger = logging.getLogger("vitalkey.eventos")
+
+# Espera máxima entre tentativas quando a leitura do registro falha (segundos)
+ESPERA_MAXIMA_ERRO = 30
+
+CRIADO = "criado"
+ATUALIZADO = "atualizado"
+EXCLUIDO = "excluido"
+
+# Colunas gravadas em lote pela importação
+COLUNAS_EVENTO = ("paciente_id", "tipo", "versao", "campos", "criado_em")
+
+
+# -------------------------------------------------
+# Gravação
+# -------------------------------------------------
+def registrar_evento(db: Session, paciente_id: int, tipo: str, versao: Optional[int] = None, campos: Optional[List[str]] = None):
+    """
+    Adiciona o evento à transação atual; é gravado no commit da rota.
+    """
+    db.add(PacienteEvento(paciente_id=paciente_id, tipo=tipo, versao=versao, campos=sorted(campos) if campos else None))
+
+
+def registrar_eventos_criados(db: Session, paciente_ids: List[int]):
+    """
+    Eventos de criação de vários pacientes em um único executemany (importação).
+    """
+    _registrar_eventos_em_lote(db, paciente_ids, CRIADO, 1)
+
+
+def registrar_eventos_excluidos(db: Session, paciente_ids: List[int]):
+    """
+    Eventos de exclusão de vários pacientes em um único executemany (exclusão em lote).
+    """
+    _registrar_eventos_em_lote(db, paciente_ids, EXCLUIDO, None)
+
+
+def _registrar_eventos_em_lote(db: Session, paciente_ids: List[int], tipo: str, versao: Optional[int]):
+    criado_em = datetime.utcnow()
+    linhas = [(paciente_id, tipo, versao, None, criado_em) for paciente_id in paciente_ids]
+    inserir_em_lote(conexao_principal(db), PacienteEvento.__table__, COLUNAS_EVENTO, linhas, converter=True)
+
+
+# -------------------------------------------------
+# Leitura
+# -------------------------------------------------
+def _evento_publico(evento: PacienteEvento) -> dict:
+    return {
+        "seq": evento.seq,
+        "paciente_id": evento.paciente_id,
+        "tipo": evento.tipo,
+        "versao": evento.versao,
+        "campos": evento.campos,
+        "criado_em": evento.criado_em,
+    }
+
+
+def _sem_lacunas(eventos: List[PacienteEvento], desde: int) -> List[PacienteEvento]:
+    """
+    Eventos (em ordem de seq, todos depois de desde) até a primeira lacuna
+    recente: seqs faltando antes de um evento gravado há menos de
+    EVENTOS_ESPERA_LACUNA segundos podem ser de transações ainda abertas.
+    """
+    limite_espera = datetime.utcnow() - timedelta(seconds=EVENTOS_ESPERA_LACUNA)
+    esperado = desde + 1
+    for posicao, evento in enumerate(eventos):
+        if evento.seq != esperado and evento.criado_em > limite_espera:
+            return eventos[:posicao]
+        esperado = evento.seq + 1
+    return eventos
+
+
+def ler_eventos(desde: int, limite: int = EVENTOS_LOTE) -> List[dict]:
+    """
+    Eventos com seq maior que desde, em ordem, até o limite, parando
+    antes de uma lacuna que ainda pode ser preenchida (ver cabeçalho).
+    Menos que limite eventos: não há mais nada confirmado por enquanto.
+    """
+    with SessionLocal() as db:
+        eventos = db.execute(
+            select(PacienteEvento).where(PacienteEvento.seq > desde).order_by(PacienteEvento.seq).limit(limite)
+        ).scalars().all()
+        return [_evento_publico(evento) for evento in _sem_lacunas(eventos, desde)]
+
+
+def ultimo_seq(limite: int = EVENTOS_LOTE) -> int:
+    """
+    Maior seq sem lacunas recentes antes dele: ponto de partida do difusor.
+    Só os últimos limite eventos são conferidos; lacunas anteriores a
+    eles são antigas demais para uma transação ainda aberta.
+    """
+    with SessionLocal() as db:
+        recentes = db.execute(
+            select(PacienteEvento).order_by(PacienteEvento.seq.desc()).limit(limite)
+        ).scalars().all()
+    if not recentes:
+        return 0
+    recentes.reverse()
+    confirmados = _sem_lacunas(recentes[1:], recentes[0].seq)
+    return confirmados[-1].seq if confirmados else recentes[0].seq
+
+
+def formatar_sse(evento: dict) -> bytes:
+    """
+    Evento no formato text/event-stream. O id é o seq: o navegador o
+    reenvia em Last-Event-ID ao se reconectar.
+    """
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (evento["seq"], evento["tipo"].encode(), orjson.dumps(evento, option=orjson.OPT_UTC_Z))
+
+
+# -------------------------------------------------
+# Difusão para os assinantes
+# -------------------------------------------------
+# Marca colocada na fila de um assinante lento demais: o stream é
+# encerrado e o cliente se reconecta a partir do último seq recebido
+_ATRASADO = None
+
+
+class DifusorEventos:
+    """
+    Lê os eventos novos do banco em uma única tarefa e os coloca na fila
+    de cada assinante. A leitura acontece quando uma rota deste processo
+    avisa que gravou (notificar) ou a cada EVENTOS_INTERVALO segundos,
+    o que cobre escritas feitas por outros processos/workers.
+    A tarefa só roda enquanto houver assinantes.
+    """
+
+    def __init__(self):
+        self._assinantes: Set[asyncio.Queue] = set()
+        self._tarefa: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._novo: Optional[asyncio.Event] = None
+        self.ultimo_seq = 0
+
+    @property
+    def assinantes(self) -> int:
+        return len(self._assinantes)
+
+    async def assinar(self) -> asyncio.Queue:
+        """
+        Registra um assinante. Os eventos com seq maior que ultimo_seq
+        (no momento da assinatura) chegam pela fila retornada.
+        """
+        if self._tarefa is None or self._tarefa.done():
+            ultimo = await run_in_threadpool(ultimo_seq)
+            # Outro assinante pode ter iniciado a tarefa durante a consulta
+            if self._tarefa is None or self._tarefa.done():
+                self.ultimo_seq = ultimo
+                self._loop = asyncio.get_running_loop()
+                self._novo = asyncio.Event()
+                self._tarefa = asyncio.create_task(self._executar())
+
+        fila = asyncio.Queue(maxsize=EVENTOS_FILA)
+        self._assinantes.add(fila)
+        return fila
+
+    def cancelar(self, fila: asyncio.Queue):
+        self._assinantes.discard(fila)
+
+    def notificar(self):
+        """
+        Avisa que há eventos novos. Pode ser chamada das threads das rotas síncronas.
+        """
+        loop, novo = self._loop, self._novo
+        if loop is not None and novo is not None and self._assinantes:
+            try:
+                loop.call_soon_threadsafe(novo.set)
+            except RuntimeError:  # loop já encerrado
+                pass
+
+    async def encerrar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    async def _executar(self):
+        falhas = 0
+        while self._assinantes:
+            try:
+                await asyncio.wait_for(self._novo.wait(), EVENTOS_INTERVALO)
+            except asyncio.TimeoutError:
+                pass
+            self._novo.clear()
+
+            try:
+                await self._ler_novos()
+                falhas = 0
+            except Exception:
+                # Erro passageiro do banco (ex: "database is locked", reconexão):
+                # ultimo_seq só avança com a leitura entregue, então a próxima
+                # tentativa continua do mesmo ponto, sem pular eventos
+                falhas += 1
+                logger.exception("Falha ao ler o registro de eventos (tentativa %d)", falhas)
+                await asyncio.sleep(min(EVENTOS_INTERVALO * 2 ** falhas, ESPERA_MAXIMA_ERRO))
+
+    async def _ler_novos(self):
+        # Lê em lotes até alcançar o fim do registro ou uma lacuna
+        # recente; a lacuna é conferida de novo na próxima leitura
+        while True:
+            eventos = await run_in_threadpool(ler_eventos, self.ultimo_seq)
+            for evento in eventos:
+                self._entregar(evento)
+            if eventos:
+                self.ultimo_seq = eventos[-1]["seq"]
+            if len(eventos) < EVENTOS_LOTE:
+                return
+
+    def _entregar(self, evento: dict):
+        for fila in list(self._assinantes):
+            try:
+                fila.put_nowait(evento)
+            except asyncio.QueueFull:
+                # Assinante não acompanha o ritmo: descarta o que está na fila
+                # e encerra o stream dele
+                self._assinantes.discard(fila)
+                while not fila.empty():
+                    fila.get_nowait()
+                fila.put_nowait(_ATRASADO)
+
+
+difusor = DifusorEventos()
+
+
+def notificar_eventos():
+    difusor.notificar()
+
+
+def assinantes_disponiveis() -> bool:
+    return not EVENTOS_ASSINANTES_MAXIMO or difusor.assinantes < EVENTOS_ASSINANTES_MAXIMO
+
+
+async def gerar_sse(desde: Optional[int]) -> AsyncIterator[bytes]:
+    """
+    Stream de um assinante: primeiro os eventos já gravados depois de
+    desde (lidos do banco em lotes), depois os novos, entregues pelo difusor.
+    Sem desde, começa pelos eventos gravados a partir da assinatura.
+    """
+    fila = await difusor.assinar()
+    try:
+        enviado = difusor.ultimo_seq if desde is None else desde
+
+        # Reconexão: os clientes esperam 3 s antes de tentar de novo
+        yield b"retry: 3000\n\n"
+
+        # Eventos anteriores à assinatura (e os que chegarem durante a leitura)
+        while desde is not None:
+            eventos = await run_in_threadpool(ler_eventos, enviado)
+            for evento in eventos:
+                yield formatar_sse(evento)
+            if eventos:
+                enviado = eventos[-1]["seq"]
+            if len(eventos) < EVENTOS_LOTE:
+                break
+
+        while True:
+            try:
+                evento = await asyncio.wait_for(fila.get(), EVENTOS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # Comentário SSE: mantém a conexão viva em proxies
+                yield b": ping\n\n"
+                continue
+
+            if evento is _ATRASADO:
+                return
+            if evento["seq"] > enviado:
+                enviado = evento["seq"]
+                yield formatar_sse(evento)
+    finally:
+        difusor.cancelar(fila)
@@ -0,0 +1,216 @@
+# Exportação em streaming de pacientes com as informações privadas
+
+import csv
+import gzip
+import heapq
+import io
+import zlib
+from typing import Iterator, Optional, Sequence, Tuple
+
+import orjson
+from sqlalchemy import select, union_all
+from sqlalchemy.engine import Engine
+
+from app.models.arquivo import PacienteArquivado, InformacoesPrivadasArquivadas
+from app.models.paciente import Paciente, InformacoesPrivadas
+
+# Linhas lidas do banco por vez (cursor do lado do servidor)
+TAMANHO_LOTE_EXPORTACAO = 1000
+
+# Tamanho aproximado de cada bloco enviado/gravado
+TAMANHO_BLOCO = 64 * 1024
+
+FORMATOS = ("ndjson", "csv")
+
+# Colunas do paciente e das informações privadas, na ordem do CSV
+COLUNAS_PACIENTE = [coluna.key for coluna in Paciente.__table__.columns]
+COLUNAS_PRIVADAS = [
+    coluna.key for coluna in InformacoesPrivadas.__table__.columns
+    if coluna.key not in ("id", "paciente_id")
+]
+COLUNAS_JSON = {"alergias", "doencas_cronicas", "medicamentos_continuos", "contatos_emergencia",
+                "cirurgias", "internacoes_passadas", "alteracoes_exames", "historico_exames"}
+
+
+def _select_pacientes(pacientes, privadas, privadas_id, desde_id: int):
+    """
+    Pacientes com as informações privadas em um único LEFT JOIN.
+    privadas_id só indica se o paciente tem informações privadas.
+    """
+    return (
+        select(
+            *[pacientes.c[coluna] for coluna in COLUNAS_PACIENTE],
+            privadas_id.label("privadas_id"),
+            *[privadas.c[coluna].label(f"privadas_{coluna}") for coluna in COLUNAS_PRIVADAS],
+        )
+        .select_from(pacientes.outerjoin(privadas, privadas.c.paciente_id == pacientes.c.id))
+        .where(pacientes.c.id > desde_id)
+    )
+
+
+def _consulta(desde_id: int, incluir_arquivados: bool = True):
+    """
+    Pacientes ativos e inativos, incluindo os que o arquivador moveu para
+    paciente_arquivo (UNION ALL; cada paciente está em só uma das tabelas),
+    ordenados por ID para permitir retomar a exportação.
+    """
+    privadas = InformacoesPrivadas.__table__
+    consulta = _select_pacientes(Paciente.__table__, privadas, privadas.c.id, desde_id)
+    if not incluir_arquivados:
+        return consulta.order_by(Paciente.id)
+
+    privadas_arquivadas = InformacoesPrivadasArquivadas.__table__
+    arquivados = _select_pacientes(PacienteArquivado.__table__, privadas_arquivadas, privadas_arquivadas.c.paciente_id, desde_id)
+    return union_all(consulta, arquivados).order_by("id")
+
+
+def _linhas_banco(engine: Engine, desde_id: int, incluir_arquivados: bool = True) -> Iterator:
+    """
+    Lê as linhas com stream_results (cursor do servidor no MySQL) e yield_per,
+    mantendo na memória apenas um lote por vez.
+    """
+    with engine.connect() as conexao:
+        resultado = conexao.execution_options(
+            stream_results=True,
+            yield_per=TAMANHO_LOTE_EXPORTACAO
+        ).execute(_consulta(desde_id, incluir_arquivados))
+
+        for linha in resultado.mappings():
+            yield linha
+
+
+def _linhas(engines: Sequence[Engine], desde_id: int, incluir_arquivados: bool = True) -> Iterator:
+    """
+    Com shards, mescla os cursores de todos os bancos na ordem de ID
+    (cada um já vem ordenado), mantendo a retomada por desde_id.
+    """
+    if len(engines) == 1:
+        return _linhas_banco(engines[0], desde_id, incluir_arquivados)
+    return heapq.merge(*(_linhas_banco(engine, desde_id, incluir_arquivados) for engine in engines), key=lambda linha: linha["id"])
+
+
+def _ndjson(linhas: Iterator) -> Iterator[bytes]:
+    for linha in linhas:
+        registro = {coluna: linha[coluna] for coluna in COLUNAS_PACIENTE}
+        registro["informacoes_privadas"] = (
+            {coluna: linha[f"privadas_{coluna}"] for coluna in COLUNAS_PRIVADAS}
+            if linha["privadas_id"] is not None else None
+        )
+        yield orjson.dumps(registro) + b"\n"
+
+
+def _csv(linhas: Iterator, cabecalho: bool) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    colunas = COLUNAS_PACIENTE + COLUNAS_PRIVADAS
+
+    if cabecalho:
+        escritor.writerow(colunas)
+
+    for linha in linhas:
+        valores = [linha[coluna] for coluna in COLUNAS_PACIENTE]
+        valores += [linha[f"privadas_{coluna}"] for coluna in COLUNAS_PRIVADAS]
+        # Listas JSON viram texto JSON dentro da célula
+        escritor.writerow([
+            orjson.dumps(valor).decode() if coluna in COLUNAS_JSON and valor is not None else valor
+            for coluna, valor in zip(colunas, valores)
+        ])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _em_blocos(partes: Iterator[bytes]) -> Iterator[bytes]:
+    # Junta as linhas em blocos de ~64 KiB para reduzir escritas/chunks HTTP
+    pendentes, tamanho = [], 0
+    for parte in partes:
+        pendentes.append(parte)
+        tamanho += len(parte)
+        if tamanho >= TAMANHO_BLOCO:
+            yield b"".join(pendentes)
+            pendentes, tamanho = [], 0
+    if pendentes:
+        yield b"".join(pendentes)
+
+
+def _gzip(blocos: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # wbits=31 → formato gzip
+    for bloco in blocos:
+        comprimido = compressor.compress(bloco)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
+
+def exportar_pacientes(engines: Sequence[Engine], formato: str = "ndjson", comprimir: bool = False,
+                       desde_id: int = 0, cabecalho: Optional[bool] = None, incluir_arquivados: bool = True) -> Iterator[bytes]:
+    """
+    Gera a exportação completa em blocos de bytes, com memória constante.
+
+    - engines: bancos com os pacientes (o principal ou os shards)
+    - formato: "ndjson" (um paciente por linha, com informacoes_privadas aninhadas)
+      ou "csv" (colunas achatadas, listas como texto JSON)
+    - comprimir: gera gzip em streaming
+    - desde_id: exporta só pacientes com ID maior (retomada)
+    - cabecalho: escreve o cabeçalho do CSV (padrão: só no início, desde_id == 0)
+    - incluir_arquivados: inclui os pacientes do arquivo (inativos), como
+      inativos; sem eles, a exportação não serve de backup completo
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}")
+
+    linhas = _linhas(engines, desde_id, incluir_arquivados)
+    if formato == "ndjson":
+        partes = _ndjson(linhas)
+    else:
+        partes = _csv(linhas, cabecalho if cabecalho is not None else desde_id == 0)
+
+    blocos = _em_blocos(partes)
+    return _gzip(blocos) if comprimir else blocos
+
+
+def ultimo_id_exportado(caminho: str, formato: str, comprimido: bool) -> Tuple[int, Optional[int]]:
+    """
+    Lê um arquivo de exportação e retorna o ID do último paciente completo e,
+    se o arquivo termina com um registro incompleto, o tamanho em bytes (sem
+    compressão) da parte completa; None se o arquivo está inteiro.
+
+    No CSV um registro pode ocupar várias linhas (quebra de linha dentro de um
+    campo entre aspas), então o arquivo é lido com csv.reader, registro a registro.
+    """
+    abrir = gzip.open if comprimido else open
+    ultimo_id = 0
+    completo = 0       # Bytes até o fim do último registro completo
+    lido = 0           # Bytes lidos até agora
+    ultima_linha = ""
+
+    with abrir(caminho, "rt", encoding="utf-8", newline="") as arquivo:
+        def linhas() -> Iterator[str]:
+            nonlocal lido, ultima_linha
+            for linha in arquivo:
+                lido += len(linha.encode("utf-8"))
+                ultima_linha = linha
+                yield linha
+
+        if formato == "csv":
+            # strict: um campo entre aspas cortado no fim do arquivo gera erro em vez de um registro
+            registros = csv.reader(linhas(), strict=True)
+            try:
+                for numero, registro in enumerate(registros):
+                    # O registro termina na última linha consumida pelo leitor
+                    if not ultima_linha.endswith("\n"):
+                        break
+                    if numero and registro:  # O primeiro registro é o cabeçalho
+                        ultimo_id = int(registro[0])
+                    completo = lido
+            except csv.Error:
+                pass
+        else:
+            for linha in linhas():
+                if not linha.endswith("\n"):
+                    break
+                if linha.strip():
+                    ultimo_id = orjson.loads(linha)["id"]
+                completo = lido
+
+    return ultimo_id, (completo if completo < lido else None)
@@ -0,0 +1,236 @@
+# Importação em massa de pacientes a partir de NDJSON
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.config import TAMANHO_LOTE_IMPORTACAO, LIMITE_ERROS_IMPORTACAO
+from app.models.paciente import Paciente, InformacoesPrivadas
+from app.schemas.paciente_schemas import PacienteCreate
+from app.utils.busca import indexar_nomes
+from app.utils.eventos import registrar_eventos_criados, notificar_eventos
+from app.utils.lotes import inserir_em_lote
+from app.utils.shards import Particionamento, particionamento_da_sessao, conexao_do_paciente
+from app.utils.termos import indexar_termos, listas_clinicas
+
+# Colunas gravadas pela importação, na ordem das tuplas de cada lote
+COLUNAS_PACIENTE = (
+    "nome", "alergias", "doencas_cronicas", "medicamentos_continuos",
+    "contatos_emergencia", "created_at", "updated_at", "versao", "ativo",
+)
+COLUNAS_PRIVADAS = (
+    "paciente_id", "tipo_sanguineo", "cirurgias", "internacoes_passadas",
+    "alteracoes_exames", "historico_exames",
+)
+
+
+class ImportadorPacientes:
+    """
+    Importa pacientes no formato do PacienteCreate, uma linha JSON por paciente.
+
+    As linhas são validadas uma a uma e gravadas em lotes:
+    cada lote vira um INSERT executemany (direto no driver) em paciente,
+    outro em informacoes_privadas e um commit. Linhas inválidas não
+    interrompem a importação e entram no relatório de erros.
+    Com shards, os IDs do lote são reservados antes e cada shard recebe
+    os seus pacientes em um executemany próprio.
+    """
+
+    def __init__(self, db: Session, tamanho_lote: int = TAMANHO_LOTE_IMPORTACAO):
+        self.db = db
+        self.tamanho_lote = tamanho_lote
+        self.linhas = 0
+        self.inseridos = 0
+        self.total_erros = 0
+        self.erros = []
+        self._pendentes: List[Tuple[int, PacienteCreate]] = []
+
+    # -------------------------------------------------
+    # Entrada
+    # -------------------------------------------------
+    def processar_linhas(self, linhas: Iterable[Union[str, bytes]]):
+        """
+        Processa várias linhas seguidas (numeradas a partir da última processada).
+        """
+        for linha in linhas:
+            self.processar_linha(linha)
+
+    def processar_linha(self, linha: Union[str, bytes]):
+        """
+        Valida uma linha e a coloca no lote; grava o lote quando ele enche.
+        """
+        self.linhas += 1
+        if not linha.strip():
+            return
+
+        try:
+            paciente = PacienteCreate.model_validate_json(linha)
+        except ValidationError as erro:
+            self._registrar_erro(
+                self.linhas,
+                erro.errors(include_url=False, include_context=False, include_input=False)
+            )
+            return
+
+        self._pendentes.append((self.linhas, paciente))
+        if len(self._pendentes) >= self.tamanho_lote:
+            self._gravar_lote()
+
+    def finalizar(self) -> dict:
+        """
+        Grava o último lote e retorna o relatório da importação.
+        """
+        self._gravar_lote()
+        return {
+            "linhas": self.linhas,
+            "inseridos": self.inseridos,
+            "total_erros": self.total_erros,
+            "erros": self.erros,
+        }
+
+    # -------------------------------------------------
+    # Gravação
+    # -------------------------------------------------
+    def _gravar_lote(self):
+        if not self._pendentes:
+            return
+
+        lote, self._pendentes = self._pendentes, []
+
+        try:
+            pacientes = [paciente for _, paciente in lote]
+            particionamento = particionamento_da_sessao(self.db)
+            if particionamento is None:
+                grupos = [list(zip(self._inserir_pacientes(pacientes), pacientes))]
+            else:
+                grupos = self._inserir_pacientes_em_shards(particionamento, pacientes)
+
+            # Informações privadas e índices, no mesmo banco de cada grupo de pacientes
+            for grupo in grupos:
+                privadas = [
+                    (
+                        paciente_id,
+                        paciente.informacoes_privadas.tipo_sanguineo,
+                        paciente.informacoes_privadas.cirurgias,
+                        paciente.informacoes_privadas.internacoes_passadas,
+                        paciente.informacoes_privadas.alteracoes_exames,
+                        paciente.informacoes_privadas.historico_exames,
+                    )
+                    for paciente_id, paciente in grupo
+                    if paciente.informacoes_privadas
+                ]
+                conexao = conexao_do_paciente(self.db, grupo[0][0])
+                inserir_em_lote(conexao, InformacoesPrivadas.__table__, COLUNAS_PRIVADAS, privadas, converter=True)
+
+                indexar_nomes(self.db, [(paciente_id, paciente.nome) for paciente_id, paciente in grupo], novos=True)
+                indexar_termos(self.db, [(paciente_id, listas_clinicas(paciente)) for paciente_id, paciente in grupo], novos=True)
+
+            registrar_eventos_criados(self.db, [paciente_id for grupo in grupos for paciente_id, _ in grupo])
+            self.db.commit()
+        except Exception as erro:
+            # Falha de banco derruba só o lote atual; os anteriores já foram confirmados
+            self.db.rollback()
+            for numero, _ in lote:
+                self._registrar_erro(numero, [{"msg": f"Erro ao gravar no banco: {erro.__class__.__name__}"}])
+            return
+
+        self.inseridos += len(lote)
+        notificar_eventos()
+
+    def _inserir_pacientes(self, pacientes: List[PacienteCreate]) -> List[int]:
+        """
+        Insere os pacientes e retorna os IDs gerados, na mesma ordem.
+        """
+        linhas = _linhas_pacientes(pacientes)
+
+        conexao = self.db.connection()
+        tabela = Paciente.__table__
+
+        # SQLite: o primeiro INSERT já garante o lock de escrita da transação,
+        # então nenhum outro processo insere no meio do lote e os rowids
+        # seguintes são consecutivos (max(id) + 1 a cada linha)
+        if conexao.dialect.name == "sqlite":
+            primeiro = dict(zip(COLUNAS_PACIENTE, linhas[0]))
+            primeiro_id = conexao.execute(insert(tabela).values(**primeiro)).inserted_primary_key[0]
+            inserir_em_lote(conexao, tabela, COLUNAS_PACIENTE, linhas[1:], converter=True)
+            return list(range(primeiro_id, primeiro_id + len(linhas)))
+
+        linhas = [dict(zip(COLUNAS_PACIENTE, linha)) for linha in linhas]
+
+        # Bancos com RETURNING em lote: um único executemany
+        # devolve os IDs na ordem dos parâmetros
+        if conexao.dialect.insert_executemany_returning_sort_by_parameter_order:
+            stmt = insert(tabela).returning(tabela.c.id, sort_by_parameter_order=True)
+            return list(conexao.execute(stmt, linhas).scalars())
+
+        # MySQL: sem RETURNING em lote. Um único INSERT com várias linhas recebe
+        # IDs consecutivos (innodb_autoinc_lock_mode 0 ou 1) e o lastrowid
+        # (LAST_INSERT_ID()) é o primeiro deles
+        passo = _passo_ids_consecutivos(conexao)
+        if passo is not None:
+            primeiro_id = conexao.execute(insert(tabela).values(linhas)).lastrowid
+            return list(range(primeiro_id, primeiro_id + passo * len(linhas), passo))
+
+        # innodb_autoinc_lock_mode 2: os IDs de um mesmo INSERT podem se
+        # intercalar com os de outras conexões; um INSERT por linha
+        return [conexao.execute(insert(tabela).values(**linha)).inserted_primary_key[0] for linha in linhas]
+
+    def _inserir_pacientes_em_shards(self, particionamento: Particionamento, pacientes: List[PacienteCreate]) -> List[List[Tuple[int, PacienteCreate]]]:
+        """
+        Reserva os IDs na sequência global, insere cada paciente no seu shard
+        (um executemany por shard) e retorna os pares (id, paciente) por shard.
+        """
+        ids = particionamento.novos_ids(len(pacientes))
+        grupos = defaultdict(list)
+        for paciente_id, paciente, linha in zip(ids, pacientes, _linhas_pacientes(pacientes)):
+            grupos[particionamento.shard_do_paciente(paciente_id)].append((paciente_id, paciente, (paciente_id, *linha)))
+
+        for grupo in grupos.values():
+            conexao = conexao_do_paciente(self.db, grupo[0][0])
+            inserir_em_lote(conexao, Paciente.__table__, ("id", *COLUNAS_PACIENTE), [linha for _, _, linha in grupo], converter=True)
+
+        return [[(paciente_id, paciente) for paciente_id, paciente, _ in grupo] for grupo in grupos.values()]
+
+    def _registrar_erro(self, numero: int, erros: list):
+        self.total_erros += 1
+        if len(self.erros) < LIMITE_ERROS_IMPORTACAO:
+            self.erros.append({"linha": numero, "erros": erros})
+
+
+# Por engine MySQL: intervalo entre os IDs de um INSERT com várias linhas
+# (auto_increment_increment), ou None se não são garantidamente consecutivos
+_passos_autoincremento: Dict[Engine, Optional[int]] = {}
+
+
+def _passo_ids_consecutivos(conexao: Connection) -> Optional[int]:
+    engine = conexao.engine
+    if engine not in _passos_autoincremento:
+        modo, passo = conexao.exec_driver_sql("SELECT @@innodb_autoinc_lock_mode, @@auto_increment_increment").one()
+        _passos_autoincremento[engine] = int(passo) if int(modo) in (0, 1) else None
+    return _passos_autoincremento[engine]
+
+
+def _linhas_pacientes(pacientes: List[PacienteCreate]) -> List[tuple]:
+    """
+    Tuplas na ordem de COLUNAS_PACIENTE.
+    """
+    criado_em = datetime.utcnow()
+    return [
+        (
+            paciente.nome,
+            paciente.alergias,
+            paciente.doencas_cronicas,
+            paciente.medicamentos_continuos,
+            [c.model_dump() for c in (paciente.contatos_emergencia or [])],
+            criado_em,
+            criado_em,
+            1,
+            True,
+        )
+        for paciente in pacientes
+    ]
@@ -0,0 +1,48 @@
+# INSERT em lote direto no driver do banco
+
+from typing import Callable, List, Sequence, Tuple
+
+from sqlalchemy import Table, insert
+from sqlalchemy.engine import Connection
+
+
+def inserir_em_lote(conexao: Connection, tabela: Table, colunas: Sequence[str], valores: List[Tuple], converter: bool = False):
+    """
+    Insere muitas linhas com um único executemany do driver (DBAPI),
+    sem montar um dicionário de parâmetros por linha no SQLAlchemy.
+
+    Usado nas cargas em massa (importação e índices auxiliares).
+    Com converter=False os valores vão direto ao driver, então só
+    servem colunas de tipos simples (int/str). Com converter=True
+    cada valor passa pelo conversor do tipo da coluna (JSON, datas...).
+    """
+    if not valores:
+        return
+
+    if converter:
+        # Só as colunas que têm conversor (JSON, datas...); as demais vão como estão
+        processadores = [
+            (posicao, processar) for posicao, coluna in enumerate(colunas)
+            if (processar := tabela.c[coluna].type.bind_processor(conexao.dialect))
+        ]
+        if processadores:
+            valores = [_converter(linha, processadores) for linha in valores]
+
+    compilado = insert(tabela).compile(dialect=conexao.dialect, column_keys=list(colunas))
+
+    if compilado.positional:
+        # Placeholders posicionais (ex: "?" no SQLite): tuplas na ordem do SQL
+        ordem = [list(colunas).index(coluna) for coluna in compilado.positiontup]
+        if ordem != list(range(len(colunas))):
+            valores = [tuple(linha[i] for i in ordem) for linha in valores]
+        conexao.exec_driver_sql(str(compilado), valores)
+    else:
+        # Placeholders nomeados (ex: "%(coluna)s" no PyMySQL)
+        conexao.exec_driver_sql(str(compilado), [dict(zip(colunas, linha)) for linha in valores])
+
+
+def _converter(linha: Tuple, processadores: List[Tuple[int, Callable]]) -> Tuple:
+    convertida = list(linha)
+    for posicao, processar in processadores:
+        convertida[posicao] = processar(convertida[posicao])
+    return tuple(convertida)
@@ -0,0 +1,199 @@
+# Métricas da aplicação no formato de texto do Prometheus (GET /metrics)
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Limites (segundos) dos buckets do histograma de latência
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Rótulo usado quando a requisição não casou com nenhuma rota (404, rejeições do limitador)
+ROTA_DESCONHECIDA = "desconhecida"
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_rotulos(nomes: Tuple[str, ...], valores: Tuple, extra: str = "") -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _numero(valor: float) -> str:
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+# -------------------------------------------------
+# Tipos de métrica
+# -------------------------------------------------
+class Contador:
+    """
+    Contador monotônico com rótulos. A trava protege os incrementos
+    feitos pelas threads das rotas síncronas.
+    """
+
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._valores: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *valores_rotulos, quantidade: float = 1):
+        with self._lock:
+            self._valores[valores_rotulos] = self._valores.get(valores_rotulos, 0) + quantidade
+
+    def amostras(self) -> Iterable[str]:
+        for valores, total in sorted(self._valores.items()):
+            yield f"{self.nome}{_formatar_rotulos(self.rotulos, valores)} {_numero(total)}"
+
+
+class Histograma:
+    """
+    Histograma com buckets fixos por combinação de rótulos.
+    Atualizado pelo middleware no event loop, mas lido pela rota /metrics
+    em uma thread do threadpool: a trava garante que a coleta veja cada
+    observação inteira (buckets, soma e total juntos).
+    """
+
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Tuple[str, ...] = (), buckets: Tuple[float, ...] = BUCKETS_LATENCIA):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.buckets = buckets
+        # rótulos → [contagem por bucket (+Inf no fim), soma, total]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *valores_rotulos):
+        bucket = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores_rotulos)
+            if serie is None:
+                serie = self._series[valores_rotulos] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][bucket] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def amostras(self) -> Iterable[str]:
+        # Copia as séries sob a trava e formata fora dela
+        with self._lock:
+            series = [(valores, (list(contagens), soma, total)) for valores, (contagens, soma, total) in self._series.items()]
+        for valores, (contagens, soma, total) in sorted(series):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, contagens):
+                acumulado += contagem
+                rotulos = _formatar_rotulos(self.rotulos, valores, 'le="%s"' % limite)
+                yield f"{self.nome}_bucket{rotulos} {acumulado}"
+            rotulos = _formatar_rotulos(self.rotulos, valores, 'le="+Inf"')
+            yield f"{self.nome}_bucket{rotulos} {total}"
+            yield f"{self.nome}_sum{_formatar_rotulos(self.rotulos, valores)} {repr(soma)}"
+            yield f"{self.nome}_count{_formatar_rotulos(self.rotulos, valores)} {total}"
+
+
+class Coletor:
+    """
+    Métricas lidas só no momento da coleta (estado do pool, caches...).
+    A função retorna pares (valores dos rótulos, valor).
+    """
+
+    def __init__(self, nome: str, ajuda: str, tipo: str, rotulos: Tuple[str, ...], funcao: Callable[[], Iterable[Tuple[Tuple, float]]]):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.tipo = tipo
+        self.rotulos = rotulos
+        self.funcao = funcao
+
+    def amostras(self) -> Iterable[str]:
+        for valores, valor in self.funcao():
+            yield f"{self.nome}{_formatar_rotulos(self.rotulos, valores)} {_numero(valor)}"
+
+
+# -------------------------------------------------
+# Registro
+# -------------------------------------------------
+_metricas: List = []
+
+
+def _registrar(metrica):
+    _metricas.append(metrica)
+    return metrica
+
+
+def registrar_coletor(nome: str, ajuda: str, tipo: str, rotulos: Tuple[str, ...], funcao: Callable) -> Coletor:
+    return _registrar(Coletor(nome, ajuda, tipo, rotulos, funcao))
+
+
+def exportar_metricas() -> str:
+    """
+    Gera o texto no formato de exposição do Prometheus (versão 0.0.4).
+    """
+    linhas = []
+    for metrica in _metricas:
+        linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+        linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+        linhas.extend(metrica.amostras())
+    return "\n".join(linhas) + "\n"
+
+
+REQUISICOES = _registrar(Contador("vitalkey_http_requisicoes_total", "Requisições HTTP atendidas", ("metodo", "rota", "status")))
+ERROS = _registrar(Contador("vitalkey_http_erros_total", "Requisições com status 5xx ou exceção não tratada", ("metodo", "rota")))
+DURACAO = _registrar(Histograma("vitalkey_http_duracao_segundos", "Duração das requisições HTTP", ("metodo", "rota")))
+FALHAS_AUTENTICACAO = _registrar(Contador("vitalkey_autenticacao_falhas_total", "Falhas de autenticação de médicos", ("motivo",)))
+
+_em_andamento = [0]
+registrar_coletor(
+    "vitalkey_http_requisicoes_em_andamento", "Requisições HTTP sendo atendidas agora", "gauge", (),
+    lambda: [((), _em_andamento[0])],
+)
+
+
+# -------------------------------------------------
+# Middleware
+# -------------------------------------------------
+class MetricasMiddleware:
+    """
+    Middleware ASGI que conta as requisições e mede a duração por
+    template de rota (ex: /paciente/{paciente_id}), nunca pelo caminho
+    cru, para o número de séries não crescer com os IDs.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status[0] = mensagem["status"]
+            await send(mensagem)
+
+        _em_andamento[0] += 1
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao = time.perf_counter() - inicio
+            _em_andamento[0] -= 1
+
+            rota = scope.get("route")
+            rota = rota.path if rota is not None else ROTA_DESCONHECIDA
+            metodo = scope["method"]
+
+            REQUISICOES.incrementar(metodo, rota, status[0])
+            DURACAO.observar(duracao, metodo, rota)
+            if status[0] >= 500:
+                ERROS.incrementar(metodo, rota)
\ No newline at end of file
@@ -0,0 +1,120 @@
+# Pool de conexões instrumentado e ajustes de conexão do SQLite
+
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import SQLITE_WAL, SQLITE_SYNCHRONOUS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE, SQLITE_BUSY_TIMEOUT
+
+# Checkouts acima deste tempo contam como "espera" por conexão livre
+LIMIAR_ESPERA_MS = 5.0
+
+
+# -------------------------------------------------
+# Estatísticas de checkout do pool
+# -------------------------------------------------
+class _EstatisticasCheckout:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.esperas = 0
+        self.timeouts = 0
+        self.tempo_total_ms = 0.0
+        self.tempo_maximo_ms = 0.0
+
+    def registrar(self, duracao_ms: float):
+        with self._lock:
+            self.checkouts += 1
+            self.tempo_total_ms += duracao_ms
+            self.tempo_maximo_ms = max(self.tempo_maximo_ms, duracao_ms)
+            if duracao_ms >= LIMIAR_ESPERA_MS:
+                self.esperas += 1
+
+    def registrar_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+
+class _CheckoutInstrumentado:
+    """
+    Mede quanto tempo cada checkout leva (espera por conexão livre
+    + abertura de conexões novas) e quantos estouram o pool_timeout.
+    """
+
+    def connect(self):
+        if not hasattr(self, "_estatisticas"):
+            self._estatisticas = _EstatisticasCheckout()
+
+        inicio = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self._estatisticas.registrar_timeout()
+            raise
+        finally:
+            self._estatisticas.registrar((time.perf_counter() - inicio) * 1000)
+
+
+class QueuePoolInstrumentado(_CheckoutInstrumentado, QueuePool):
+    pass
+
+
+class AsyncQueuePoolInstrumentado(_CheckoutInstrumentado, AsyncAdaptedQueuePool):
+    pass
+
+
+def estatisticas_pool(engine) -> dict:
+    """
+    Retorna o estado atual do pool do engine e os contadores de checkout.
+    """
+    pool = engine.pool
+    dados = {"classe": type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        dados.update({
+            "tamanho": pool.size(),
+            "em_uso": pool.checkedout(),
+            "livres": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "timeout_segundos": pool.timeout(),
+        })
+
+    estatisticas = getattr(pool, "_estatisticas", None)
+    if estatisticas is not None:
+        dados.update({
+            "checkouts": estatisticas.checkouts,
+            "checkouts_com_espera": estatisticas.esperas,
+            "timeouts": estatisticas.timeouts,
+            "tempo_medio_checkout_ms": round(estatisticas.tempo_total_ms / max(estatisticas.checkouts, 1), 3),
+            "tempo_maximo_checkout_ms": round(estatisticas.tempo_maximo_ms, 3),
+        })
+
+    return dados
+
+
+# -------------------------------------------------
+# Ajustes do SQLite
+# -------------------------------------------------
+def configurar_sqlite(conexao_dbapi, registro_conexao):
+    """
+    Listener do evento "connect": aplica os PRAGMAs de desempenho
+    em cada nova conexão SQLite.
+
+    - WAL: leitores não bloqueiam escritores (e vice-versa)
+    - synchronous=NORMAL: seguro com WAL e bem mais rápido que FULL
+    - mmap_size / cache_size: leituras servidas da memória
+    - busy_timeout: espera o lock em vez de falhar com "database is locked"
+    """
+    cursor = conexao_dbapi.cursor()
+    try:
+        if SQLITE_WAL:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
@@ -0,0 +1,213 @@
+# Rebalanceamento dos shards e migração de uma instalação sem shards
+#
+# Mover buckets: as linhas dos buckets (paciente, informacoes_privadas,
+# índices de busca e arquivo) são copiadas para o shard de destino, o mapa passa a
+# apontar para ele e, depois que os processos releem o mapa
+# (SHARD_MAPA_RECARGA), as linhas são apagadas da origem. As leituras
+# continuam durante todo o processo; as escritas devem estar paradas
+# (uma escrita na origem depois da cópia se perderia).
+#
+# Interrompido no meio, basta executar de novo: cada lote apaga do destino
+# as cópias parciais dos mesmos IDs antes de inserir.
+
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.engine import Engine
+
+from app.config import SHARD_MAPA_RECARGA
+from app.utils.lotes import inserir_em_lote
+from app.utils.shards import COLUNA_PACIENTE, TABELAS_PACIENTE, Particionamento, gravar_mapa
+
+TAMANHO_LOTE_COPIA = 1000
+
+# Cada passada da cópia percorre uma tabela de pacientes e leva junto as linhas ligadas a eles
+GRUPOS_COPIA = (
+    ("paciente", ("paciente", "informacoes_privadas", "paciente_trigrama", "paciente_termo")),
+    ("paciente_arquivo", ("paciente_arquivo", "informacoes_privadas_arquivo")),
+)
+
+
+def _tabela(nome: str):
+    from app.database import Base
+    from app.models import arquivo, busca, paciente  # noqa: F401 (registra as tabelas no Base)
+
+    return Base.metadata.tables[nome]
+
+
+def _colunas_copiadas(nome: str) -> List[str]:
+    # informacoes_privadas.id é um autoincremento local de cada banco:
+    # o destino gera o seu (nada referencia esse ID)
+    return [coluna.name for coluna in _tabela(nome).columns if not (nome == "informacoes_privadas" and coluna.name == "id")]
+
+
+# -------------------------------------------------
+# Planejamento
+# -------------------------------------------------
+def planejar(mapa: List[str], nomes: Sequence[str], esvaziar: Sequence[str] = ()) -> Dict[int, Tuple[str, str]]:
+    """
+    Movimentos bucket → (origem, destino) que deixam os buckets divididos
+    igualmente entre os shards, exceto os de esvaziar, que ficam sem nenhum.
+    Move o mínimo possível: só os buckets acima da cota de cada shard.
+    """
+    ativos = [nome for nome in nomes if nome not in esvaziar]
+    if not ativos:
+        raise ValueError("Nenhum shard restaria para receber os buckets")
+
+    cota = {nome: len(mapa) // len(ativos) + (1 if i < len(mapa) % len(ativos) else 0) for i, nome in enumerate(ativos)}
+
+    por_shard = defaultdict(list)
+    for bucket, nome in enumerate(mapa):
+        por_shard[nome].append(bucket)
+
+    sobras = []
+    for nome, buckets in por_shard.items():
+        excesso = len(buckets) - cota.get(nome, 0)
+        if excesso > 0:
+            sobras.extend((bucket, nome) for bucket in buckets[-excesso:])
+
+    movimentos = {}
+    for nome in ativos:
+        for _ in range(cota[nome] - len(por_shard[nome])):
+            bucket, origem = sobras.pop()
+            movimentos[bucket] = (origem, nome)
+    return movimentos
+
+
+# -------------------------------------------------
+# Cópia e remoção
+# -------------------------------------------------
+def copiar_pacientes(origem: Engine, destino_de: Callable[[int], Engine], filtro=None, tamanho_lote: int = TAMANHO_LOTE_COPIA) -> int:
+    """
+    Copia os pacientes da origem (ativos e arquivados; todos ou os de
+    filtro(coluna_id)), em lotes por ID, com as linhas ligadas a eles,
+    para o banco que destino_de(id) indicar.
+    Retorna a quantidade de pacientes copiados.
+    """
+    copiados = 0
+    with origem.connect() as leitura:
+        for principal, tabelas in GRUPOS_COPIA:
+            copiados += _copiar_grupo(leitura, _tabela(principal), tabelas, destino_de, filtro, tamanho_lote)
+    return copiados
+
+
+def _copiar_grupo(leitura, pacientes, tabelas, destino_de, filtro, tamanho_lote: int) -> int:
+    copiados = 0
+    ultimo_id = 0
+    while True:
+        consulta = select(pacientes.c.id).where(pacientes.c.id > ultimo_id).order_by(pacientes.c.id).limit(tamanho_lote)
+        if filtro is not None:
+            consulta = consulta.where(filtro(pacientes.c.id))
+        lote = leitura.execute(consulta).scalars().all()
+        if not lote:
+            return copiados
+
+        por_destino = defaultdict(list)
+        for paciente_id in lote:
+            por_destino[destino_de(paciente_id)].append(paciente_id)
+
+        for destino, ids in por_destino.items():
+            with destino.begin() as escrita:
+                # Cópia parcial de uma execução interrompida
+                _apagar(escrita, ids=ids, tabelas=tabelas)
+                for nome in tabelas:
+                    tabela = _tabela(nome)
+                    colunas = _colunas_copiadas(nome)
+                    dados = leitura.execute(
+                        select(*[tabela.c[coluna] for coluna in colunas]).where(tabela.c[COLUNA_PACIENTE[nome]].in_(ids))
+                    ).all()
+                    inserir_em_lote(escrita, tabela, colunas, [tuple(linha) for linha in dados], converter=True)
+
+        copiados += len(lote)
+        ultimo_id = lote[-1]
+
+
+def _apagar(conexao, ids: Optional[List[int]] = None, buckets: Optional[List[int]] = None, total_buckets: int = 0, tabelas: Sequence[str] = TABELAS_PACIENTE):
+    # Filhos antes do paciente (chaves estrangeiras)
+    for nome in reversed(tabelas):
+        tabela = _tabela(nome)
+        coluna = tabela.c[COLUNA_PACIENTE[nome]]
+        comando = delete(tabela)
+        if ids is not None:
+            comando = comando.where(coluna.in_(ids))
+        if buckets is not None:
+            comando = comando.where((coluna % total_buckets).in_(buckets))
+        conexao.execute(comando)
+
+
+def contar_pacientes(engine: Engine) -> int:
+    with engine.connect() as conexao:
+        return conexao.execute(select(func.count()).select_from(_tabela("paciente"))).scalar()
+
+
+# -------------------------------------------------
+# Operações da CLI
+# -------------------------------------------------
+def rebalancear(particionamento: Particionamento, esvaziar: Sequence[str] = (), esperar: bool = True, saida=print) -> int:
+    """
+    Divide os buckets igualmente entre os shards (exceto os de esvaziar).
+    Retorna a quantidade de pacientes movidos.
+    """
+    desconhecidos = set(esvaziar) - set(particionamento.nomes)
+    if desconhecidos:
+        raise ValueError(f"Shards desconhecidos: {sorted(desconhecidos)}")
+
+    mapa = particionamento.mapa
+    movimentos = planejar(mapa.atual(), particionamento.nomes, esvaziar)
+    if not movimentos:
+        saida("✅ Buckets já estão balanceados")
+        return 0
+
+    grupos = defaultdict(list)
+    for bucket, (origem, destino) in sorted(movimentos.items()):
+        grupos[(origem, destino)].append(bucket)
+
+    movidos = 0
+    for (origem, destino), buckets in grupos.items():
+        total = copiar_pacientes(
+            particionamento.shard(origem).engine,
+            lambda _: particionamento.shard(destino).engine,
+            lambda coluna: (coluna % mapa.buckets).in_(buckets),
+        )
+        gravar_mapa(particionamento.engine, {bucket: destino for bucket in buckets})
+        mapa.recarregar()
+        saida(f"↪️  {len(buckets)} buckets ({total} pacientes): {origem} → {destino}")
+        movidos += total
+
+    # Os processos da API passam a usar o mapa novo antes de a origem perder as linhas
+    if esperar:
+        saida(f"⏳ Aguardando {SHARD_MAPA_RECARGA:.0f}s para os processos relerem o mapa")
+        time.sleep(SHARD_MAPA_RECARGA)
+
+    for (origem, destino), buckets in grupos.items():
+        with particionamento.shard(origem).engine.begin() as conexao:
+            _apagar(conexao, buckets=buckets, total_buckets=mapa.buckets)
+
+    return movidos
+
+
+def migrar_principal(particionamento: Particionamento, saida=print) -> int:
+    """
+    Distribui entre os shards os pacientes gravados no banco principal
+    (instalação anterior ao sharding), mantendo os IDs, e os apaga do principal.
+    Deve rodar antes de a API ser iniciada com SHARDS.
+    """
+    total = copiar_pacientes(
+        particionamento.engine,
+        lambda paciente_id: particionamento.shard(particionamento.shard_do_paciente(paciente_id)).engine,
+    )
+    with particionamento.engine.begin() as conexao:
+        _apagar(conexao)
+
+    saida(f"↪️  {total} pacientes migrados do banco principal para os shards")
+    return total
+
+
+def estado(particionamento: Particionamento) -> List[dict]:
+    por_shard = particionamento.mapa.buckets_por_shard()
+    return [
+        {"shard": shard.nome, "buckets": len(por_shard.get(shard.nome, [])), "pacientes": contar_pacientes(shard.engine)}
+        for shard in particionamento.shards
+    ]
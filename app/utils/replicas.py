@@ -0,0 +1,233 @@
+# Réplicas de leitura (DATABASE_REPLICAS)
+#
+# Requisições GET/HEAD recebem uma sessão em uma réplica e as demais usam
+# o banco principal. Depois que um cliente grava, as leituras dele vão ao
+# principal por REPLICA_JANELA_ESCRITA segundos, para que ele veja o que
+# acabou de gravar mesmo com atraso de replicação. Réplicas com falha saem
+# do rodízio até a próxima verificação; sem réplica disponível, a leitura
+# vai para o principal.
+
+import hashlib
+import itertools
+import logging
+import math
+import threading
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.config import REPLICA_JANELA_ESCRITA, REPLICA_VERIFICACAO_INTERVALO, REPLICA_CLIENTES_MAXIMO
+from app.utils.cache import CacheTTL
+
+logger = logging.getLogger("vitalkey.replicas")
+
+PRIMARIO = "primario"
+
+# Cookie que marca o cliente que gravou há pouco (vale entre workers/processos)
+COOKIE_ESCRITA = "vk_escrita"
+
+# Consulta de verificação: falha também se o arquivo/banco não tiver o esquema
+SQL_VERIFICACAO = "SELECT 1 FROM paciente LIMIT 1"
+
+
+class Replica:
+    """
+    Uma réplica de leitura: engines, fábricas de sessão e estado de saúde.
+    """
+
+    def __init__(self, nome: str, engine, async_engine=None):
+        self.nome = nome
+        self.engine = engine
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.async_engine = async_engine
+        self.AsyncSessionLocal = None
+        if async_engine is not None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker
+
+            self.AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+        self.saudavel = True
+        self.verificada_em: Optional[float] = None
+        self.falhas = 0
+        self._trava = threading.Lock()
+
+        # Erro de conexão durante uma consulta tira a réplica do rodízio na hora
+        event.listen(engine, "handle_error", self._ao_falhar)
+        if async_engine is not None:
+            event.listen(async_engine.sync_engine, "handle_error", self._ao_falhar)
+
+    def _ao_falhar(self, contexto):
+        if contexto.is_disconnect or isinstance(contexto.sqlalchemy_exception, OperationalError):
+            self.marcar_indisponivel(contexto.original_exception)
+
+    def marcar_indisponivel(self, erro):
+        if self.saudavel:
+            logger.warning("Réplica %s indisponível, leituras vão para o principal: %s", self.nome, erro)
+        self.saudavel = False
+        self.falhas += 1
+        self.verificada_em = time.monotonic()
+
+    def precisa_verificar(self) -> bool:
+        return self.verificada_em is None or time.monotonic() - self.verificada_em >= REPLICA_VERIFICACAO_INTERVALO
+
+    def verificar(self) -> bool:
+        """
+        Executa a consulta de verificação (no máximo uma thread por vez).
+        """
+        if not self._trava.acquire(blocking=False):
+            return self.saudavel
+        try:
+            with self.engine.connect() as conexao:
+                conexao.exec_driver_sql(SQL_VERIFICACAO).all()
+        except Exception as erro:
+            # Falhas de conexão já passaram por _ao_falhar
+            if self.saudavel:
+                self.marcar_indisponivel(erro)
+            self.verificada_em = time.monotonic()
+        else:
+            if not self.saudavel:
+                logger.info("Réplica %s disponível novamente", self.nome)
+            self.saudavel = True
+            self.verificada_em = time.monotonic()
+        finally:
+            self._trava.release()
+        return self.saudavel
+
+    def estado(self) -> dict:
+        return {
+            "nome": self.nome,
+            "saudavel": self.saudavel,
+            "verificada_ha_segundos": None if self.verificada_em is None else round(time.monotonic() - self.verificada_em, 1),
+            "falhas": self.falhas,
+        }
+
+
+# -------------------------------------------------
+# Escolha do banco por requisição
+# -------------------------------------------------
+class _Roteamento:
+    __slots__ = ("leitura", "banco")
+
+    def __init__(self, leitura: bool):
+        self.leitura = leitura  # pode usar réplica
+        self.banco: Optional[str] = None  # banco que atendeu (cabeçalho X-Banco)
+
+
+# Definido pelo middleware; fora de requisições (CLI, tarefas internas) tudo vai ao principal
+_roteamento: ContextVar[Optional[_Roteamento]] = ContextVar("roteamento_banco", default=None)
+
+_rodizio = itertools.count()
+
+
+def _candidatas(replicas: List[Replica]):
+    """
+    Réplicas em rodízio, a partir da próxima da vez.
+    """
+    inicio = next(_rodizio)
+    return (replicas[(inicio + i) % len(replicas)] for i in range(len(replicas)))
+
+
+def _registrar_banco(estado: Optional[_Roteamento], replica: Optional[Replica]) -> Optional[Replica]:
+    if estado is not None:
+        estado.banco = replica.nome if replica is not None else PRIMARIO
+    return replica
+
+
+def escolher_replica(replicas: List[Replica]) -> Optional[Replica]:
+    """
+    Réplica para a sessão da requisição atual, ou None para usar o principal.
+    """
+    estado = _roteamento.get()
+    if not replicas or estado is None or not estado.leitura:
+        return _registrar_banco(estado, None)
+
+    for replica in _candidatas(replicas):
+        if replica.precisa_verificar():
+            replica.verificar()
+        if replica.saudavel:
+            return _registrar_banco(estado, replica)
+    return _registrar_banco(estado, None)
+
+
+async def escolher_replica_async(replicas: List[Replica]) -> Optional[Replica]:
+    """
+    Versão de escolher_replica para get_async_db: a verificação roda no threadpool.
+    """
+    estado = _roteamento.get()
+    if not replicas or estado is None or not estado.leitura:
+        return _registrar_banco(estado, None)
+
+    for replica in _candidatas(replicas):
+        if replica.AsyncSessionLocal is None:
+            continue
+        if replica.precisa_verificar():
+            await run_in_threadpool(replica.verificar)
+        if replica.saudavel:
+            return _registrar_banco(estado, replica)
+    return _registrar_banco(estado, None)
+
+
+# -------------------------------------------------
+# Middleware
+# -------------------------------------------------
+class RoteamentoReplicas:
+    """
+    Middleware ASGI que decide se a requisição pode ler de uma réplica:
+    - GET/HEAD: réplica, exceto se o cliente gravou nos últimos
+      REPLICA_JANELA_ESCRITA segundos (cookie vk_escrita ou registro em memória)
+    - demais métodos: principal; se a escrita der certo, marca o cliente
+    A resposta traz o cabeçalho X-Banco com o banco que atendeu.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # Clientes que gravaram há pouco (para quem não guarda cookies)
+        self._escritas = CacheTTL(REPLICA_CLIENTES_MAXIMO, REPLICA_JANELA_ESCRITA)
+        self._cookie = (
+            f"{COOKIE_ESCRITA}=1; Max-Age={max(1, math.ceil(REPLICA_JANELA_ESCRITA))}; Path=/; HttpOnly; SameSite=Lax"
+        ).encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        escrita = scope["method"] not in ("GET", "HEAD", "OPTIONS")
+        chave = _chave_cliente(scope)
+        estado = _Roteamento(leitura=not escrita and not self._gravou_recentemente(scope, chave))
+        token = _roteamento.set(estado)
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                cabecalhos = list(mensagem.get("headers", []))
+                if estado.banco:
+                    cabecalhos.append((b"x-banco", estado.banco.encode()))
+                if escrita and mensagem["status"] < 400:
+                    self._escritas.guardar(chave, True)
+                    cabecalhos.append((b"set-cookie", self._cookie))
+                mensagem["headers"] = cabecalhos
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _roteamento.reset(token)
+
+    def _gravou_recentemente(self, scope, chave) -> bool:
+        for nome, valor in scope["headers"]:
+            if nome == b"cookie" and COOKIE_ESCRITA.encode() + b"=" in valor:
+                return True
+        return self._escritas.obter(chave) is not None
+
+
+def _chave_cliente(scope) -> str:
+    # Token do médico quando houver (vários médicos atrás do mesmo IP), senão o IP
+    for nome, valor in scope["headers"]:
+        if nome == b"authorization":
+            return hashlib.sha256(valor).hexdigest()
+    return scope["client"][0] if scope.get("client") else "-"
@@ -0,0 +1,163 @@
+# Respostas condicionais (ETag / Last-Modified) e cache do GET público de paciente
+#
+# O cache e a invalidação são por processo. Com vários workers, a alteração
+# feita em um deles não invalida o cache dos outros; por isso, a cada acerto,
+# a rota confere a versão do paciente no banco (conferir_resposta_publica) e
+# só usa a resposta guardada se ela ainda é a atual. Com
+# CACHE_PACIENTE_VALIDAR=false (um único worker) a conferência é pulada.
+
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, NamedTuple, Optional
+
+from fastapi import HTTPException, Request, Response
+
+from app.config import CACHE_PACIENTE_TTL, CACHE_PACIENTE_TAMANHO, DATABASE_REPLICAS, REPLICA_JANELA_ESCRITA
+from app.models.paciente import Paciente
+from app.utils.cache import CacheTTL
+from app.utils.serializacao import paciente_publico, para_json
+
+
+class RespostaCacheada(NamedTuple):
+    corpo: bytes               # JSON do PacienteBase já serializado
+    etag: str                  # Ex: "p42-v3"
+    versao: int                # Versão do paciente serializada
+    ultima_modificacao: str    # Data HTTP (RFC 7231)
+    modificado_em: object      # datetime (UTC) usado no If-Modified-Since
+
+
+# id do paciente → RespostaCacheada
+_cache_publico = CacheTTL(CACHE_PACIENTE_TAMANHO, CACHE_PACIENTE_TTL)
+
+# Com réplicas de leitura: pacientes alterados há pouco não voltam ao cache
+# durante REPLICA_JANELA_ESCRITA, para que uma leitura de réplica atrasada
+# não guarde a versão antiga por todo o CACHE_PACIENTE_TTL
+_alterados_recentemente = CacheTTL(CACHE_PACIENTE_TAMANHO if DATABASE_REPLICAS else 0, REPLICA_JANELA_ESCRITA)
+
+
+def etag_paciente(paciente_id: int, versao: int) -> str:
+    return f'"p{paciente_id}-v{versao}"'
+
+
+def etag_medico(medico_id: int, versao: int) -> str:
+    return f'"m{medico_id}-v{versao}"'
+
+
+def obter_resposta_publica(paciente_id: int) -> Optional[RespostaCacheada]:
+    return _cache_publico.obter(paciente_id)
+
+
+def guardar_resposta_publica(paciente: Paciente) -> RespostaCacheada:
+    """
+    Serializa o paciente (dados públicos) uma única vez e guarda no cache.
+    """
+    modificado_em = (paciente.updated_at or paciente.created_at).replace(tzinfo=timezone.utc, microsecond=0)
+    resposta = RespostaCacheada(
+        corpo=para_json(paciente_publico(paciente)),
+        etag=etag_paciente(paciente.id, paciente.versao),
+        versao=paciente.versao,
+        ultima_modificacao=format_datetime(modificado_em, usegmt=True),
+        modificado_em=modificado_em,
+    )
+    if _alterados_recentemente.obter(paciente.id) is None:
+        _cache_publico.guardar(paciente.id, resposta)
+    return resposta
+
+
+def conferir_resposta_publica(paciente_id: int, resposta: RespostaCacheada, versao_atual: Optional[int]) -> Optional[RespostaCacheada]:
+    """
+    A resposta do cache, se ainda é a versão do banco (versao_atual; None
+    se o paciente não existe mais). Senão, descarta a resposta e retorna None.
+    """
+    if resposta.versao == versao_atual:
+        return resposta
+    _cache_publico.invalidar(paciente_id)
+    return None
+
+
+def invalidar_resposta_publica(paciente_id: int):
+    """
+    Deve ser chamada sempre que o paciente for alterado ou excluído.
+    """
+    _cache_publico.invalidar(paciente_id)
+    _alterados_recentemente.guardar(paciente_id, True)
+
+
+def estatisticas_cache_pacientes() -> dict:
+    return _cache_publico.estatisticas()
+
+
+def _nao_modificado(request: Request, resposta: RespostaCacheada) -> bool:
+    """
+    Avalia If-None-Match (prioritário) e If-Modified-Since.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etags = [etag.strip().removeprefix("W/") for etag in if_none_match.split(",")]
+        return "*" in etags or resposta.etag in etags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return resposta.modificado_em <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+def responder_condicional(request: Request, resposta: RespostaCacheada) -> Response:
+    """
+    Retorna 304 (sem corpo) se o cliente já tem a versão atual,
+    senão o JSON cacheado com ETag e Last-Modified.
+    """
+    cabecalhos = {
+        "ETag": resposta.etag,
+        "Last-Modified": resposta.ultima_modificacao,
+        "Cache-Control": "no-cache",  # O cliente pode guardar, mas revalida a cada uso
+    }
+    if _nao_modificado(request, resposta):
+        return Response(status_code=304, headers=cabecalhos)
+
+    return Response(content=resposta.corpo, media_type="application/json", headers=cabecalhos)
+
+
+# -------------------------------------------------
+# If-Match (concorrência otimista nos PATCH)
+# -------------------------------------------------
+def versoes_if_match(request: Request, prefixo: str, registro_id: int) -> Optional[List[int]]:
+    """
+    Versões aceitas pelo If-Match (ETag "p42-v3" → 3), ou None sem o
+    cabeçalho ou com "*" (grava sobre qualquer versão).
+    ETags fracos, de outro registro ou mal formados nunca conferem: 412
+    sem acessar o banco.
+    """
+    if_match = request.headers.get("if-match")
+    if if_match is None:
+        return None
+
+    inicio = f'"{prefixo}{registro_id}-v'
+    versoes = []
+    for etag in if_match.split(","):
+        etag = etag.strip()
+        if etag == "*":
+            return None
+        versao = etag[len(inicio):-1]
+        if etag.startswith(inicio) and etag.endswith('"') and versao.isdigit():
+            versoes.append(int(versao))
+
+    if not versoes:
+        raise precondicao_falhou()
+    return versoes
+
+
+def precondicao_falhou(etag_atual: Optional[str] = None) -> HTTPException:
+    """
+    412 para um If-Match que não é mais a versão atual. Com o ETag atual
+    no cabeçalho, o cliente sabe que precisa reler o registro.
+    """
+    return HTTPException(
+        status_code=412,
+        detail="O registro foi alterado por outra requisição; leia a versão atual e tente novamente",
+        headers={"ETag": etag_atual} if etag_atual else None,
+    )
@@ -0,0 +1,73 @@
+# Serialização rápida de pacientes (ORM → dict → JSON em bytes)
+#
+# As rotas de paciente devolvem o JSON pronto em vez do objeto ORM.
+# Assim o FastAPI não valida cada atributo de novo pelo response_model
+# (PacienteBase / PacienteResponse com from_attributes) antes de codificar.
+# O formato na rede é o mesmo dos schemas: mesmas chaves, na mesma ordem.
+
+from typing import Any, Optional
+
+import orjson
+from fastapi import Response
+
+from app.models.paciente import Paciente, InformacoesPrivadas
+
+# orjson: datetime em ISO 8601 como o Pydantic (UTC com "Z")
+_OPCOES_JSON = orjson.OPT_UTC_Z
+
+
+def _contatos(contatos: Optional[list]) -> Optional[list]:
+    # Mesmo recorte do schema ContatoEmergencia (apenas nome e telefone)
+    if contatos is None:
+        return None
+    return [{"nome": contato.get("nome"), "telefone": contato.get("telefone")} for contato in contatos]
+
+
+def paciente_publico(paciente: Paciente) -> dict:
+    """
+    Campos do PacienteBase.
+    """
+    return {
+        "id": paciente.id,
+        "nome": paciente.nome,
+        "alergias": paciente.alergias,
+        "doencas_cronicas": paciente.doencas_cronicas,
+        "medicamentos_continuos": paciente.medicamentos_continuos,
+        "contatos_emergencia": _contatos(paciente.contatos_emergencia),
+        "created_at": paciente.created_at,
+    }
+
+
+def informacoes_privadas(info: Optional[InformacoesPrivadas]) -> Optional[dict]:
+    """
+    Campos do InformacoesPrivadasBase.
+    """
+    if info is None:
+        return None
+    return {
+        "tipo_sanguineo": info.tipo_sanguineo,
+        "cirurgias": info.cirurgias,
+        "internacoes_passadas": info.internacoes_passadas,
+        "alteracoes_exames": info.alteracoes_exames,
+        "historico_exames": info.historico_exames,
+    }
+
+
+def paciente_completo(paciente: Paciente) -> dict:
+    """
+    Campos do PacienteResponse (públicos + informações privadas).
+    """
+    dados = paciente_publico(paciente)
+    dados["informacoes_privadas"] = informacoes_privadas(paciente.informacoes_privadas)
+    return dados
+
+
+def para_json(dados: Any) -> bytes:
+    return orjson.dumps(dados, option=_OPCOES_JSON)
+
+
+def resposta_json(dados: Any, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """
+    Resposta com o JSON já codificado (o FastAPI não revalida o conteúdo).
+    """
+    return Response(content=para_json(dados), status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,444 @@
+# Sharding horizontal dos pacientes (SHARDS)
+#
+# Com SHARDS configurado, as tabelas de pacientes (paciente, informacoes_privadas
+# e os índices de busca) ficam divididas entre vários bancos. O principal
+# (DATABASE_URL) continua com os médicos, o registro de eventos, o mapa de
+# buckets e a sequência global de IDs.
+#
+# - Roteamento: o paciente pertence ao bucket id % SHARD_BUCKETS e o mapa
+#   (tabela shard_bucket) diz em qual shard está cada bucket. Como os IDs
+#   são reservados em blocos consecutivos, os pacientes novos se espalham por
+#   todos os shards (com faixas de ID, todas as inserções cairiam no último).
+# - Sessão: get_db entrega uma ShardedSession. Consultas e escritas com o ID
+#   do paciente no WHERE (ou em objetos já carregados) vão direto ao shard
+#   dele; as demais consultas de pacientes passam por todos os shards.
+# - Listagens e buscas: scatter-gather, uma consulta por shard em paralelo
+#   e mescla ordenada dos resultados (consultar / iterar).
+# - IDs: cada processo reserva blocos de SHARD_BLOCO_IDS na tabela sequencia_id.
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList
+from sqlalchemy.sql.schema import Column
+
+from app.config import SHARD_BUCKETS, SHARD_BLOCO_IDS, SHARD_MAPA_RECARGA, DB_POOL_SIZE, DB_MAX_OVERFLOW
+
+logger = logging.getLogger("vitalkey.shards")
+
+# Identificador do banco principal na ShardedSession
+PRINCIPAL = "principal"
+
+# Tabelas divididas entre os shards e a coluna com o ID do paciente em cada uma
+# (pais antes dos filhos, a ordem das chaves estrangeiras)
+COLUNA_PACIENTE = {
+    "paciente": "id",
+    "informacoes_privadas": "paciente_id",
+    "paciente_trigrama": "paciente_id",
+    "paciente_termo": "paciente_id",
+    "paciente_arquivo": "id",
+    "informacoes_privadas_arquivo": "paciente_id",
+}
+TABELAS_PACIENTE = tuple(COLUNA_PACIENTE)
+
+
+class Shard:
+    """
+    Um dos bancos com parte dos pacientes.
+    """
+
+    def __init__(self, nome: str, engine):
+        self.nome = nome
+        self.engine = engine
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+# -------------------------------------------------
+# Mapa de buckets
+# -------------------------------------------------
+def ler_mapa(engine, nomes: List[str], buckets: int = SHARD_BUCKETS) -> List[str]:
+    """
+    Lê o mapa (posição = bucket, valor = nome do shard). Na primeira vez,
+    cria o mapa distribuindo os buckets entre os shards em rodízio.
+    """
+    from app.models.shard import ShardBucket
+
+    with engine.connect() as conexao:
+        linhas = conexao.execute(select(ShardBucket.bucket, ShardBucket.shard).order_by(ShardBucket.bucket)).all()
+
+    if not linhas:
+        linhas = [(bucket, nomes[bucket % len(nomes)]) for bucket in range(buckets)]
+        try:
+            with engine.begin() as conexao:
+                conexao.execute(insert(ShardBucket), [{"bucket": b, "shard": s} for b, s in linhas])
+        except IntegrityError:
+            # Outro processo criou o mapa ao mesmo tempo
+            return ler_mapa(engine, nomes, buckets)
+
+    if [bucket for bucket, _ in linhas] != list(range(buckets)):
+        raise RuntimeError(f"O mapa de shards tem {len(linhas)} buckets e SHARD_BUCKETS é {buckets}: o valor não pode mudar depois de criado")
+
+    desconhecidos = {shard for _, shard in linhas} - set(nomes)
+    if desconhecidos:
+        raise RuntimeError(
+            f"Buckets nos shards {sorted(desconhecidos)}, que não estão em SHARDS: "
+            "esvazie o shard com app.cli.rebalancear_shards antes de removê-lo"
+        )
+    return [shard for _, shard in linhas]
+
+
+def gravar_mapa(engine, donos: Dict[int, str]):
+    """
+    Troca o shard dono dos buckets informados.
+    """
+    from app.models.shard import ShardBucket
+
+    por_shard = defaultdict(list)
+    for bucket, shard in donos.items():
+        por_shard[shard].append(bucket)
+
+    with engine.begin() as conexao:
+        for shard, buckets in por_shard.items():
+            conexao.execute(update(ShardBucket).where(ShardBucket.bucket.in_(buckets)).values(shard=shard))
+
+
+class MapaShards:
+    """
+    Bucket → shard, relido do principal a cada SHARD_MAPA_RECARGA segundos
+    para que todos os processos percebam um rebalanceamento.
+    """
+
+    def __init__(self, engine, nomes: List[str], buckets: int = SHARD_BUCKETS):
+        self.engine = engine
+        self.nomes = nomes
+        self.buckets = buckets
+        self._mapa: Optional[List[str]] = None
+        self.lido_em: Optional[float] = None
+        self._trava = threading.Lock()
+
+    def shard(self, paciente_id: int) -> str:
+        if self._mapa is None or time.monotonic() - self.lido_em >= SHARD_MAPA_RECARGA:
+            self._recarregar()
+        return self._mapa[paciente_id % self.buckets]
+
+    def atual(self) -> List[str]:
+        if self._mapa is None or time.monotonic() - self.lido_em >= SHARD_MAPA_RECARGA:
+            self._recarregar()
+        return list(self._mapa)
+
+    def recarregar(self):
+        """
+        Relê o mapa imediatamente (depois de alterá-lo neste processo).
+        """
+        with self._trava:
+            self._mapa = ler_mapa(self.engine, self.nomes, self.buckets)
+            self.lido_em = time.monotonic()
+
+    def buckets_por_shard(self) -> Dict[str, List[int]]:
+        por_shard = {nome: [] for nome in self.nomes}
+        for bucket, nome in enumerate(self.atual()):
+            por_shard.setdefault(nome, []).append(bucket)
+        return por_shard
+
+    def _recarregar(self):
+        # Só uma thread relê; as demais seguem com o mapa atual (a primeira leitura espera)
+        if not self._trava.acquire(blocking=self._mapa is None):
+            return
+        try:
+            if self._mapa is not None and time.monotonic() - self.lido_em < SHARD_MAPA_RECARGA:
+                return
+            try:
+                self._mapa = ler_mapa(self.engine, self.nomes, self.buckets)
+            except Exception:
+                if self._mapa is None:
+                    raise
+                logger.exception("Falha ao reler o mapa de shards, mantendo o atual")
+            self.lido_em = time.monotonic()
+        finally:
+            self._trava.release()
+
+
+# -------------------------------------------------
+# IDs globais
+# -------------------------------------------------
+class GeradorIds:
+    """
+    Reserva blocos de IDs na sequência do principal (um UPDATE por bloco)
+    e os entrega às inserções deste processo. IDs de um bloco não usado
+    até o processo terminar viram lacunas, como no autoincremento.
+    """
+
+    def __init__(self, engine, engines_pacientes: List, tamanho_bloco: int = SHARD_BLOCO_IDS):
+        self.engine = engine
+        self.engines_pacientes = engines_pacientes
+        self.tamanho_bloco = tamanho_bloco
+        self._proximo = 0
+        self._limite = 0
+        self._trava = threading.Lock()
+
+    def reservar(self, quantidade: int) -> List[int]:
+        ids = []
+        with self._trava:
+            while len(ids) < quantidade:
+                if self._proximo >= self._limite:
+                    self._proximo, self._limite = self._novo_bloco(max(self.tamanho_bloco, quantidade - len(ids)))
+                fim = min(self._limite, self._proximo + quantidade - len(ids))
+                ids.extend(range(self._proximo, fim))
+                self._proximo = fim
+        return ids
+
+    def _novo_bloco(self, tamanho: int):
+        from app.models.shard import SequenciaId
+
+        filtro = SequenciaId.nome == "paciente"
+        with self.engine.begin() as conexao:
+            # O UPDATE bloqueia a linha (ou o banco, no SQLite) até o commit:
+            # dois processos nunca recebem o mesmo bloco
+            alterada = conexao.execute(update(SequenciaId).where(filtro).values(proximo=SequenciaId.proximo + tamanho)).rowcount
+            if alterada:
+                proximo = conexao.execute(select(SequenciaId.proximo).where(filtro)).scalar_one()
+                return proximo - tamanho, proximo
+
+        # Primeira reserva: a sequência começa depois do maior ID já gravado
+        inicio = self._maior_id() + 1
+        try:
+            with self.engine.begin() as conexao:
+                conexao.execute(insert(SequenciaId).values(nome="paciente", proximo=inicio + tamanho))
+        except IntegrityError:
+            # Outro processo criou a sequência ao mesmo tempo
+            return self._novo_bloco(tamanho)
+        return inicio, inicio + tamanho
+
+    def _maior_id(self) -> int:
+        from app.models.arquivo import PacienteArquivado
+        from app.models.paciente import Paciente
+
+        # Inclui os arquivados: os IDs deles voltam a ser usados na restauração
+        maior = 0
+        for engine in [self.engine, *self.engines_pacientes]:
+            with engine.connect() as conexao:
+                for modelo in (Paciente, PacienteArquivado):
+                    maior = max(maior, conexao.execute(select(func.max(modelo.id))).scalar() or 0)
+        return maior
+
+
+# -------------------------------------------------
+# Roteamento das consultas
+# -------------------------------------------------
+def ids_do_criterio(statement, parametros) -> Optional[List[int]]:
+    """
+    IDs de paciente fixados no WHERE (coluna do paciente == valor ou IN (...)),
+    ou None se a consulta pode envolver qualquer paciente. Só considera as
+    condições ligadas por AND no nível de cima (com OR, vale todos os shards).
+    """
+    criterio = getattr(statement, "whereclause", None)
+    if criterio is None:
+        return None
+
+    if isinstance(criterio, BooleanClauseList) and criterio.operator is operators.and_:
+        condicoes = criterio.clauses
+    else:
+        condicoes = [criterio]
+
+    for condicao in condicoes:
+        if not isinstance(condicao, BinaryExpression) or condicao.operator not in (operators.eq, operators.in_op):
+            continue
+        coluna, valor = condicao.left, condicao.right
+        if not isinstance(coluna, Column) or not isinstance(valor, BindParameter) or coluna.table is None:
+            continue
+        if COLUNA_PACIENTE.get(coluna.table.name) != coluna.name:
+            continue
+
+        # bindparam sem valor (consultas pré-montadas): o valor vem nos parâmetros da execução
+        if valor.value is None and valor.callable is None:
+            if not isinstance(parametros, dict) or valor.key not in parametros:
+                continue
+            valores = parametros[valor.key]
+        else:
+            valores = valor.effective_value
+
+        if condicao.operator is operators.eq:
+            valores = [valores]
+        return [int(v) for v in valores]
+
+    return None
+
+
+def _id_do_objeto(tabela: str, instancia) -> Optional[int]:
+    if instancia is None:
+        return None
+    paciente_id = getattr(instancia, COLUNA_PACIENTE[tabela])
+    if paciente_id is not None:
+        return paciente_id
+    # Informações privadas ligadas pelo relationship, antes do flush
+    paciente = getattr(instancia, "paciente", None)
+    return paciente.id if paciente is not None else None
+
+
+class Particionamento:
+    """
+    Shards, mapa de buckets, sequência de IDs e a fábrica de sessões
+    (ShardedSession) usada por get_db.
+    """
+
+    def __init__(self, engine, shards: List[Shard], buckets: int = SHARD_BUCKETS):
+        self.engine = engine
+        self.shards = shards
+        self.nomes = [shard.nome for shard in shards]
+        self._por_nome = {shard.nome: shard for shard in shards}
+        self.mapa = MapaShards(engine, self.nomes, buckets)
+        self.gerador_ids = GeradorIds(engine, [shard.engine for shard in shards])
+
+        # Threads do scatter-gather: cada consulta ocupa uma conexão do shard,
+        # então mais threads que conexões só aumentariam a fila
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(shards) * (DB_POOL_SIZE + DB_MAX_OVERFLOW),
+            thread_name_prefix="shard"
+        )
+
+        self.SessionLocal = sessionmaker(
+            class_=ShardedSession,
+            autocommit=False,
+            autoflush=False,
+            shards={PRINCIPAL: engine, **{shard.nome: shard.engine for shard in shards}},
+            shard_chooser=self._shard_do_objeto,
+            identity_chooser=self._shards_da_identidade,
+            execute_chooser=self._shards_da_consulta,
+            info={"particionamento": self},
+        )
+
+    def shard_do_paciente(self, paciente_id: int) -> str:
+        return self.mapa.shard(paciente_id)
+
+    def shard(self, nome: str) -> Shard:
+        return self._por_nome[nome]
+
+    def novos_ids(self, quantidade: int) -> List[int]:
+        """
+        IDs globais para pacientes novos (atribuir antes do flush/INSERT).
+        """
+        return self.gerador_ids.reservar(quantidade)
+
+    def criar_tabelas(self):
+        """
+        Cria as tabelas do mapa no principal e as de pacientes em cada shard.
+        """
+        from app.database import Base
+        from app.models import arquivo, busca, paciente, shard  # noqa: F401 (registra as tabelas no Base)
+
+        Base.metadata.create_all(bind=self.engine)
+        tabelas = [Base.metadata.tables[nome] for nome in TABELAS_PACIENTE]
+        for shard_ in self.shards:
+            Base.metadata.create_all(bind=shard_.engine, tables=tabelas)
+
+    # ShardedSession: objetos novos ou alterados (flush)
+    def _shard_do_objeto(self, mapper, instancia, clause=None, **kw):
+        tabela = mapper.local_table.name if mapper is not None else None
+        if tabela not in COLUNA_PACIENTE:
+            return PRINCIPAL
+
+        paciente_id = _id_do_objeto(tabela, instancia)
+        if paciente_id is None:
+            raise ValueError(f"Gravação em {tabela} sem o ID do paciente: reserve o ID com novos_ids antes do flush")
+        return self.shard_do_paciente(paciente_id)
+
+    # ShardedSession: db.get() e carregamento de relacionamentos
+    def _shards_da_identidade(self, mapper, chave_primaria, *, lazy_loaded_from=None, **kw):
+        if lazy_loaded_from is not None:
+            return [lazy_loaded_from.identity_token]
+
+        tabela = mapper.local_table.name
+        if tabela not in COLUNA_PACIENTE:
+            return [PRINCIPAL]
+        if [coluna.name for coluna in mapper.primary_key] == [COLUNA_PACIENTE[tabela]]:
+            return [self.shard_do_paciente(chave_primaria[0])]
+        return self.nomes
+
+    # ShardedSession: SELECT/UPDATE/DELETE
+    def _shards_da_consulta(self, contexto) -> List[str]:
+        mapper = contexto.bind_mapper
+        if mapper is None or mapper.local_table.name not in COLUNA_PACIENTE:
+            return [PRINCIPAL]
+
+        ids = ids_do_criterio(contexto.statement, contexto.parameters)
+        if ids is None:
+            return self.nomes
+        # IN () vazio: qualquer shard responde "nenhuma linha"
+        return list(dict.fromkeys(self.shard_do_paciente(paciente_id) for paciente_id in ids)) or self.nomes[:1]
+
+    # -------------------------------------------------
+    # Scatter-gather
+    # -------------------------------------------------
+    def consultar(self, funcao: Callable[[Session], list], chave, limite: Optional[int] = None) -> list:
+        """
+        Executa funcao(sessao) em todos os shards ao mesmo tempo (uma thread
+        e uma sessão por shard) e mescla as listas, cada uma já ordenada por
+        chave, mantendo a ordem e parando no limite. Os objetos retornados
+        ficam desanexados da sessão, com as colunas já carregadas.
+        """
+        def executar(shard_: Shard):
+            with shard_.SessionLocal() as db:
+                return funcao(db)
+
+        # copy_context: as consultas entram nas estatísticas da requisição (Server-Timing)
+        futuros = [self._executor.submit(copy_context().run, executar, shard_) for shard_ in self.shards]
+        listas = [futuro.result() for futuro in futuros]
+        return list(itertools.islice(heapq.merge(*listas, key=chave), limite))
+
+    def iterar(self, funcao: Callable[[Session], Iterable], chave) -> Iterator:
+        """
+        Versão em streaming de consultar: mescla os iteradores de cada shard
+        (ex: yield_per) à medida que são consumidos, com memória constante.
+        """
+        sessoes = [shard_.SessionLocal() for shard_ in self.shards]
+        try:
+            yield from heapq.merge(*(funcao(db) for db in sessoes), key=chave)
+        finally:
+            for db in sessoes:
+                db.close()
+
+    def estado(self) -> dict:
+        por_shard = self.mapa.buckets_por_shard()
+        return {
+            "buckets": self.mapa.buckets,
+            "mapa_lido_ha_segundos": None if self.mapa.lido_em is None else round(time.monotonic() - self.mapa.lido_em, 1),
+            "shards": [{"nome": nome, "buckets": len(por_shard.get(nome, []))} for nome in self.nomes],
+        }
+
+
+# -------------------------------------------------
+# Conexões para os INSERT em lote
+# -------------------------------------------------
+def particionamento_da_sessao(db: Session) -> Optional[Particionamento]:
+    return db.info.get("particionamento")
+
+
+def conexao_do_paciente(db: Session, paciente_id: int):
+    """
+    Conexão da transação atual no banco do paciente (sem shards, a da sessão).
+    """
+    particionamento = particionamento_da_sessao(db)
+    if particionamento is None:
+        return db.connection()
+    return db.connection(bind_arguments={"shard_id": particionamento.shard_do_paciente(paciente_id)})
+
+
+def conexao_principal(db: Session):
+    """
+    Conexão da transação atual no banco principal (sem shards, a da sessão).
+    """
+    if particionamento_da_sessao(db) is None:
+        return db.connection()
+    return db.connection(bind_arguments={"shard_id": PRINCIPAL})
@@ -0,0 +1,158 @@
+# Índice invertido de alergias, doenças crônicas e medicamentos contínuos
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, delete, intersect, select, union
+from sqlalchemy.orm import Session
+
+from app.models.busca import PacienteTermo
+from app.models.paciente import Paciente
+from app.utils.busca import normalizar_texto
+from app.utils.lotes import inserir_em_lote
+from app.utils.shards import conexao_do_paciente
+
+# Tipo do termo → coluna JSON do paciente
+TIPOS_TERMO = {
+    "alergia": "alergias",
+    "doenca": "doencas_cronicas",
+    "medicamento": "medicamentos_continuos",
+}
+
+TAMANHO_TERMO = PacienteTermo.__table__.c.termo.type.length
+
+# Sufixo que transforma o termo em busca por prefixo ("losartana*")
+CURINGA = "*"
+
+
+# -------------------------------------------------
+# Manutenção do índice
+# -------------------------------------------------
+def termos_do_paciente(listas: Dict[str, Optional[list]]) -> set:
+    """
+    Gera os pares (tipo, termo normalizado) a partir das listas do paciente,
+    informadas pelo nome da coluna (alergias, doencas_cronicas, ...).
+    """
+    termos = set()
+    for tipo, coluna in TIPOS_TERMO.items():
+        for item in listas.get(coluna) or []:
+            termo = _normalizar_termo(str(item))
+            if termo:
+                termos.add((tipo, termo))
+    return termos
+
+
+@lru_cache(maxsize=16384)
+def _normalizar_termo(item: str) -> str:
+    # Alergias, doenças e medicamentos se repetem entre pacientes
+    return normalizar_texto(item)[:TAMANHO_TERMO]
+
+
+def indexar_termos(db: Session, pacientes: Iterable[Tuple[int, Dict[str, Optional[list]]]], novos: bool = False):
+    """
+    (Re)indexa os termos dos pacientes informados como pares (paciente_id, listas).
+    Use novos=True para pacientes recém-inseridos (pula a remoção do índice antigo).
+    Não faz commit: o índice é gravado na mesma transação do paciente.
+    Com shards, todos os pacientes informados devem estar no mesmo shard.
+    """
+    pacientes = list(pacientes)
+    if not pacientes:
+        return
+
+    if not novos:
+        remover_indice_termos(db, [paciente_id for paciente_id, _ in pacientes])
+
+    linhas = [
+        (tipo, termo, paciente_id)
+        for paciente_id, listas in pacientes
+        for tipo, termo in termos_do_paciente(listas)
+    ]
+    linhas.sort()
+
+    inserir_em_lote(conexao_do_paciente(db, pacientes[0][0]), PacienteTermo.__table__, ("tipo", "termo", "paciente_id"), linhas)
+
+
+def listas_clinicas(paciente) -> Dict[str, Optional[list]]:
+    """
+    Extrai as listas indexadas de um Paciente (ORM) ou PacienteCreate.
+    """
+    return {coluna: getattr(paciente, coluna) for coluna in TIPOS_TERMO.values()}
+
+
+def remover_indice_termos(db: Session, paciente_ids: List[int]):
+    """
+    Remove os termos dos pacientes informados.
+    """
+    db.execute(delete(PacienteTermo).where(PacienteTermo.paciente_id.in_(paciente_ids)))
+
+
+def reindexar_termos_todos(db: Session, tamanho_lote: int = 1000) -> int:
+    """
+    Reconstrói o índice de termos de todos os pacientes,
+    em lotes e com commit a cada lote. Retorna o total indexado.
+    """
+    total = 0
+    ultimo_id = 0
+    colunas = [getattr(Paciente, coluna) for coluna in TIPOS_TERMO.values()]
+    while True:
+        lote = (
+            db.query(Paciente.id, *colunas)
+            .filter(Paciente.id > ultimo_id)
+            .order_by(Paciente.id)
+            .limit(tamanho_lote)
+            .all()
+        )
+        if not lote:
+            return total
+
+        indexar_termos(db, [(linha.id, listas_clinicas(linha)) for linha in lote])
+        db.commit()
+
+        total += len(lote)
+        ultimo_id = lote[-1].id
+
+
+# -------------------------------------------------
+# Consulta
+# -------------------------------------------------
+def _select_termo(tipo: str, termo: str):
+    """
+    IDs dos pacientes com o termo. Cada critério é uma faixa da chave
+    primária (tipo, termo, paciente_id): igualdade ou prefixo ("termo*").
+    """
+    coluna = PacienteTermo.termo
+    prefixo = termo.endswith(CURINGA)
+    termo = normalizar_texto(termo.rstrip(CURINGA))[:TAMANHO_TERMO]
+
+    if prefixo:
+        # Faixa [termo, termo + maior caractere) em vez de LIKE, que nem todo banco indexa
+        condicao = and_(coluna >= termo, coluna < termo + "\uffff")
+    else:
+        condicao = coluna == termo
+
+    return select(PacienteTermo.paciente_id).where(PacienteTermo.tipo == tipo, condicao)
+
+
+def select_pacientes_por_termos(criterios: Sequence[Tuple[str, str]], todos: bool, cursor: Optional[int] = None):
+    """
+    Monta a consulta de pacientes ativos que possuem todos (E) ou
+    algum (OU) dos termos, em ordem de ID, a partir do cursor.
+
+    criterios: pares (tipo, termo), ex: [("alergia", "dipirona"), ("medicamento", "varfarina")]
+    """
+    selects = [_select_termo(tipo, termo) for tipo, termo in criterios]
+    if len(selects) == 1:
+        ids = selects[0]
+    else:
+        ids = intersect(*selects) if todos else union(*selects)
+    ids = ids.subquery()
+
+    stmt = (
+        select(Paciente)
+        .join(ids, Paciente.id == ids.c.paciente_id)
+        .where(Paciente.ativo == True)
+    )
+    if cursor is not None:
+        stmt = stmt.where(Paciente.id > cursor)
+
+    return stmt.order_by(Paciente.id)
\ No newline at end of file
@@ -0,0 +1,97 @@
+# Benchmark da busca por nome (índice de trigramas) em um banco grande
+#
+# Usa um banco gerado pelo dados_sinteticos. Os nomes sintéticos combinam
+# poucos nomes e sobrenomes, então todos os trigramas são frequentes; para
+# medir também nomes raros (como em um cadastro real), o benchmark grava
+# alguns pacientes com sobrenomes incomuns dentro de uma transação que é
+# desfeita no fim: o banco não é alterado.
+#
+# Para cada busca, mede com o corte de trigramas frequentes
+# (BUSCA_TRIGRAMA_FREQUENTE) ligado e desligado e confere se os resultados
+# são os mesmos.
+#
+# Uso:  python -m benchmarks.bench_busca [--banco benchmarks/dados/bench_1000000.db] [--limite 100]
+
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("TEMPO_EXPIRACAO", "60")
+
+SOBRENOMES_RAROS = ["Bueno", "Zanetti", "Kowalski", "Yamamoto", "Quintela", "Wagner", "Fukuda", "Xavier"]
+BUSCAS = ["joao", "silva", "maria santos", "jo", "leticia rocha", "helena nascimento", "ana bueno", "yamamoto", "fukuda", "carlos xav"]
+
+
+def medir(funcao, repeticoes: int) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da busca por nome")
+    parser.add_argument("--banco", default=os.path.join("benchmarks", "dados", "bench_1000000.db"))
+    parser.add_argument("--limite", type=int, default=100)
+    parser.add_argument("--raros", type=int, default=2000, help="Pacientes com sobrenome raro gravados durante o benchmark")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.banco):
+        raise SystemExit(f"❌ {args.banco} não existe: gere com python -m benchmarks.dados_sinteticos")
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.banco}"
+
+    from sqlalchemy import func, select
+
+    import app.utils.busca as busca
+    from app.database import SessionLocal
+    from app.models.busca import PacienteTrigrama
+    from app.models.paciente import Paciente
+    from benchmarks.dados_sinteticos import PRIMEIROS_NOMES
+
+    corte = busca.BUSCA_TRIGRAMA_FREQUENTE
+    db = SessionLocal()
+    try:
+        gerador = random.Random(42)
+        pacientes = [Paciente(nome=f"{gerador.choice(PRIMEIROS_NOMES)} {gerador.choice(SOBRENOMES_RAROS)}", ativo=True) for _ in range(args.raros)]
+        db.add_all(pacientes)
+        db.flush()
+        busca.indexar_nomes(db, [(paciente.id, paciente.nome) for paciente in pacientes], novos=True)
+
+        total = db.execute(select(func.count()).select_from(Paciente)).scalar()
+        indice = db.execute(select(func.count()).select_from(PacienteTrigrama)).scalar()
+        print(f"{total} pacientes | {indice} linhas no índice | corte: {corte} pacientes por trigrama | limite {args.limite}")
+
+        for nome in BUSCAS:
+            consulta = busca.normalizar_texto(nome)
+            trigramas = busca._trigramas_consulta(consulta)
+            contagens = dict(db.execute(busca._select_frequencias(list(trigramas))).all())
+
+            busca.BUSCA_TRIGRAMA_FREQUENTE = 0
+            sem_corte = medir(lambda: busca.buscar_pacientes_por_nome(db, nome, args.limite), args.repeticoes)
+            esperado = [paciente.id for paciente in busca.buscar_pacientes_por_nome(db, nome, args.limite)]
+
+            busca.BUSCA_TRIGRAMA_FREQUENTE = corte
+            busca._frequencias.limpar()
+            primeira = medir(lambda: busca.buscar_pacientes_por_nome(db, nome, args.limite), 1)
+            com_corte = medir(lambda: busca.buscar_pacientes_por_nome(db, nome, args.limite), args.repeticoes)
+            obtido = [paciente.id for paciente in busca.buscar_pacientes_por_nome(db, nome, args.limite)]
+            guia, conferir = busca._separar_trigramas(trigramas, None)
+
+            print(f"{nome!r:22} {len(trigramas):2} trigramas, {len(conferir):2} conferidos | índice lido: "
+                  f"{sum(contagens.values()):7} → {sum(contagens.get(t, 0) for t in guia):7} linhas | "
+                  f"sem corte {sem_corte * 1000:7.1f} ms | com corte {com_corte * 1000:7.1f} ms "
+                  f"(1ª {primeira * 1000:7.1f} ms) | {len(obtido):3} resultados | "
+                  f"{'iguais' if obtido == esperado else 'DIFERENTES'}")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# Benchmark do histórico médico comprimido e deferred
+#
+# Gera informações privadas com históricos longos (exames com data e
+# resultado, como os de pacientes crônicos) e mede:
+# - armazenamento: tamanho do banco SQLite com as listas em JSON (coluna
+#   JSON antiga) e em JSONComprimido
+# - transferência: bytes lidos do banco por paciente e bytes enviados ao
+#   cliente pela rota privada completa e por uma página de
+#   GET /paciente/{id}/historico/historico_exames
+# - tempo de leitura de N linhas só com o tipo sanguíneo (histórico
+#   deferred) e com o histórico completo
+#
+# Uso:  python -m benchmarks.bench_historico [--pacientes 2000] [--pagina 100]
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+# Banco em memória: não toca no banco configurado
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("TEMPO_EXPIRACAO", "60")
+
+import orjson
+from sqlalchemy import JSON, Column, Integer, MetaData, String, Table, create_engine, insert, select
+from sqlalchemy.orm import Session, undefer_group
+
+from app.config import LIMITE_PAGINA_PADRAO
+from app.database import Base
+from app.models.paciente import InformacoesPrivadas, GRUPO_HISTORICO
+from app.models.tipos import JSONComprimido
+from benchmarks.dados_sinteticos import CIRURGIAS, EXAMES
+
+RESULTADOS = ["normal", "alterado", "limítrofe", "aumentado", "diminuído"]
+CAMPOS = ("cirurgias", "internacoes_passadas", "alteracoes_exames", "historico_exames")
+
+
+def gerar_informacoes(quantidade: int, semente: int = 42) -> list:
+    """
+    Informações privadas com históricos de tamanho variado: a maioria curta,
+    alguns pacientes com centenas de exames.
+    """
+    gerador = random.Random(semente)
+    linhas = []
+    for paciente_id in range(1, quantidade + 1):
+        exames = int(gerador.paretovariate(1.2) * 15)
+        historico = [
+            f"{gerador.choice(EXAMES)} {gerador.randint(2010, 2024)}-{gerador.randint(1, 12):02d}-{gerador.randint(1, 28):02d}: "
+            f"{gerador.choice(RESULTADOS)} ({gerador.uniform(0.5, 300):.1f})"
+            for _ in range(min(exames, 2000))
+        ]
+        linhas.append({
+            "paciente_id": paciente_id,
+            "tipo_sanguineo": gerador.choice(["A+", "O+", "B-", "AB+"]),
+            "cirurgias": gerador.sample(CIRURGIAS, gerador.randint(0, 3)),
+            "internacoes_passadas": [f"internação {gerador.randint(2000, 2024)}: {gerador.choice(EXAMES)}" for _ in range(gerador.randint(0, 6))],
+            "alteracoes_exames": [item for item in historico if "alterado" in item][:50],
+            "historico_exames": historico,
+        })
+    return linhas
+
+
+def tamanho_banco(tipo, linhas: list) -> int:
+    """
+    Grava as linhas em um SQLite novo com as listas no tipo informado e
+    retorna o tamanho do arquivo depois do VACUUM.
+    """
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "historico.db")
+        engine = create_engine(f"sqlite:///{caminho}")
+        tabela = Table(
+            "informacoes_privadas", MetaData(),
+            Column("id", Integer, primary_key=True),
+            Column("paciente_id", Integer),
+            Column("tipo_sanguineo", String(5)),
+            *[Column(campo, tipo) for campo in CAMPOS],
+        )
+        tabela.create(engine)
+        with engine.begin() as conexao:
+            conexao.execute(insert(tabela), linhas)
+        with engine.connect() as conexao:
+            conexao.exec_driver_sql("VACUUM")
+        engine.dispose()
+        return os.path.getsize(caminho)
+
+
+def medir(funcao, repeticoes: int = 5) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do histórico médico comprimido e deferred")
+    parser.add_argument("--pacientes", type=int, default=2000)
+    parser.add_argument("--pagina", type=int, default=LIMITE_PAGINA_PADRAO, help="Tamanho da página do histórico")
+    args = parser.parse_args()
+
+    linhas = gerar_informacoes(args.pacientes)
+    exames = sorted(len(linha["historico_exames"]) for linha in linhas)
+    print(f"{len(linhas)} pacientes | exames por paciente: mediana {exames[len(exames) // 2]}, "
+          f"p95 {exames[int(len(exames) * 0.95)]}, máximo {exames[-1]}")
+
+    # Armazenamento
+    json_puro = tamanho_banco(JSON, linhas)
+    comprimido = tamanho_banco(JSONComprimido, linhas)
+    print(f"banco SQLite: JSON {json_puro / 1024:.0f} KB | JSONComprimido {comprimido / 1024:.0f} KB | "
+          f"{100 * (1 - comprimido / json_puro):.0f}% menor")
+
+    # Bytes do histórico lidos do banco por paciente (coluna historico_exames)
+    tipo = JSONComprimido()
+    gravado = [len(tipo.process_bind_param(linha["historico_exames"], None)) for linha in linhas]
+    original = [len(orjson.dumps(linha["historico_exames"])) for linha in linhas]
+    print(f"historico_exames por paciente: JSON {sum(original) / len(linhas):.0f} B | "
+          f"comprimido {sum(gravado) / len(linhas):.0f} B | {sum(original) / sum(gravado):.1f}x")
+
+    # Bytes enviados ao cliente: lista inteira (rota privada) x uma página
+    maior = max(linhas, key=lambda linha: len(linha["historico_exames"]))
+    inteiro = len(orjson.dumps(maior["historico_exames"]))
+    pagina = len(orjson.dumps(maior["historico_exames"][:args.pagina]))
+    print(f"maior histórico ({len(maior['historico_exames'])} exames): lista inteira {inteiro / 1024:.1f} KB | "
+          f"página de {args.pagina} {pagina / 1024:.1f} KB")
+
+    # Leitura pelo ORM: só o tipo sanguíneo (deferred) x histórico completo
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[InformacoesPrivadas.__table__])
+    with engine.begin() as conexao:
+        conexao.execute(insert(InformacoesPrivadas.__table__), linhas)
+    with Session(engine) as db:
+        sem_historico = medir(lambda: [info.tipo_sanguineo for info in db.execute(
+            select(InformacoesPrivadas), execution_options={"populate_existing": True}).scalars()])
+        com_historico = medir(lambda: [info.historico_exames for info in db.execute(
+            select(InformacoesPrivadas).options(undefer_group(GRUPO_HISTORICO)), execution_options={"populate_existing": True}).scalars()])
+    print(f"ORM {len(linhas)} linhas: só tipo sanguíneo {sem_historico * 1000:.1f} ms | "
+          f"com histórico {com_historico * 1000:.1f} ms | {com_historico / sem_historico:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Benchmark do aquecimento: tempo de inicialização e latência da primeira requisição
+#
+# Cada rodada sobe a aplicação em um processo novo (com AQUECIMENTO_ATIVO
+# ligado e desligado), executa o lifespan e mede a primeira e a segunda
+# chamada das rotas mais usadas. Usa o mesmo banco sintético do carga.py.
+#
+# Uso:  python -m benchmarks.bench_inicializacao [--pacientes 10000] [--rodadas 5]
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import orjson
+
+ROTAS = ("GET /paciente/{id}", "POST /login", "GET /medico/me", "GET /paciente/{id}/privado", "GET /pacientes")
+
+
+async def _medir_processo() -> dict:
+    """
+    Executado no processo filho: importa a aplicação, roda o lifespan
+    e mede duas chamadas de cada rota.
+    """
+    inicio = time.perf_counter()
+    import httpx
+    from main import app
+    from benchmarks.dados_sinteticos import SENHA_MEDICOS
+    importacao_ms = (time.perf_counter() - inicio) * 1000
+
+    resultado = {"importacao_ms": importacao_ms, "rotas": {}}
+    async with app.router.lifespan_context(app):
+        resultado["lifespan_ms"] = (time.perf_counter() - inicio) * 1000 - importacao_ms
+
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            cabecalhos = {}
+
+            async def chamar(rota: str):
+                metodo, caminho = rota.split(" ")
+                caminho = caminho.replace("{id}", "1")
+                if rota == "POST /login":
+                    resposta = await cliente.post(caminho, data={"username": "100000-SP", "password": SENHA_MEDICOS})
+                    cabecalhos["Authorization"] = f"Bearer {resposta.json()['access_token']}"
+                else:
+                    resposta = await cliente.request(metodo, caminho, headers=cabecalhos)
+                resposta.raise_for_status()
+
+            for rota in ROTAS:
+                tempos = []
+                for _ in range(2):
+                    inicio_rota = time.perf_counter()
+                    await chamar(rota)
+                    tempos.append((time.perf_counter() - inicio_rota) * 1000)
+                resultado["rotas"][rota] = {"primeira_ms": tempos[0], "segunda_ms": tempos[1]}
+
+    resultado["total_ms"] = (time.perf_counter() - inicio) * 1000
+    return resultado
+
+
+def _rodada(banco: str, aquecimento: bool) -> dict:
+    ambiente = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{banco}",
+        AQUECIMENTO_ATIVO="true" if aquecimento else "false",
+        LIMITES_ATIVOS="false",
+        SECRET_KEY="benchmark",
+        ALGORITHM="HS256",
+        TEMPO_EXPIRACAO="60",
+    )
+    saida = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_inicializacao", "--filho"],
+        env=ambiente, capture_output=True, check=True,
+    ).stdout
+    return orjson.loads(saida.splitlines()[-1])
+
+
+def _mediana(rodadas: list, chave) -> float:
+    return statistics.median(chave(rodada) for rodada in rodadas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inicialização e primeira requisição com e sem aquecimento")
+    parser.add_argument("--pacientes", type=int, default=10000)
+    parser.add_argument("--medicos", type=int, default=50)
+    parser.add_argument("--rodadas", type=int, default=5, help="Processos por modo (usa a mediana)")
+    parser.add_argument("--filho", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        print(orjson.dumps(asyncio.run(_medir_processo())).decode())
+        return
+
+    from benchmarks.carga import _preparar_banco
+
+    banco = _preparar_banco(args.pacientes, args.medicos, recriar=False)
+    modos = {"sem aquecimento": False, "com aquecimento": True}
+    resultados = {nome: [_rodada(banco, ativo) for _ in range(args.rodadas)] for nome, ativo in modos.items()}
+
+    print(f"{args.pacientes} pacientes | {args.rodadas} processos por modo (medianas, ms)\n")
+    print(f"{'':34}" + "".join(f"{nome:>18}" for nome in modos))
+    for rotulo, chave in (("importação", "importacao_ms"), ("lifespan (aquecimento)", "lifespan_ms")):
+        print(f"{rotulo:34}" + "".join(f"{_mediana(resultados[nome], lambda r: r[chave]):>18.1f}" for nome in modos))
+    for rota in ROTAS:
+        for ordem in ("primeira", "segunda"):
+            rotulo = f"{rota} ({ordem})"
+            print(f"{rotulo:34}" + "".join(f"{_mediana(resultados[nome], lambda r: r['rotas'][rota][ordem + '_ms']):>18.2f}" for nome in modos))
+
+
+if __name__ == "__main__":
+    main()
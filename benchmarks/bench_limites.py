@@ -0,0 +1,69 @@
+# Benchmark do custo do LimitadorRequisicoes por requisição
+#
+# Chama o middleware diretamente com uma aplicação ASGI vazia e compara com
+# a chamada sem middleware. Os limites são elevados para nada ser rejeitado.
+#
+# Uso:  python -m benchmarks.bench_limites [--requisicoes 200000]
+
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("TEMPO_EXPIRACAO", "60")
+os.environ["DATABASE_URL"] = "sqlite://"
+for variavel in ("LIMITE_LOGIN_POR_MINUTO", "LIMITE_ESCRITA_POR_MINUTO", "LIMITE_LEITURA_POR_MINUTO", "LIMITE_MEDICO_POR_MINUTO"):
+    os.environ[variavel] = str(10 ** 12)
+
+from app.security.auth import criar_token
+from app.security.limites import LimitadorRequisicoes
+
+
+async def _app_vazia(scope, receive, send):
+    return None
+
+
+def _scope(caminho: str, query: bytes = b"", token: str = None, cliente: int = 0) -> dict:
+    headers = [(b"host", b"localhost")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {
+        "type": "http", "method": "GET", "path": caminho, "query_string": query,
+        "headers": headers, "client": (f"10.0.{cliente // 256}.{cliente % 256}", 5000),
+    }
+
+
+async def _medir(app, scopes, requisicoes: int) -> float:
+    total = len(scopes)
+    inicio = time.perf_counter()
+    for i in range(requisicoes):
+        await app(scopes[i % total], None, None)
+    return (time.perf_counter() - inicio) / requisicoes
+
+
+async def _rodar(requisicoes: int):
+    limitador = LimitadorRequisicoes(_app_vazia)
+    token = criar_token(1)
+    casos = [
+        ("GET público, 1 cliente", [_scope("/paciente/1")]),
+        ("GET público, 10k clientes", [_scope("/paciente/1", cliente=i) for i in range(10000)]),
+        ("GET /pacientes sem filtro", [_scope("/pacientes", b"limite=50")]),
+        ("GET autenticado (token em cache)", [_scope("/paciente/1/privado", token=token)]),
+    ]
+    for titulo, scopes in casos:
+        base = await _medir(_app_vazia, scopes, requisicoes)
+        com_limite = await _medir(limitador, scopes, requisicoes)
+        print(f"{titulo}: {(com_limite - base) * 1e6:.2f} µs por requisição")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo do limitador de requisições")
+    parser.add_argument("--requisicoes", type=int, default=200000)
+    args = parser.parse_args()
+    asyncio.run(_rodar(args.requisicoes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Benchmark do custo do MetricasMiddleware por requisição
+#
+# Chama o middleware diretamente com uma aplicação ASGI mínima (que apenas
+# marca a rota e envia o status) e compara com a chamada sem middleware.
+#
+# Uso:  python -m benchmarks.bench_metricas [--requisicoes 200000]
+
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("TEMPO_EXPIRACAO", "60")
+
+from app.utils.metricas import MetricasMiddleware, exportar_metricas
+
+
+class _Rota:
+    def __init__(self, path: str):
+        self.path = path
+
+
+ROTAS = [_Rota("/paciente/{paciente_id}"), _Rota("/pacientes"), _Rota("/medico/me"), _Rota("/pacientes/termos")]
+
+
+async def _app_minima(scope, receive, send):
+    scope["route"] = ROTAS[scope["indice"] % len(ROTAS)]
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+
+
+async def _enviar(mensagem):
+    return None
+
+
+async def _medir(app, requisicoes: int) -> float:
+    inicio = time.perf_counter()
+    for i in range(requisicoes):
+        await app({"type": "http", "method": "GET", "path": "/x", "indice": i}, None, _enviar)
+    return (time.perf_counter() - inicio) / requisicoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo do middleware de métricas")
+    parser.add_argument("--requisicoes", type=int, default=200000)
+    args = parser.parse_args()
+
+    base = asyncio.run(_medir(_app_minima, args.requisicoes))
+    com_metricas = asyncio.run(_medir(MetricasMiddleware(_app_minima), args.requisicoes))
+    print(f"métricas: {(com_metricas - base) * 1e6:.2f} µs por requisição")
+
+    inicio = time.perf_counter()
+    texto = exportar_metricas()
+    print(f"coleta (/metrics): {(time.perf_counter() - inicio) * 1000:.2f} ms, {len(texto.splitlines())} linhas")
+
+
+if __name__ == "__main__":
+    main()
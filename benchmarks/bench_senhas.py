@@ -0,0 +1,72 @@
+# Benchmark da verificação de senhas (scrypt)
+#
+# Mede logins por segundo por núcleo (verificação direta) e a vazão pelo
+# pool de processos usado no /login, junto com o maior atraso observado
+# no event loop enquanto as verificações rodam.
+#
+# Uso:  python -m benchmarks.bench_senhas [--logins 200] [--processos N]
+
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("TEMPO_EXPIRACAO", "60")
+
+
+async def _monitorar_loop(parar: asyncio.Event) -> float:
+    # Maior atraso entre o agendamento e a execução de um tick de 1 ms
+    maior = 0.0
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(0.001)
+        maior = max(maior, time.perf_counter() - inicio - 0.001)
+    return maior
+
+
+async def _rodada_async(senhas, logins: int, hash_armazenado: str):
+    parar = asyncio.Event()
+    monitor = asyncio.create_task(_monitorar_loop(parar))
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(senhas.verificar_senha_async("correta", hash_armazenado) for _ in range(logins)))
+    duracao = time.perf_counter() - inicio
+    parar.set()
+    atraso = await monitor
+    assert all(correta for correta, _ in resultados)
+    return duracao, atraso
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da verificação de senhas")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    os.environ["SENHA_PROCESSOS"] = str(args.processos)
+    from app.config import SENHA_SCRYPT_N, SENHA_SCRYPT_R, SENHA_SCRYPT_P
+    from app.security import senhas
+
+    armazenado = senhas.gerar_hash("correta")
+    print(f"scrypt n={SENHA_SCRYPT_N} r={SENHA_SCRYPT_R} p={SENHA_SCRYPT_P} | {os.cpu_count()} CPU(s)")
+
+    # 1 núcleo, sem pool
+    inicio = time.perf_counter()
+    for _ in range(args.logins):
+        assert senhas.verificar_senha("correta", armazenado)[0]
+    duracao = time.perf_counter() - inicio
+    print(f"direto (1 núcleo): {args.logins / duracao:.1f} logins/s | {duracao / args.logins * 1000:.1f} ms por verificação")
+
+    # Pool de processos (aquece os processos antes de medir)
+    asyncio.run(_rodada_async(senhas, args.processos, armazenado))
+    duracao, atraso = asyncio.run(_rodada_async(senhas, args.logins, armazenado))
+    por_segundo = args.logins / duracao
+    print(f"pool ({args.processos} processo(s)): {por_segundo:.1f} logins/s | "
+          f"{por_segundo / args.processos:.1f} por processo | maior atraso do event loop {atraso * 1000:.1f} ms")
+
+    senhas.encerrar_pool()
+
+
+if __name__ == "__main__":
+    main()
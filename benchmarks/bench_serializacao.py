@@ -0,0 +1,101 @@
+# Benchmark da serialização de pacientes (10k linhas ORM)
+#
+# Compara o caminho padrão do FastAPI com response_model (validação
+# from_attributes + dump + json.dumps) com o caminho rápido de
+# app/utils/serializacao.py, e confere que os bytes gerados são iguais.
+#
+# Uso:  python -m benchmarks.bench_serializacao [--linhas 10000] [--repeticoes 5]
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import List
+
+# Banco em memória: não toca no banco configurado
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("TEMPO_EXPIRACAO", "60")
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import selectinload
+
+from app.database import Base, engine, SessionLocal
+from app.models.paciente import Paciente, InformacoesPrivadas, GRUPO_HISTORICO
+import app.models.medico  # noqa: F401  (registra as tabelas no metadata)
+import app.models.busca  # noqa: F401
+from app.schemas.paciente_schemas import PacienteBase, PacienteResponse
+from app.utils.serializacao import paciente_publico, paciente_completo, para_json
+
+
+def popular(linhas: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    agora = datetime.utcnow()
+    for i in range(linhas):
+        paciente = Paciente(
+            nome=f"Paciente {i}",
+            alergias=["dipirona", "penicilina"][: i % 3],
+            doencas_cronicas=["hipertensão"] if i % 2 else [],
+            medicamentos_continuos=["losartana 50mg"],
+            contatos_emergencia=[{"nome": f"Contato {i}", "telefone": "11999990000"}],
+            created_at=agora,
+        )
+        paciente.informacoes_privadas = InformacoesPrivadas(
+            tipo_sanguineo="O+",
+            cirurgias=["apendicectomia"],
+            internacoes_passadas=[],
+            alteracoes_exames=["glicemia alta"],
+            historico_exames=["hemograma 2024"],
+        )
+        db.add(paciente)
+    db.commit()
+    db.close()
+
+
+def caminho_fastapi(adapter: TypeAdapter, pacientes) -> bytes:
+    # O que o FastAPI faz com response_model: valida o ORM, gera dict JSON e codifica
+    conteudo = adapter.dump_python(adapter.validate_python(pacientes, from_attributes=True), mode="json")
+    return json.dumps(conteudo, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def medir(funcao, repeticoes: int) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da serialização de pacientes")
+    parser.add_argument("--linhas", type=int, default=10000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    popular(args.linhas)
+    db = SessionLocal()
+    pacientes = db.query(Paciente).options(selectinload(Paciente.informacoes_privadas).undefer_group(GRUPO_HISTORICO)).order_by(Paciente.id).all()
+
+    casos = [
+        ("público (PacienteBase)", TypeAdapter(List[PacienteBase]), paciente_publico),
+        ("privado (PacienteResponse)", TypeAdapter(List[PacienteResponse]), paciente_completo),
+    ]
+    for titulo, adapter, serializar in casos:
+        esperado = caminho_fastapi(adapter, pacientes)
+        obtido = para_json([serializar(p) for p in pacientes])
+        assert esperado == obtido, f"{titulo}: saída diferente do schema"
+
+        lento = medir(lambda: caminho_fastapi(adapter, pacientes), args.repeticoes)
+        rapido = medir(lambda: para_json([serializar(p) for p in pacientes]), args.repeticoes)
+        print(f"{titulo}: {len(pacientes)} linhas | pydantic+json {lento * 1000:.1f} ms | "
+              f"rápido {rapido * 1000:.1f} ms | {lento / rapido:.1f}x")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+# Teste de carga de todas as rotas de médico e paciente
+#
+# Sobe a aplicação em processo (httpx.ASGITransport, sem rede) sobre uma
+# cópia de um banco SQLite com dados sintéticos e dispara cada rota com a
+# concorrência pedida. Mostra vazão e latências p50/p95/p99 por rota e
+# grava o resultado em JSON para comparar execuções.
+#
+# Uso:
+#     python -m benchmarks.carga --pacientes 10000 --concorrencia 16 --requisicoes 200
+#     python -m benchmarks.carga --pacientes 100000 --comparar benchmarks/resultados/anterior.json
+#
+# O banco base (benchmarks/dados/bench_<pacientes>.db) é gerado na primeira
+# execução e reaproveitado depois; cada execução trabalha em uma cópia dele.
+
+import argparse
+import asyncio
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import orjson
+
+from benchmarks.dados_sinteticos import PRIMEIROS_NOMES, SENHA_MEDICOS, gerar_pacientes
+
+DIRETORIO_DADOS = os.path.join("benchmarks", "dados")
+DIRETORIO_RESULTADOS = os.path.join("benchmarks", "resultados")
+
+# Linhas por requisição no cenário de importação
+LINHAS_IMPORTACAO = 100
+
+
+# -------------------------------------------------
+# Cenários
+# -------------------------------------------------
+class Cenario:
+    """
+    Uma rota a ser medida.
+
+    montar(contexto, i) devolve os argumentos do httpx (method, url, ...)
+    da i-ésima requisição; depois(contexto, resposta) é opcional e guarda
+    o que outras rotas precisam (ex: IDs criados para o DELETE).
+    """
+
+    def __init__(self, nome: str, montar: Callable, depois: Optional[Callable] = None):
+        self.nome = nome
+        self.montar = montar
+        self.depois = depois
+
+
+def _autenticado(contexto: dict) -> dict:
+    return {"Authorization": f"Bearer {contexto['token']}"}
+
+
+def _id_aleatorio(contexto: dict) -> int:
+    return contexto["gerador"].randint(contexto["primeiro_id"], contexto["ultimo_id"])
+
+
+def _ids_aleatorios(contexto: dict, quantidade: int = 20) -> str:
+    return "&".join(f"ids={_id_aleatorio(contexto)}" for _ in range(quantidade))
+
+
+def _guardar_id(chave: str):
+    def depois(contexto: dict, resposta):
+        if resposta.status_code in (200, 201):
+            contexto[chave].append(resposta.json()["id"])
+    return depois
+
+
+def _medico_criado(contexto: dict, i: int) -> int:
+    criados = contexto["medicos_criados"]
+    return criados[i % len(criados)] if criados else 0
+
+
+def _proximo_id(contexto: dict, chave: str) -> int:
+    return contexto[chave].pop() if contexto[chave] else 0
+
+
+def _login(contexto: dict, i: int) -> dict:
+    crm = f"{100000 + i % contexto['medicos']}-SP"
+    return {"method": "POST", "url": "/login", "data": {"username": crm, "password": SENHA_MEDICOS}}
+
+
+def _novo_medico(contexto: dict, i: int) -> dict:
+    sufixo = f"{contexto['execucao']}-{i}"
+    return {
+        "method": "POST", "url": "/medico",
+        "json": {"nome": f"Médico Carga {i}", "especialidade": "Clínica", "crm": f"C{sufixo}"[:20], "email": f"carga{sufixo}@bench.local", "senha": SENHA_MEDICOS},
+    }
+
+
+def _novo_paciente(contexto: dict, i: int) -> dict:
+    return {"method": "POST", "url": "/paciente", "content": next(contexto["pacientes_novos"]), "headers": {"Content-Type": "application/json"}}
+
+
+def _importacao(contexto: dict, i: int) -> dict:
+    corpo = b"\n".join(next(contexto["pacientes_novos"]) for _ in range(LINHAS_IMPORTACAO))
+    return {"method": "POST", "url": "/pacientes/importar", "content": corpo, "headers": _autenticado(contexto)}
+
+
+CENARIOS: List[Cenario] = [
+    # medico_router
+    Cenario("POST /login", _login),
+    Cenario("GET /medico/me", lambda c, i: {"method": "GET", "url": "/medico/me", "headers": _autenticado(c)}),
+    Cenario("PATCH /medico/me", lambda c, i: {"method": "PATCH", "url": "/medico/me", "json": {"especialidade": f"Clínica {i % 10}"}, "headers": _autenticado(c)}),
+    Cenario("POST /medico", _novo_medico, _guardar_id("medicos_criados")),
+    Cenario("PATCH /medico/{id}/ativo", lambda c, i: {"method": "PATCH", "url": f"/medico/{_medico_criado(c, i)}/ativo", "json": {"ativo": bool(i % 2)}, "headers": _autenticado(c)}),
+    Cenario("DELETE /medico/{id}", lambda c, i: {"method": "DELETE", "url": f"/medico/{_proximo_id(c, 'medicos_criados')}"}),
+
+    # paciente_router - leitura
+    Cenario("GET /pacientes", lambda c, i: {"method": "GET", "url": f"/pacientes?limite=50&cursor={_id_aleatorio(c)}"}),
+    Cenario("GET /pacientes?nome", lambda c, i: {"method": "GET", "url": f"/pacientes?limite=20&nome={c['gerador'].choice(PRIMEIROS_NOMES)}"}),
+    Cenario("GET /pacientes?formato=ndjson", lambda c, i: {"method": "GET", "url": f"/pacientes?formato=ndjson&limite=200&cursor={_id_aleatorio(c)}"}),
+    Cenario("GET /pacientes/termos", lambda c, i: {"method": "GET", "url": f"/pacientes/termos?alergia=dipirona&medicamento=varfarina*&limite=50&cursor={_id_aleatorio(c)}"}),
+    Cenario("GET /pacientes/lote", lambda c, i: {"method": "GET", "url": f"/pacientes/lote?{_ids_aleatorios(c)}"}),
+    Cenario("GET /pacientes/lote/privado", lambda c, i: {"method": "GET", "url": f"/pacientes/lote/privado?{_ids_aleatorios(c)}", "headers": _autenticado(c)}),
+    Cenario("GET /paciente/{id}", lambda c, i: {"method": "GET", "url": f"/paciente/{_id_aleatorio(c)}"}),
+    Cenario("GET /paciente/{id}/privado", lambda c, i: {"method": "GET", "url": f"/paciente/{_id_aleatorio(c)}/privado", "headers": _autenticado(c)}),
+    Cenario("GET /pacientes/exportar", lambda c, i: {"method": "GET", "url": f"/pacientes/exportar?desde_id={max(c['ultimo_id'] - 1000, 0)}", "headers": _autenticado(c)}),
+
+    # paciente_router - escrita
+    Cenario("POST /paciente", _novo_paciente, _guardar_id("pacientes_criados")),
+    Cenario("POST /pacientes/importar", _importacao),
+    Cenario("PATCH /paciente/{id}", lambda c, i: {"method": "PATCH", "url": f"/paciente/{_id_aleatorio(c)}", "json": {"alergias": ["dipirona", f"alergia {i % 50}"]}}),
+    Cenario("DELETE /paciente/{id}", lambda c, i: {"method": "DELETE", "url": f"/paciente/{_proximo_id(c, 'pacientes_criados')}"}),
+]
+
+
+# -------------------------------------------------
+# Execução
+# -------------------------------------------------
+def _percentil(ordenados: List[float], p: float) -> float:
+    # Nearest-rank
+    if not ordenados:
+        return 0.0
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+async def _medir_cenario(cliente, cenario: Cenario, contexto: dict, requisicoes: int, concorrencia: int) -> dict:
+    latencias: List[float] = []
+    status: Dict[int, int] = {}
+    indices = iter(range(requisicoes))
+
+    async def trabalhador():
+        for i in indices:  # Iterador compartilhado entre os trabalhadores
+            argumentos = cenario.montar(contexto, i)
+            inicio = time.perf_counter()
+            resposta = await cliente.request(**argumentos)
+            latencias.append(time.perf_counter() - inicio)
+            status[resposta.status_code] = status.get(resposta.status_code, 0) + 1
+            if cenario.depois:
+                cenario.depois(contexto, resposta)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "requisicoes": requisicoes,
+        "erros": sum(quantidade for codigo, quantidade in status.items() if codigo >= 400),
+        "status": {str(codigo): quantidade for codigo, quantidade in sorted(status.items())},
+        "req_por_segundo": round(requisicoes / duracao, 1),
+        "p50_ms": round(_percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(_percentil(latencias, 95) * 1000, 2),
+        "p99_ms": round(_percentil(latencias, 99) * 1000, 2),
+        "max_ms": round(latencias[-1] * 1000, 2),
+    }
+
+
+async def _executar(args, contexto: dict) -> Dict[str, dict]:
+    import httpx
+    import main as aplicacao
+
+    resultados = {}
+    transporte = httpx.ASGITransport(app=aplicacao.app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+        resposta = await cliente.post("/login", data={"username": "100000-SP", "password": SENHA_MEDICOS})
+        resposta.raise_for_status()
+        contexto["token"] = resposta.json()["access_token"]
+
+        for cenario in CENARIOS:
+            if args.cenarios and not any(filtro.lower() in cenario.nome.lower() for filtro in args.cenarios):
+                continue
+            resultado = await _medir_cenario(cliente, cenario, contexto, args.requisicoes, args.concorrencia)
+            resultados[cenario.nome] = resultado
+            print(f"{cenario.nome:32} {resultado['req_por_segundo']:>9.1f} req/s  p50 {resultado['p50_ms']:>8.2f}  "
+                  f"p95 {resultado['p95_ms']:>8.2f}  p99 {resultado['p99_ms']:>8.2f} ms  erros {resultado['erros']}")
+
+    return resultados
+
+
+def _preparar_banco(pacientes: int, medicos: int, recriar: bool) -> str:
+    """
+    Gera o banco base se preciso e devolve o caminho de uma cópia de trabalho.
+    """
+    base = os.path.join(DIRETORIO_DADOS, f"bench_{pacientes}.db")
+    if recriar and os.path.exists(base):
+        os.remove(base)
+    if not os.path.exists(base):
+        os.makedirs(DIRETORIO_DADOS, exist_ok=True)
+        print(f"Gerando {base} ({pacientes} pacientes, {medicos} médicos)...")
+        # Processo separado: o engine da aplicação deve apontar para a cópia, não para o banco base
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.dados_sinteticos", "--pacientes", str(pacientes), "--medicos", str(medicos), "--banco", base],
+            check=True,
+        )
+
+    copia = os.path.join(tempfile.mkdtemp(prefix="vitalkey_bench_"), "bench.db")
+    with sqlite3.connect(base) as origem, sqlite3.connect(copia) as destino:
+        origem.backup(destino)
+    return copia
+
+
+def _comparar(atual: dict, anterior: dict):
+    print(f"\nComparação com {anterior['meta']['data']} ({anterior['meta'].get('commit') or '-'}):")
+    for nome, dados in atual["endpoints"].items():
+        antes = anterior["endpoints"].get(nome)
+        if not antes:
+            continue
+        vazao = (dados["req_por_segundo"] / antes["req_por_segundo"] - 1) * 100 if antes["req_por_segundo"] else 0
+        p95 = (dados["p95_ms"] / antes["p95_ms"] - 1) * 100 if antes["p95_ms"] else 0
+        print(f"{nome:32} vazão {vazao:+7.1f}%   p95 {p95:+7.1f}%")
+
+
+def _commit_atual() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga das rotas de médico e paciente")
+    parser.add_argument("--pacientes", type=int, default=10000, help="Tamanho do banco sintético (ex: 10000, 100000, 1000000)")
+    parser.add_argument("--medicos", type=int, default=50)
+    parser.add_argument("--concorrencia", type=int, default=16, help="Requisições simultâneas")
+    parser.add_argument("--requisicoes", type=int, default=200, help="Requisições por rota")
+    parser.add_argument("--cenarios", nargs="*", help="Mede só as rotas cujo nome contém algum destes textos")
+    parser.add_argument("--recriar", action="store_true", help="Gera o banco sintético de novo")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON do resultado (padrão: benchmarks/resultados/<data>_<pacientes>.json)")
+    parser.add_argument("--comparar", default=None, help="Resultado JSON anterior para comparação")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    copia = _preparar_banco(args.pacientes, args.medicos, args.recriar)
+
+    # Configuração lida por app.config: precisa estar no ambiente antes de importar a aplicação
+    os.environ["DATABASE_URL"] = f"sqlite:///{copia}"
+    os.environ["LIMITES_ATIVOS"] = "false"  # Mede a aplicação, não o limitador
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("TEMPO_EXPIRACAO", "60")
+
+    with sqlite3.connect(copia) as conexao:
+        primeiro_id, ultimo_id = conexao.execute("SELECT MIN(id), MAX(id) FROM paciente").fetchone()
+
+    contexto = {
+        "gerador": random.Random(args.semente),
+        "execucao": datetime.now().strftime("%H%M%S"),
+        "medicos": args.medicos,
+        "primeiro_id": primeiro_id or 1,
+        "ultimo_id": ultimo_id or 1,
+        "pacientes_novos": gerar_pacientes(10 ** 9, semente=args.semente + 1),
+        "medicos_criados": [],
+        "pacientes_criados": [],
+    }
+
+    print(f"{args.pacientes} pacientes | concorrência {args.concorrencia} | {args.requisicoes} requisições por rota\n")
+    resultados = asyncio.run(_executar(args, contexto))
+
+    relatorio = {
+        "meta": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit_atual(),
+            "pacientes": args.pacientes,
+            "medicos": args.medicos,
+            "concorrencia": args.concorrencia,
+            "requisicoes_por_rota": args.requisicoes,
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "endpoints": resultados,
+    }
+
+    saida = args.saida or os.path.join(DIRETORIO_RESULTADOS, f"{datetime.now():%Y%m%d_%H%M%S}_{args.pacientes}.json")
+    os.makedirs(os.path.dirname(saida) or ".", exist_ok=True)
+    with open(saida, "wb") as arquivo:
+        arquivo.write(orjson.dumps(relatorio, option=orjson.OPT_INDENT_2))
+    print(f"\nResultado salvo em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, "rb") as arquivo:
+            _comparar(relatorio, orjson.loads(arquivo.read()))
+
+    shutil.rmtree(os.path.dirname(copia), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
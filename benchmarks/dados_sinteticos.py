@@ -0,0 +1,130 @@
+# Geração de dados sintéticos para os benchmarks
+#
+# Pacientes (com informações privadas) são gravados pelo ImportadorPacientes,
+# o mesmo caminho do POST /pacientes/importar, assim os índices de busca
+# (nomes e termos clínicos) ficam iguais aos de um banco real.
+#
+# Uso:  python -m benchmarks.dados_sinteticos --pacientes 100000 --medicos 50 [--banco benchmarks/dados/bench.db]
+
+import argparse
+import os
+import random
+import time
+from typing import Iterator
+
+import orjson
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("TEMPO_EXPIRACAO", "60")
+
+PRIMEIROS_NOMES = [
+    "Ana", "Maria", "João", "José", "Pedro", "Paulo", "Lucas", "Gabriel", "Juliana", "Fernanda",
+    "Patrícia", "Carlos", "Antônio", "Francisco", "Luiz", "Marcos", "Rafael", "Beatriz", "Camila", "Letícia",
+    "Mariana", "Larissa", "Bruno", "Rodrigo", "Thiago", "Vitória", "Helena", "Sofia", "Davi", "Heitor",
+]
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+    "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+    "Rocha", "Dias", "Nascimento", "Andrade", "Moreira", "Nunes", "Marques", "Machado", "Mendes", "Freitas",
+]
+ALERGIAS = ["dipirona", "penicilina", "amoxicilina", "ibuprofeno", "AAS", "látex", "lactose", "camarão", "amendoim", "poeira", "iodo", "sulfa"]
+DOENCAS = ["hipertensão", "diabetes tipo 2", "asma", "DPOC", "insuficiência cardíaca", "hipotireoidismo", "epilepsia", "doença renal crônica", "fibrilação atrial"]
+MEDICAMENTOS = ["losartana 50mg", "metformina 850mg", "varfarina 5mg", "levotiroxina 50mcg", "enalapril 10mg", "sinvastatina 20mg", "AAS 100mg", "insulina NPH", "salbutamol", "carbamazepina 200mg"]
+TIPOS_SANGUINEOS = ["A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"]
+CIRURGIAS = ["apendicectomia", "colecistectomia", "cesárea", "herniorrafia", "artroplastia de joelho", "safena"]
+EXAMES = ["hemograma", "glicemia de jejum", "creatinina", "TSH", "perfil lipídico", "eletrocardiograma", "raio-x de tórax"]
+
+SENHA_MEDICOS = "benchmark123"
+
+
+def _amostra(gerador: random.Random, itens: list, maximo: int) -> list:
+    return gerador.sample(itens, gerador.randint(0, maximo))
+
+
+def gerar_pacientes(quantidade: int, semente: int = 42) -> Iterator[bytes]:
+    """
+    Gera pacientes no formato do PacienteCreate, uma linha NDJSON por paciente.
+    A mesma semente gera sempre os mesmos dados.
+    """
+    gerador = random.Random(semente)
+    for _ in range(quantidade):
+        nome = f"{gerador.choice(PRIMEIROS_NOMES)} {gerador.choice(SOBRENOMES)} {gerador.choice(SOBRENOMES)}"
+        paciente = {
+            "nome": nome,
+            "alergias": _amostra(gerador, ALERGIAS, 3),
+            "doencas_cronicas": _amostra(gerador, DOENCAS, 2),
+            "medicamentos_continuos": _amostra(gerador, MEDICAMENTOS, 3),
+            "contatos_emergencia": [
+                {"nome": f"{gerador.choice(PRIMEIROS_NOMES)} {gerador.choice(SOBRENOMES)}", "telefone": f"119{gerador.randrange(10 ** 8):08d}"}
+                for _ in range(gerador.randint(1, 2))
+            ],
+            "informacoes_privadas": {
+                "tipo_sanguineo": gerador.choice(TIPOS_SANGUINEOS),
+                "cirurgias": _amostra(gerador, CIRURGIAS, 2),
+                "internacoes_passadas": [f"internação {gerador.randint(2000, 2024)}" for _ in range(gerador.randint(0, 2))],
+                "alteracoes_exames": _amostra(gerador, EXAMES, 2),
+                "historico_exames": [f"{exame} {gerador.randint(2018, 2024)}" for exame in _amostra(gerador, EXAMES, 4)],
+            },
+        }
+        yield orjson.dumps(paciente)
+
+
+def popular_banco(pacientes: int, medicos: int, semente: int = 42) -> dict:
+    """
+    Cria as tabelas e grava médicos e pacientes sintéticos no banco configurado
+    (DATABASE_URL). Todos os médicos usam a senha SENHA_MEDICOS.
+    """
+    from app.database import Base, SessionLocal, engine
+    import app.models.medico  # noqa: F401  (registra as tabelas no metadata)
+    import app.models.busca  # noqa: F401
+    from app.models.medico import Medico
+    from app.security.senhas import gerar_hash
+    from app.utils.importacao import ImportadorPacientes
+
+    Base.metadata.create_all(bind=engine)
+    inicio = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        # Um único hash para todos: o scrypt de cada médico dominaria o tempo de carga
+        senha = gerar_hash(SENHA_MEDICOS)
+        db.add_all([
+            Medico(nome=f"Médico {i}", especialidade="Clínica Geral", crm=f"{100000 + i}-SP", email=f"medico{i}@bench.local", senha=senha)
+            for i in range(medicos)
+        ])
+        db.commit()
+
+        importador = ImportadorPacientes(db)
+        importador.processar_linhas(gerar_pacientes(pacientes, semente))
+        relatorio = importador.finalizar()
+    finally:
+        db.close()
+
+    return {
+        "medicos": medicos,
+        "pacientes": relatorio["inseridos"],
+        "erros": relatorio["total_erros"],
+        "segundos": round(time.perf_counter() - inicio, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um banco SQLite com dados sintéticos")
+    parser.add_argument("--pacientes", type=int, default=10000)
+    parser.add_argument("--medicos", type=int, default=50)
+    parser.add_argument("--banco", default=None, help="Arquivo SQLite (padrão: benchmarks/dados/bench_<pacientes>.db)")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    banco = args.banco or os.path.join("benchmarks", "dados", f"bench_{args.pacientes}.db")
+    if os.path.exists(banco):
+        raise SystemExit(f"❌ {banco} já existe")
+    os.makedirs(os.path.dirname(banco) or ".", exist_ok=True)
+    os.environ["DATABASE_URL"] = f"sqlite:///{banco}"
+
+    print(popular_banco(args.pacientes, args.medicos, args.semente))
+
+
+if __name__ == "__main__":
+    main()
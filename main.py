@@ -1,14 +1,81 @@
 # app/main.py
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers.medico_router import router as medico_router
 from app.routers.paciente_router import router as paciente_router
+from app.routers.status_router import router as status_router
+from app.database import Base, engine, async_engine, replicas, particionamento
+from app.config import DB_ASYNC, LIMITES_ATIVOS, METRICAS_ATIVAS, SQL_INSTRUMENTACAO, AQUECIMENTO_ATIVO, ARQUIVO_ATIVO
+from app.security.senhas import encerrar_pool
+from app.utils.arquivo import arquivador
+from app.utils.eventos import difusor
+
+# -------------------------------------------------
+# Criação das tabelas
+# -------------------------------------------------
+# Cria apenas as tabelas que ainda não existem no banco
+# (ex: índices auxiliares de busca adicionados depois)
+Base.metadata.create_all(bind=engine)
+
+# Com shards: mapa de buckets e sequência de IDs no principal, pacientes em cada shard
+if particionamento is not None:
+    particionamento.criar_tabelas()
+
+# -------------------------------------------------
+# Ciclo de vida (aquecimento e encerramento)
+# -------------------------------------------------
+# Antes de aceitar requisições: prepara as rotas, abre as conexões do pool,
+# configura os mappers, compila as consultas frequentes e inicia o pool de senhas.
+# Depois, inicia a tarefa que arquiva os pacientes inativos.
+# No encerramento, para o feed de eventos, o arquivamento e finaliza os processos do pool de senhas.
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    if AQUECIMENTO_ATIVO:
+        from app.utils.aquecimento import aquecer
+
+        await aquecer(app, engine, async_engine, replicas, particionamento)
+    if ARQUIVO_ATIVO:
+        arquivador.iniciar()
+    yield
+    await difusor.encerrar()
+    await arquivador.encerrar()
+    encerrar_pool()
 
 # -------------------------------------------------
 # Criação da aplicação FastAPI
 # -------------------------------------------------
 # Aqui nasce a API. O título aparece no Swagger (/docs)
-app = FastAPI(title="API de Pacientes")
+app = FastAPI(title="API de Pacientes", lifespan=ciclo_de_vida)
+
+# -------------------------------------------------
+# Consultas SQL por requisição (Server-Timing)
+# -------------------------------------------------
+# Middleware mais interno: conta só o que as rotas executam
+if SQL_INSTRUMENTACAO:
+    from app.utils.consultas import ConsultasMiddleware
+
+    app.add_middleware(ConsultasMiddleware)
+
+# -------------------------------------------------
+# Réplicas de leitura
+# -------------------------------------------------
+# Marca cada requisição como leitura (pode usar réplica) ou escrita (principal)
+if replicas:
+    from app.utils.replicas import RoteamentoReplicas
+
+    app.add_middleware(RoteamentoReplicas)
+
+# -------------------------------------------------
+# Limites de taxa e concorrência
+# -------------------------------------------------
+# Rejeita com 429/503 antes de ocupar o pool do banco.
+# Adicionado antes do CORS para que as rejeições também levem os headers de CORS
+if LIMITES_ATIVOS:
+    from app.security.limites import LimitadorRequisicoes
+
+    app.add_middleware(LimitadorRequisicoes)
 
 # -------------------------------------------------
 # Middleware de CORS
@@ -21,8 +88,19 @@ app.add_middleware(
     allow_credentials=True,     # Permite envio de cookies/tokens
     allow_methods=["*"],        # Permite todos os métodos HTTP
     allow_headers=["*"],        # Permite todos os headers
+    expose_headers=["X-Proximo-Cursor", "ETag", "Last-Modified", "Retry-After", "X-Banco"],  # Cursor de /pacientes, cache condicional, limites e réplicas
 )
 
+# -------------------------------------------------
+# Métricas (GET /metrics)
+# -------------------------------------------------
+# Adicionado por último: é o middleware mais externo e mede
+# também as respostas do CORS e as rejeições do limitador
+if METRICAS_ATIVAS:
+    from app.utils.metricas import MetricasMiddleware
+
+    app.add_middleware(MetricasMiddleware)
+
 # -------------------------------------------------
 # Rota raiz (health-check)
 # -------------------------------------------------
@@ -35,5 +113,21 @@ def root():
 # Inclusão dos routers da aplicação
 # -------------------------------------------------
 # Centraliza as rotas por domínio (médico, paciente, etc.)
+
+# No modo assíncrono, as rotas de leitura assíncronas são registradas
+# primeiro e têm prioridade; as demais seguem nos routers síncronos.
+# Com shards, as leituras de pacientes ficam no router síncrono
+# (ShardedSession e scatter-gather em threads)
+if DB_ASYNC:
+    from app.routers.medico_async_router import router as medico_async_router
+
+    app.include_router(medico_async_router)
+
+    if particionamento is None:
+        from app.routers.paciente_async_router import router as paciente_async_router
+
+        app.include_router(paciente_async_router)
+
 app.include_router(medico_router)
-app.include_router(paciente_router)
\ No newline at end of file
+app.include_router(paciente_router)
+app.include_router(status_router)
\ No newline at end of file